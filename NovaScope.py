@@ -1,17 +1,220 @@
+import time
+START = time.perf_counter()  # before the imports below, for --startup-report
+import io
+import sys
 import tkinter as tk
-from tkinter import ttk, messagebox
-import requests
-from tkintermapview import TkinterMapView
-from tkcalendar import Calendar
-from astroquery.simbad import Simbad
-from astropy.coordinates import SkyCoord
-from timezonefinder import TimezoneFinder
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import math
-import pytz
-import random
+from functools import lru_cache
+import numpy as np
 from PIL import Image, ImageTk
-from geopy.geocoders import Nominatim
+from novascope.catalog import open_catalog
+from novascope.engine import JulianDay, convert_dec_to_hours
+from novascope.geocode import ReverseGeocoder, last_known_location, locate_by_ip
+from novascope.jobs import Job, JobQueue
+from novascope.live import UNIX_EPOCH_JD, LiveSky, clock_time
+from novascope.network import Site, best_windows, network_epochs
+from novascope.pipeline import Pipeline
+from novascope.planner import STEP_UNITS, epoch_grid, plan_windows
+from novascope.resolver import ResolverCache
+from novascope.results import CIRCUMPOLAR, NEVER_RISES, UNRESOLVED, ResultSet, export_rows
+from novascope.runcache import RunCache
+from novascope.startup import StartupTimer
+from novascope.stats import NULL_STATS, Stats
+from novascope.tiles import TileStore
+from novascope.timezones import TimezoneService
+
+
+@lru_cache(maxsize=None)
+def map_view_class():
+    """Build CachedMapView on first use so tkintermapview is only imported with the map."""
+    from tkintermapview import TkinterMapView
+
+    class CachedMapView(TkinterMapView):
+        """Map widget that reads tiles from the offline tile store before the network."""
+
+        def __init__(self, *args, tile_store, **kwargs):
+            self.tile_store = tile_store
+            super().__init__(*args, **kwargs)
+
+        def request_image(self, zoom, x, y, db_cursor=None):
+            # Runs on the widget's loader threads
+            try:
+                data = self.tile_store.tile(zoom, x, y)
+            except Exception:
+                return self.empty_tile_image
+            if data is None:
+                self.tile_image_cache[f"{zoom}{x}{y}"] = self.empty_tile_image
+                return self.empty_tile_image
+            if not self.running:
+                return self.not_loaded_tile_image
+            image_tk = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+            self.tile_image_cache[f"{zoom}{x}{y}"] = image_tk
+            return image_tk
+
+
+    return CachedMapView
+
+
+class ResultTable:
+    """Paginated result window over a ResultSet.
+
+    Only the rows of the current page exist as Treeview items; sorting and
+    filtering run on the underlying arrays.
+    """
+
+    FILTERS = {
+        "All": {},
+        "Observable": {"observable": True},
+        "Unobservable": {"observable": False},
+        "Circumpolar": {"status": CIRCUMPOLAR},
+        "Never rises": {"status": NEVER_RISES},
+        "Unresolved": {"status": UNRESOLVED},
+    }
+    SORT_KEYS = {"Star": "name", "LCT Rise": "rise", "LCT Set": "set", "Observability": "observable"}
+
+    def __init__(self, root, jobs, title, timezone, lct_obs, show="All", page_size=100):
+        self.jobs = jobs
+        self.lct_obs = lct_obs
+        self.page_size = page_size
+        self.results = ResultSet()
+        self.idx = np.empty(0, dtype=int)
+        self.page = 0
+        self.sort = None
+        self.descending = False
+        self.stats = NULL_STATS  # the run filling this table, while it is running
+        self._refresh_pending = False
+
+        self.window = tk.Toplevel(root)
+        self.window.geometry("1200x600")
+        self.window.title(title)
+
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, pady=5)
+        ttk.Label(toolbar, text="Show:").pack(side=tk.LEFT, padx=5)
+        self.filter = tk.StringVar(value=show)
+        filter_box = ttk.Combobox(toolbar, textvariable=self.filter, values=list(self.FILTERS), state="readonly",
+                                  width=14)
+        filter_box.bind("<<ComboboxSelected>>", lambda event: self.refresh(page=0))
+        filter_box.pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="< Prev", command=lambda: self.show_page(self.page - 1)).pack(side=tk.LEFT, padx=5)
+        self.page_label = ttk.Label(toolbar, text="")
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Next >", command=lambda: self.show_page(self.page + 1)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Export...", command=self.export).pack(side=tk.RIGHT, padx=5)
+
+        # Create a Treeview widget
+        self.tree = ttk.Treeview(self.window,
+                                 columns=("Star", "LCT Rise", "LCT Observer", "LCT Set", "Observability"),
+                                 show='headings')
+        self.tree.heading("Star", text="Star")
+        self.tree.heading("LCT Rise", text=f"LCT Rise ({timezone})")
+        self.tree.heading("LCT Observer", text=f"LCT Observer ({timezone})")
+        self.tree.heading("LCT Set", text=f"LCT Set ({timezone})")
+        self.tree.heading("Observability", text="Observability")
+        for column in self.SORT_KEYS:
+            self.tree.heading(column, command=lambda column=column: self.sort_by(column))
+        self.tree.pack(expand=True, fill=tk.BOTH)
+
+    def append(self, stars, ra, dec, result):
+        """Add computed rows; the visible page is refreshed at most every 250 ms."""
+        if not self.window.winfo_exists():
+            return  # window was closed while the job was running
+        self.results.append(stars, ra, dec, result)
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.window.after(250, self.refresh)
+
+    def refresh(self, page=None):
+        self._refresh_pending = False
+        if not self.window.winfo_exists():
+            return
+        with self.stats.stage("table"):
+            self.idx = self.results.select(self.sort, self.descending, **self.FILTERS[self.filter.get()])
+            self.show_page(self.page if page is None else page)
+
+    def show_page(self, page):
+        pages = max(1, -(-len(self.idx) // self.page_size))
+        self.page = min(max(page, 0), pages - 1)
+        start = self.page * self.page_size
+        self.tree.delete(*self.tree.get_children())
+        for star_data in self.results.rows(self.idx[start:start + self.page_size], self.lct_obs):
+            self.tree.insert("", tk.END, values=star_data)
+        self.page_label.config(text=f"Page {self.page + 1}/{pages} ({len(self.idx)} of {len(self.results)} stars)")
+
+    def sort_by(self, column):
+        key = self.SORT_KEYS[column]
+        self.descending = not self.descending if self.sort == key else False
+        self.sort = key
+        self.refresh(page=0)
+
+    def export(self):
+        """Stream the filtered, sorted rows to CSV, JSON Lines or Parquet."""
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet")],
+        )
+        if not path:
+            return
+        data, names = self.results.data, self.results.names  # zero-copy snapshot; later chunks go past its end
+        idx = self.idx
+        self.jobs.submit(Job(
+            f"Export {len(idx)} rows",
+            lambda job: export_rows(data, names, path, idx, job=job),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to export results.\n{e}"),
+        ))
+
+
+class LiveSkyWindow:
+    """Stars above the horizon right now.
+
+    The table is filled once; each tick only removes the stars that set
+    and adds the ones that rose since the last tick.
+    """
+
+    def __init__(self, root, names, sky, offset, timezone, tick_ms=1000):
+        self.names = names
+        self.sky = sky
+        self.offset = offset
+        self.tick_ms = tick_ms
+        self.count = 0
+
+        self.window = tk.Toplevel(root)
+        self.window.geometry("500x600")
+        self.window.title("Live Sky")
+        self.status = ttk.Label(self.window, text="")
+        self.status.pack(pady=5)
+        self.tree = ttk.Treeview(self.window, columns=("Star", "Sets At"), show='headings')
+        self.tree.heading("Star", text="Star")
+        self.tree.heading("Sets At", text=f"Sets At ({timezone})")
+        self.tree.pack(expand=True, fill=tk.BOTH)
+
+        for i in sky.visible():
+            self.insert(i)
+        self.update_status()
+        self.window.after(self.tick_ms, self.tick)
+
+    def insert(self, i):
+        set_at = "Circumpolar" if self.sky.circumpolar[i] else clock_time(self.sky.next_set[i], self.offset)
+        self.tree.insert("", tk.END, iid=str(i), values=(self.names[i], set_at))
+        self.count += 1
+
+    def tick(self):
+        if not self.window.winfo_exists():
+            return  # window closed: stop ticking
+        rose, set_ = self.sky.tick(time.time())
+        for i in set_:
+            self.tree.delete(str(i))
+            self.count -= 1
+        for i in rose:
+            self.insert(i)
+        self.update_status()
+        self.window.after(self.tick_ms, self.tick)
+
+    def update_status(self):
+        self.status.config(
+            text=f"{self.count} of {len(self.sky)} stars up at {clock_time(self.sky.now, self.offset)}")
 
 
 class StarObservationApp:
@@ -28,7 +231,11 @@ class StarObservationApp:
             self.root.iconphoto(False, self.icon_img)
         except FileNotFoundError:
             print("NovaSpace")
-        self.user_location = self.get_user_location()
+        # Last known position until the background lookup answers
+        self.user_location = last_known_location() or (0, 0)
+        # catalog is None until a local catalog is imported
+        self.pipeline = Pipeline(open_catalog(), ResolverCache(), TimezoneService(), cache=RunCache())
+        self.geocoder = ReverseGeocoder()
         # Apply a modern theme
         self.style = ttk.Style()
         self.style.theme_use('clam')  # Modern theme
@@ -44,6 +251,9 @@ class StarObservationApp:
 
         # Add a dark mode toggle
         self.dark_mode = tk.BooleanVar(value=False)
+        # Run statistics (off by default; no overhead until switched on)
+        self.record_stats = tk.BooleanVar(value=False)
+        self.profile_runs = tk.BooleanVar(value=False)
         self.create_menu_bar()
 
 
@@ -53,9 +263,21 @@ class StarObservationApp:
         self.clicked_lat = None
         self.clicked_lon = None
         self.current_marker = None
+        self.map_window = None
+        self.tile_store = None  # opened on first use of the map
+        self.city_country = "Unknown Location"
+        self.geocode_job = None
+        self.chunk_size = 200  # stars per incremental result update
 
         # Create GUI components
         self.create_widgets()
+        # Calculations run in the background so the window stays responsive
+        self.jobs = JobQueue(self.root, on_update=self.update_job_panel)
+        # Map-click lookups get their own queue so they never wait behind a calculation
+        self.geocoding = JobQueue(self.root)
+        self.geocoding.submit(Job("Locating user", lambda job: locate_by_ip(),
+                                  on_done=self.set_user_location,
+                                  on_error=lambda e: print("Could not determine user location:", e)))
     def create_menu_bar(self):
         menu_bar = tk.Menu(self.root)
         self.root.config(menu=menu_bar)
@@ -71,6 +293,12 @@ class StarObservationApp:
         view_menu.add_checkbutton(label="Dark Mode", variable=self.dark_mode, command=self.toggle_dark_mode)
         menu_bar.add_cascade(label="View", menu=view_menu)
 
+        # Tools menu
+        tools_menu = tk.Menu(menu_bar, tearoff=0)
+        tools_menu.add_checkbutton(label="Run Statistics", variable=self.record_stats)
+        tools_menu.add_checkbutton(label="Profile Runs (cProfile)", variable=self.profile_runs)
+        menu_bar.add_cascade(label="Tools", menu=tools_menu)
+
         # Help menu
         help_menu = tk.Menu(menu_bar, tearoff=0)
         help_menu.add_command(label="About", command=self.show_about)
@@ -80,15 +308,11 @@ class StarObservationApp:
         self.root.bind("<Control-r>", lambda event: self.reset_inputs())
         self.root.bind("<Control-q>", lambda event: self.root.quit())
 
-    def get_user_location(self):
-        """Fetch user location using a geolocation API."""
-        try:
-            response = requests.get("http://ip-api.com/json/")
-            data = response.json()
-            return (data["lat"], data["lon"])  # Latitude and Longitude
-        except Exception as e:
-            print("Could not determine user location:", e)
-            return (0, 0)  # Fallback to (0, 0) if location is unavailable
+    def set_user_location(self, location):
+        """Use a fresh geolocation answer; recentre the map if nothing was picked yet."""
+        self.user_location = location
+        if self.map_window is not None and self.map_window.winfo_exists() and self.clicked_lat is None:
+            self.map_widget.set_position(*location, zoom=13)
 
     def toggle_dark_mode(self):
         """Toggle dark mode on and off."""
@@ -121,7 +345,7 @@ class StarObservationApp:
     def create_widgets(self):
         """Create and arrange GUI widgets."""
         # Observation mode options
-        self.types = ["Single Star", "Multiple Stars"]
+        self.types = ["Single Star", "Multiple Stars", "Night Planner", "Site Network", "Live Sky"]
         self.options = tk.StringVar(value=self.types[0])  # Default to "Single Star"
 
         # Observation mode selection
@@ -144,6 +368,16 @@ class StarObservationApp:
         ttk.Button(self.button_frame, text="Reset", command=self.reset_inputs).pack(side=tk.LEFT, padx=10)
         ttk.Button(self.button_frame, text="About", command=self.show_about).pack(side=tk.LEFT, padx=10)
 
+        # Progress of background calculations
+        self.job_frame = ttk.Frame(self.root)
+        self.job_frame.pack(pady=5)
+        self.progress = ttk.Progressbar(self.job_frame, length=300, mode="determinate")
+        self.progress.pack(side=tk.LEFT, padx=10)
+        self.job_status = ttk.Label(self.job_frame, text="")
+        self.job_status.pack(side=tk.LEFT, padx=10)
+        self.cancel_button = ttk.Button(self.job_frame, text="Cancel", command=self.cancel_job, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=10)
+
         # Label for displaying results
         self.result_label = ttk.Label(self.root, text="", foreground="blue", wraplength=600, justify="left")
         self.result_label.pack(pady=10)
@@ -151,6 +385,28 @@ class StarObservationApp:
         # Initialize the default mode
         self.update_mode(self.types[0])
 
+    def update_job_panel(self, jobs):
+        """Show progress and throughput of the running calculation."""
+        running = jobs.running()
+        queued = len(jobs.queued())
+        if not running:
+            self.progress.config(value=0)
+            self.job_status.config(text=f"{queued} queued" if queued else "")
+            self.cancel_button.config(state=tk.DISABLED)
+            return
+        job = running[0]
+        self.progress.config(maximum=max(job.total, 1), value=job.done)
+        status = f"{job.title}: {job.done}/{job.total} stars ({job.rate:.1f} stars/s)"
+        if queued:
+            status += f" | {queued} queued"
+        self.job_status.config(text=status)
+        self.cancel_button.config(state=tk.NORMAL)
+
+    def cancel_job(self):
+        """Cancel the running calculation."""
+        for job in self.jobs.running():
+            job.cancel()
+
     def update_mode(self, mode):
         """Update input form based on the selected mode."""
         # Clear the dynamic frame
@@ -162,6 +418,12 @@ class StarObservationApp:
             self.create_single_star_inputs()
         elif mode == "Multiple Stars":
             self.create_multiple_stars_inputs()
+        elif mode == "Night Planner":
+            self.create_planner_inputs()
+        elif mode == "Site Network":
+            self.create_network_inputs()
+        elif mode == "Live Sky":
+            self.create_live_inputs()
 
     def show_about(self):
         """Display an enhanced About dialog with logo and detailed information."""
@@ -231,6 +493,7 @@ class StarObservationApp:
 
         tk.Button(self.dynamic_frame, text="Random Star", command=self.select_random_star).grid(row=1, column=2, padx=5,
                                                                                                 pady=5)
+        self.create_criteria_inputs()
 
     def create_multiple_stars_inputs(self):
         """Create input form for multiple stars observation."""
@@ -246,6 +509,95 @@ class StarObservationApp:
                                                                                     "Enter number of stars..."))
         self.num_stars_entry.bind('<FocusOut>',
                                   lambda event: self.set_placeholder(self.num_stars_entry, "Enter number of stars..."))
+        self.create_criteria_inputs()
+
+    def create_criteria_inputs(self):
+        """Minimum altitude and maximum airmass a star must meet to count as observable."""
+        tk.Label(self.dynamic_frame, text="Min Altitude (\u00b0):").grid(row=4, column=0, padx=5, pady=5)
+        self.min_alt_entry = tk.Entry(self.dynamic_frame, width=5)
+        self.min_alt_entry.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
+        self.min_alt_entry.insert(0, "0")
+        airmass_frame = tk.Frame(self.dynamic_frame)
+        airmass_frame.grid(row=4, column=2, padx=5, pady=5)
+        tk.Label(airmass_frame, text="Max Airmass:").pack(side=tk.LEFT)
+        self.max_airmass_entry = tk.Entry(airmass_frame, width=5)  # blank: no limit
+        self.max_airmass_entry.pack(side=tk.LEFT)
+
+    def read_criteria(self):
+        """(min altitude, max airmass or None) from the criteria entries."""
+        max_airmass = self.max_airmass_entry.get().strip()
+        return float(self.min_alt_entry.get() or 0), float(max_airmass) if max_airmass else None
+
+    def create_planner_inputs(self):
+        """Create input form for planning observations over a date range."""
+        self.input_common()
+        tk.Label(self.dynamic_frame, text="Stars:").grid(row=1, column=0, padx=5, pady=5)
+        self.planner_stars_entry = tk.Entry(self.dynamic_frame, fg='gray', width=40)
+        self.planner_stars_entry.grid(row=1, column=1, columnspan=2, padx=5, pady=5)
+        self.planner_stars_entry.insert(0, "Comma-separated star names...")
+        self.planner_stars_entry.bind('<FocusIn>', lambda event: self.clear_placeholder(
+            self.planner_stars_entry, "Comma-separated star names..."))
+        self.planner_stars_entry.bind('<FocusOut>', lambda event: self.set_placeholder(
+            self.planner_stars_entry, "Comma-separated star names..."))
+
+        tk.Label(self.dynamic_frame, text="End Date:").grid(row=4, column=0, padx=5, pady=5)
+        self.end_date_entry = tk.Entry(self.dynamic_frame, fg='gray')
+        self.end_date_entry.grid(row=4, column=1, padx=5, pady=5)
+        self.end_date_entry.insert(0, "YYYY-MM-DD")
+        self.end_date_entry.bind('<FocusIn>', lambda event: self.clear_placeholder(self.end_date_entry,
+                                                                                  "YYYY-MM-DD"))
+        self.end_date_entry.bind('<FocusOut>',
+                                 lambda event: self.set_placeholder(self.end_date_entry, "YYYY-MM-DD"))
+
+        tk.Label(self.dynamic_frame, text="Step:").grid(row=5, column=0, padx=5, pady=5)
+        step_frame = tk.Frame(self.dynamic_frame)
+        step_frame.grid(row=5, column=1, pady=5)
+        self.step_entry = tk.Entry(step_frame, width=5)
+        self.step_entry.insert(0, "30")
+        self.step_entry.pack(side=tk.LEFT)
+        self.step_unit = ttk.Combobox(step_frame, values=list(STEP_UNITS), width=8, state="readonly")
+        self.step_unit.set("minutes")
+        self.step_unit.pack(side=tk.LEFT, padx=5)
+
+    def create_network_inputs(self):
+        """Planner form plus a list of further sites; date and time are UTC."""
+        self.create_planner_inputs()
+        placeholder = "Name lat lon; Name lat lon..."
+        tk.Label(self.dynamic_frame, text="Other Sites:").grid(row=6, column=0, padx=5, pady=5)
+        self.sites_entry = tk.Entry(self.dynamic_frame, fg='gray', width=40)
+        self.sites_entry.grid(row=6, column=1, columnspan=2, padx=5, pady=5)
+        self.sites_entry.insert(0, placeholder)
+        self.sites_entry.bind('<FocusIn>', lambda event: self.clear_placeholder(self.sites_entry, placeholder))
+        self.sites_entry.bind('<FocusOut>', lambda event: self.set_placeholder(self.sites_entry, placeholder))
+
+    def create_live_inputs(self):
+        """Location and stars for the live view; without star names, catalog stars up to a magnitude."""
+        self.input_common()
+        placeholder = "Comma-separated star names (blank: catalog)..."
+        tk.Label(self.dynamic_frame, text="Stars:").grid(row=1, column=0, padx=5, pady=5)
+        self.planner_stars_entry = tk.Entry(self.dynamic_frame, fg='gray', width=40)
+        self.planner_stars_entry.grid(row=1, column=1, columnspan=2, padx=5, pady=5)
+        self.planner_stars_entry.insert(0, placeholder)
+        self.planner_stars_entry.bind('<FocusIn>', lambda event: self.clear_placeholder(
+            self.planner_stars_entry, placeholder))
+        self.planner_stars_entry.bind('<FocusOut>', lambda event: self.set_placeholder(
+            self.planner_stars_entry, placeholder))
+
+        tk.Label(self.dynamic_frame, text="Magnitude Limit:").grid(row=4, column=0, padx=5, pady=5)
+        self.max_mag_entry = tk.Entry(self.dynamic_frame, width=5)
+        self.max_mag_entry.insert(0, "6.0")
+        self.max_mag_entry.grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
+
+    def parse_sites(self):
+        """Sites from the "Other Sites" entry ("Name lat lon; ..."); ValueError if malformed."""
+        sites = []
+        if self.sites_entry.cget("fg") == "gray":
+            return sites  # still showing the placeholder
+        for part in self.sites_entry.get().split(";"):
+            if part.strip():
+                name, lat, lon = part.rsplit(None, 2)
+                sites.append(Site(name, float(lat), float(lon), None))
+        return sites
 
     def input_common(self):
         tk.Label(self.dynamic_frame, text='Location:').grid(row=0, column=0, padx=5, pady=5)
@@ -316,6 +668,8 @@ class StarObservationApp:
         self.cal_popup = tk.Toplevel(self.root)
         self.cal_popup.title("Select Date")
         self.cal_popup.geometry("300x300")
+        from tkcalendar import Calendar
+
         self.cal = Calendar(self.cal_popup, selectmode="day")
         self.cal.pack(fill=tk.BOTH, expand=True)
         tk.Button(self.cal_popup, text="OK", command=self.choose_calendar).pack(pady=10)
@@ -340,13 +694,21 @@ class StarObservationApp:
 
     def open_map_popup(self):
         """Open a pop-up map for selecting location."""
+        if self.map_window is not None and self.map_window.winfo_exists():
+            # Reuse the widget and its in-memory tiles instead of rebuilding the map
+            self.map_window.deiconify()
+            self.map_window.lift()
+            return
+        if self.tile_store is None:
+            self.tile_store = TileStore()
         self.map_window = tk.Toplevel(self.root)
         self.map_window.title("Select Location on Map")
         self.map_window.geometry("600x450")
+        self.map_window.protocol("WM_DELETE_WINDOW", self.map_window.withdraw)
 
-        self.map_widget = TkinterMapView(self.map_window, width=600, height=400)
+        self.map_widget = map_view_class()(self.map_window, width=600, height=400, tile_store=self.tile_store)
         self.map_widget.pack(fill=tk.BOTH, expand=True)
-        user_lat, user_lon = self.get_user_location()
+        user_lat, user_lon = self.user_location
         self.map_widget.set_position(user_lat, user_lon, zoom=13)
         self.map_widget.add_left_click_map_command(self.on_map_click)
 
@@ -373,279 +735,382 @@ class StarObservationApp:
             reset_view=True,
             update_map=True,
         )
-        # Reverse geocode to get city and country
-        geolocator = Nominatim(user_agent="novaspace")
-        location = geolocator.reverse((self.clicked_lat, self.clicked_lon), language="en")
-        if location and location.raw.get("address"):
-            address = location.raw["address"]
-            city = address.get("city", "Unknown City")
-            country = address.get("country", "Unknown Country")
-            self.city_country = f"{city}, {country}"
-        else:
-            self.city_country = "Unknown Location"
-
-        # Update the map marker
+        # Place the marker now; the city name fills in when the lookup returns
+        self.city_country = "Locating..."
         if self.current_marker:
             self.map_widget.delete(self.current_marker)
         self.current_marker = self.map_widget.set_marker(
             self.clicked_lat,
             self.clicked_lon,
-            text=f"{self.city_country}\nLat: {self.clicked_lat:.4f}, Lon: {self.clicked_lon:.4f}",
+            text=self.marker_text(),
         )
+        # Only the latest click matters; drop a lookup that has not started yet
+        if self.geocode_job is not None:
+            self.geocode_job.cancel()
+        lat, lon = self.clicked_lat, self.clicked_lon
+        self.geocode_job = self.geocoding.submit(Job(
+            "Reverse geocoding",
+            lambda job: self.geocoder.lookup(lat, lon),
+            on_done=lambda label: self.show_location(lat, lon, label),
+        ))
+
+    def marker_text(self):
+        return f"{self.city_country}\nLat: {self.clicked_lat:.4f}, Lon: {self.clicked_lon:.4f}"
+
+    def show_location(self, lat, lon, label):
+        """Label the marker once reverse geocoding finishes (UI thread)."""
+        if (lat, lon) != (self.clicked_lat, self.clicked_lon):
+            return  # the user has clicked somewhere else since
+        self.city_country = label or "Unknown Location"
+        if self.current_marker:
+            self.current_marker.set_text(self.marker_text())
 
-    def select_random_star(self, n=1, obs=False):
+    def select_random_star(self):
         """Select a random star."""
         try:
-            if n == 1:
-                custom_simbad = Simbad()
-                custom_simbad.TIMEOUT = 10
-                custom_simbad.ROW_LIMIT = 50
-                query_result = custom_simbad.query_criteria("cat=HIP")
-                if query_result is None or len(query_result) == 0:
-                    messagebox.showerror("Error", "No stars found in Simbad database.")
-                    return
-                random_star = random.choice(query_result["MAIN_ID"])
-                self.star_entry.delete(0, tk.END)
-                self.star_entry.insert(0, random_star)
-                self.star_entry.config(fg='black')
-                return random_star
-            elif n != 1 & obs == False:
-                if n > 50:
-                    messagebox.showerror("Error",
-                                         "Number of stars cannot be greater than 50\n Please try again with a lower number of stars.")
-                    return ValueError
-                custom_simbad = Simbad()
-                custom_simbad.TIMEOUT = 10
-                custom_simbad.ROW_LIMIT = n
-                query_result = custom_simbad.query_criteria("cat=HIP")
-                return query_result["MAIN_ID"]
-            elif n != 1 & obs == True:
-                if n > 50:
-                    messagebox.showerror("Error",
-                                         "Number of stars cannot be greater than 50\n Please try again with a lower number of stars.")
-                    return ValueError
-                custom_simbad = Simbad()
-                custom_simbad.TIMEOUT = 10
-                custom_simbad.ROW_LIMIT = 50
-                query_result = custom_simbad.query_criteria("cat=HIP")
-                return query_result["MAIN_ID"]
-
+            random_star = self.pipeline.random_stars(1)[0]
+            self.star_entry.delete(0, tk.END)
+            self.star_entry.insert(0, random_star)
+            self.star_entry.config(fg='black')
+            return random_star
         except Exception as e:
             messagebox.showerror("Error", f"Failed to fetch random star.\n{e}")
 
-    def timezone_offset(self):
-        tf = TimezoneFinder()
-        timezone_str = tf.timezone_at(lng=self.clicked_lon, lat=self.clicked_lat)
-        if timezone_str:
-            timezone = pytz.timezone(timezone_str)
-            offset = datetime.now(timezone).utcoffset().total_seconds() / 3600
-            return offset
-        return 0
+    def timezone_label(self, offset):
+        return "GMT +" + str(offset) if offset > 0 else "GMT " + str(offset)
 
     def calculate_observation(self):
-        """Perform observation calculations."""
+        """Queue an observation calculation on the background worker."""
         try:
+            # The entries hold the map click too, so typed coordinates work the same way
             lat = float(self.lat_entry.get())
+            lon = float(self.lon_entry.get())
+            if self.options.get() == "Live Sky":
+                self.start_live_sky(lat, lon)  # always "now": the date and time fields are not used
+                return
             date = self.date_entry.get()
             time = [int(self.hours.get()), int(self.minutes.get()), int(self.seconds.get())]
-            self.lct_observer = time[0] + time[1] / 60 + time[2] / 3600
-            self.JD = self.JulianDay(date, time)
+            lct_observer = time[0] + time[1] / 60 + time[2] / 3600
+            JD = JulianDay(date, time)
             if self.options.get() == "Single Star":
+                if self.star_entry.cget("fg") == "gray":
+                    messagebox.showerror("Error", "Enter a star name or pick a random star.")
+                    return
                 star_name = self.star_entry.get()
-                star = SkyCoord.from_name(star_name)
-                ra = star.ra.hour
-                dec = star.dec.degree
-
-                lst_rise, lst_set = self.obs_star(lat, ra, dec)
-                self.process_single_star(star_name, lst_rise, lst_set)
+                criteria = self.read_criteria()
+                self.submit_run(Job(
+                    star_name,
+                    lambda job: self.process_single_star(job, star_name, lat, lon, JD, lct_observer, criteria),
+                    on_done=self.show_single_star,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to fetch star coordinates.\n{e}"),
+                ))
             elif self.options.get() == "Multiple Stars":
-                self.obs = self.obs_only.get() == 1
+                obs = self.obs_only.get() == 1
                 num_stars = int(self.num_stars_entry.get())
-                stars = self.select_random_star(num_stars)
-                self.process_multiple_stars(lat, stars, date, time)
+                criteria = self.read_criteria()
+                if self.pipeline.catalog is None and num_stars > 50:
+                    messagebox.showerror("Error",
+                                         "Number of stars cannot be greater than 50\n Please try again with a lower number of stars.")
+                    return
+                view = {}  # result window state, filled in on the Tk thread
+                self.submit_run(Job(
+                    f"{num_stars} stars",
+                    lambda job: self.process_multiple_stars(job, view, lat, lon, num_stars, obs, date, time, JD,
+                                                            lct_observer, criteria),
+                    on_done=lambda timezone: self.finish_multiple_stars(view, lct_observer, timezone, obs),
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to process stars.\n{e}"),
+                ))
+            elif self.options.get() == "Site Network":
+                stars = self._entered_stars()
+                if not stars:
+                    messagebox.showerror("Error", "Enter at least one star name.")
+                    return
+                sites = [Site("Selected location", lat, lon, None)] + self.parse_sites()
+                start = datetime.strptime(date, "%Y-%m-%d").replace(hour=time[0], minute=time[1], second=time[2])
+                end = datetime.strptime(self.end_date_entry.get(), "%Y-%m-%d").replace(
+                    hour=time[0], minute=time[1], second=time[2])
+                step = int(self.step_entry.get())
+                unit = self.step_unit.get()
+                self.submit_run(Job(
+                    f"{len(sites)} sites x {len(stars)} stars",
+                    lambda job: self.process_network(job, stars, sites, start, end, step, unit),
+                    on_done=self.show_network,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to plan observations.\n{e}"),
+                ))
+            elif self.options.get() == "Night Planner":
+                stars = self._entered_stars()
+                if not stars:
+                    messagebox.showerror("Error", "Enter at least one star name.")
+                    return
+                start = datetime.strptime(date, "%Y-%m-%d").replace(hour=time[0], minute=time[1], second=time[2])
+                end = datetime.strptime(self.end_date_entry.get(), "%Y-%m-%d").replace(
+                    hour=time[0], minute=time[1], second=time[2])
+                step = int(self.step_entry.get())
+                unit = self.step_unit.get()
+                self.submit_run(Job(
+                    f"Plan {len(stars)} stars",
+                    lambda job: self.process_planner(job, stars, lat, lon, start, end, step, unit),
+                    on_done=self.show_planner,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to plan observations.\n{e}"),
+                ))
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input.\n{e}")
 
-    def obs_star(self, lat, right_ascension, delta):
-        Ar = math.sin(math.radians(delta)) / math.cos(math.radians(lat))
-        H1 = math.tan(math.radians(delta)) * math.tan(math.radians(lat))
-        if abs(Ar) < 1 and abs(H1) < 1:
-            h = math.degrees(math.acos(-H1)) / 15
-            rise = (24 + right_ascension - h) % 24
-            set_time = (right_ascension + h) % 24
-            return rise, set_time
+    def _entered_stars(self):
+        """Names typed in the comma-separated star entry; none while it shows its placeholder."""
+        if self.planner_stars_entry.cget("fg") == "gray":
+            return []
+        return [name.strip() for name in self.planner_stars_entry.get().split(",") if name.strip()]
+
+    def start_live_sky(self, lat, lon):
+        stars = self._entered_stars()
+        max_mag = float(self.max_mag_entry.get())
+        if not stars and self.pipeline.catalog is None:
+            messagebox.showerror("Error", "Enter star names, or import a catalog to watch all stars.")
+            return
+        self.submit_run(Job(
+            "Live sky",
+            lambda job: self.process_live_sky(job, stars, lat, lon, max_mag),
+            on_done=self.show_live_sky,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to start the live view.\n{e}"),
+        ))
+
+    def submit_run(self, job):
+        """Queue a calculation, instrumented when run statistics are switched on."""
+        stats = Stats(job.title, profile=self.profile_runs.get()) if self.record_stats.get() else NULL_STATS
+        fn, on_done = job.fn, job.on_done
+
+        def work(job):
+            self.pipeline.stats = stats
+            try:
+                with stats.profiling():
+                    return fn(job)
+            finally:
+                self.pipeline.stats = NULL_STATS
+
+        def done(result):
+            on_done(result)
+            self.show_run_stats(stats)
+
+        job.fn, job.on_done = work, done
+        return self.jobs.submit(job)
+
+    def show_run_stats(self, stats):
+        """Log a finished run's statistics and show them in a small window."""
+        if not stats.enabled:
+            return
+        stats.stop()
+        stats.write_log()
+        window = tk.Toplevel(self.root)
+        window.title("Run Statistics")
+        text = tk.Text(window, width=90, height=30, font=("Courier", 10))
+        text.insert(tk.END, stats.report())
+        if stats.profile_text:
+            text.insert(tk.END, "\n\n" + stats.profile_text)
+        text.config(state=tk.DISABLED)
+        text.pack(fill=tk.BOTH, expand=True)
+
+    def process_single_star(self, job, star_name, lat, lon, JD, lct_observer, criteria):
+        """Process a single star observation (runs on the job worker)."""
+        star = self.pipeline.single_star(star_name, self.pipeline.epoch(lat, lon, JD, lct_observer), *criteria)
+        status = "Observable" if star.observable else "Unobservable"
+        job.report(1, 1)
+        position = star.alt, star.az, star.airmass
+        return star_name, lct_observer, star.lct_rise, star.lct_set, status, self.timezone_label(star.offset), position
+
+    def show_single_star(self, result):
+        """Display a single star observation."""
+        star_name, lct_observer, lct_rise, lct_set, status, timezone, (alt, az, airmass) = result
+        lct_obs = convert_dec_to_hours(lct_observer)
+        if np.isnan(lct_rise):
+            # Above the horizon all day or never; the altitude tells which
+            lct_rise = lct_set = "Circumpolar" if alt >= 0 else "Never rises"
         else:
-            return None, None
-
-    def JulianDay(self, date, time):
-        hour = time[0]
-        minute = time[1]
-        second = time[2]
-        year = int(date.split("-")[0])
-        month = int(date.split("-")[1])
-        day = int(date.split("-")[2])
-        if year < -4712:
-            messagebox.showerror("Error", "Year must be higher than -4712.")
-        if (month < 1 or month > 12) or (day <= 0):
-            messagebox.showerror("Error", "Invalid month or day.")
-
-        if month < 3:
-            month += 12
-            year -= 1
-
-        A = int(year / 100)
-        B = 2 - A + int(A / 4)
-        JD = (1720994.5 + int(365.25 * year) + int(30.6001 * (month + 1)) + day + B
-              + (hour + minute / 60 + second / 3600) / 24)
-        return JD
-
-    def lst_to_lct(self, lst, JD, offset):
-        gst = lst - (self.clicked_lon / 15)
-        gst %= 24
-        S = JD - 2451545.0
-        T = S / 36525.0
-        gst_0 = 6.697374558 + (2400.051336 * T) + (0.000025862 * T ** 2)
-        gst_0 %= 24
-        ut = (gst - gst_0) * 0.9972695663
-        if ut < 0:
-            ut += 24
-        lct = ut + offset
-        lct %= 24
-        return lct
-
-    def is_observe(self, LCT_observer, LCT_rise, LCT_set):
-        return LCT_rise <= LCT_observer <= LCT_set
-
-    def convert_dec_to_hours(self, decimal_time):
-        hours = int(decimal_time)
-        minutes = int((decimal_time - hours) * 60)
-        seconds = int(((decimal_time - hours) * 60 - minutes) * 60)
-        return f"{hours:02}:{minutes:02}:{seconds:02}"
-
-    def process_single_star(self, star_name, lst_rise, lst_set):
-        """Process a single star observation."""
-        try:
-            lct_rise = self.lst_to_lct(lst_rise, self.JD, self.timezone_offset())
-            lct_set = self.lst_to_lct(lst_set, self.JD, self.timezone_offset())
-            is_observe = "Observable" if self.is_observe(self.lct_observer, lct_rise, lct_set) else "Unobservable"
-            timezone = "GMT +" + str(self.timezone_offset()) if self.timezone_offset() > 0 else "GMT " + str(
-                self.timezone_offset())
-            lct_obs = self.convert_dec_to_hours(self.lct_observer)
-            lct_set = self.convert_dec_to_hours(lct_set)
-            lct_rise = self.convert_dec_to_hours(lct_rise)
-            result_window = tk.Toplevel(self.root)
-            result_window.title("Observation")
-            result_window.geometry("400x300")
-            bg_color = "#2C3E50"  # Dark blue-gray background
-            result_window.configure(bg=bg_color)
-            heading = tk.Label(
-                result_window,
-                text=f"{star_name} Observability",
-                font=("Helvetica", 16, "bold"),
-                fg="#ECF0F1",  # Light text color
-                bg=bg_color
-            )
-            heading.pack(pady=10)
-
-            details = (
-
-                f"Local Observation Time: {lct_obs} ({timezone})\n"
-                f"Rise Time: {lct_rise} ({timezone})\n"
-                f"Set Time: {lct_set} ({timezone})"
-            )
-            details_label = tk.Label(
-                result_window,
-                text=details,
-                justify="left",
-                wraplength=350,
-                fg="#ECF0F1",  # Light text color
-                bg=bg_color,  # Matches background
-                font=("Helvetica", 12)
-            )
-            details_label.pack(pady=10)
-            observability_color = "#27AE60" if is_observe == "Observable" else "#E74C3C"
-            observability_label = tk.Label(
-                result_window,
-                text=f"Observability: {is_observe}",
-                font=("Helvetica", 12, "bold"),
-                fg=observability_color,
-                bg=bg_color
-            )
-            observability_label.pack(pady=10)
-
-            close_button = tk.Button(
-                result_window,
-                text="Close",
-                command=result_window.destroy,
-                bg="#2980B9",  # Blue button
-                fg="white",  # White text on button
-                font=("Helvetica", 12, "bold")
-            )
-            close_button.pack(pady=10)
+            lct_set = convert_dec_to_hours(lct_set)
+            lct_rise = convert_dec_to_hours(lct_rise)
+        result_window = tk.Toplevel(self.root)
+        result_window.title("Observation")
+        result_window.geometry("400x340")
+        bg_color = "#2C3E50"  # Dark blue-gray background
+        result_window.configure(bg=bg_color)
+        heading = tk.Label(
+            result_window,
+            text=f"{star_name} Observability",
+            font=("Helvetica", 16, "bold"),
+            fg="#ECF0F1",  # Light text color
+            bg=bg_color
+        )
+        heading.pack(pady=10)
 
+        details = (
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to fetch star coordinates.\n{e}")
-
-    def process_multiple_stars(self, lat, stars, date, time):
-        """Process multiple stars observation."""
-        try:
-            data = []
-            timezone = "GMT +" + str(self.timezone_offset()) if self.timezone_offset() > 0 else "GMT " + str(
-                self.timezone_offset())
-            messagebox.showinfo("Observating...",
-                                f"Processing {len(stars)} stars\n This may take a while\n Please Wait.")
-            if self.obs == False:
-                for star in stars:
-                    ra = SkyCoord.from_name(star).ra.hour
-                    dec = SkyCoord.from_name(star).dec.degree
-                    lst_rise, lst_set = self.obs_star(lat, ra, dec)
-                    lct_rise = self.lst_to_lct(lst_rise, self.JD, self.timezone_offset())
-                    lct_set = self.lst_to_lct(lst_set, self.JD, self.timezone_offset())
-                    is_observe = "Observable" if self.is_observe(self.lct_observer, lct_rise,
-                                                                 lct_set) else "Unobservable"
-                    lct_rise = self.convert_dec_to_hours(lct_rise)
-                    lct_set = self.convert_dec_to_hours(lct_set)
-                    lct_obs = self.convert_dec_to_hours(self.lct_observer)
-                    data.append([star, lct_rise, lct_obs, lct_set, is_observe])
-            else:
-                for star in stars:
-                    ra = SkyCoord.from_name(star).ra.hour
-                    dec = SkyCoord.from_name(star).dec.degree
-                    lst_rise, lst_set = self.obs_star(lat, ra, dec)
-                    lct_rise = self.lst_to_lct(lst_rise, self.JD, self.timezone_offset())
-                    lct_set = self.lst_to_lct(lst_set, self.JD, self.timezone_offset())
-                    observable = self.is_observe(self.lct_observer, lct_rise, lct_set)
-                    lct_rise = self.convert_dec_to_hours(lct_rise)
-                    lct_set = self.convert_dec_to_hours(lct_set)
-                    lct_obs = self.convert_dec_to_hours(self.lct_observer)
-                    if observable == True:
-                        data.append([star, lct_rise, lct_obs, lct_set, "Observable"])
-
-            if data == []:
-                messagebox.showinfo("Observation",
-                                    f"No stars are observable at {self.lct_observer} {timezone}")
-                return
-            else:
-                # Create a new window for displaying results
-                result_window = tk.Toplevel(self.root)
-                result_window.geometry("1200x600")
-                result_window.title(f"Stars Observation Results in {time[0]}:{time[1]}:{time[2]} {timezone} at {date}")
-
-                # Create a Treeview widget
-                tree = ttk.Treeview(result_window,
-                                    columns=("Star", "LCT Rise", "LCT Observer", "LCT Set", "Observability"),
-                                    show='headings')
-                tree.heading("Star", text="Star")
-                tree.heading("LCT Rise", text=f"LCT Rise ({timezone})")
-                tree.heading("LCT Observer", text=f"LCT Observer ({timezone})")
-                tree.heading("LCT Set", text=f"LCT Set ({timezone})")
-                tree.heading("Observability", text="Observability")
-                for star_data in data:
-                    tree.insert("", tk.END, values=star_data)
-                tree.pack(expand=True, fill=tk.BOTH)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process stars.\n{e}")
+            f"Local Observation Time: {lct_obs} ({timezone})\n"
+            f"Rise Time: {lct_rise} ({timezone})\n"
+            f"Set Time: {lct_set} ({timezone})\n"
+            f"Altitude: {alt:.1f}\u00b0  Azimuth: {az:.1f}\u00b0  Airmass: {airmass:.2f}"
+        )
+        details_label = tk.Label(
+            result_window,
+            text=details,
+            justify="left",
+            wraplength=350,
+            fg="#ECF0F1",  # Light text color
+            bg=bg_color,  # Matches background
+            font=("Helvetica", 12)
+        )
+        details_label.pack(pady=10)
+        observability_color = "#27AE60" if status == "Observable" else "#E74C3C"
+        observability_label = tk.Label(
+            result_window,
+            text=f"Observability: {status}",
+            font=("Helvetica", 12, "bold"),
+            fg=observability_color,
+            bg=bg_color
+        )
+        observability_label.pack(pady=10)
+
+        close_button = tk.Button(
+            result_window,
+            text="Close",
+            command=result_window.destroy,
+            bg="#2980B9",  # Blue button
+            fg="white",  # White text on button
+            font=("Helvetica", 12, "bold")
+        )
+        close_button.pack(pady=10)
+
+    def process_multiple_stars(self, job, view, lat, lon, num_stars, obs, date, time, JD, lct_observer,
+                               criteria):
+        """Process multiple stars observation in chunks (runs on the job worker)."""
+        stats = self.pipeline.stats
+        epoch = self.pipeline.epoch(lat, lon, JD, lct_observer)
+        stars = self.pipeline.select_stars(num_stars, obs, epoch)
+        timezone = self.timezone_label(epoch.offset)
+        lct_obs = convert_dec_to_hours(lct_observer)
+        title = f"Stars Observation Results in {time[0]}:{time[1]}:{time[2]} {timezone} at {date}"
+        job.report(0, len(stars))
+        for start in range(0, len(stars), self.chunk_size):
+            job.check()
+            chunk = stars[start:start + self.chunk_size]
+            ra, dec, result = self.pipeline.evaluate(chunk, epoch, *criteria)
+            job.post(self.show_star_results, view, chunk, ra, dec, result, title, timezone, lct_obs, obs, stats)
+            job.report(start + len(chunk))
+        return timezone
+
+    def show_star_results(self, view, stars, ra, dec, result, title, timezone, lct_obs, obs, stats):
+        """Add a chunk of results, opening the result window on the first chunk."""
+        if "table" not in view:
+            view["table"] = ResultTable(self.root, self.jobs, title, timezone, lct_obs,
+                                        show="Observable" if obs else "All")
+            view["table"].stats = stats
+        view["table"].append(stars, ra, dec, result)
+
+    def finish_multiple_stars(self, view, lct_observer, timezone, obs):
+        table = view.get("table")
+        if table is not None:
+            table.refresh()
+            table.stats = NULL_STATS  # later sorting and paging is not part of the run
+        if table is None or (obs and not table.results.data["observable"].any()):
+            messagebox.showinfo("Observation",
+                                f"No stars are observable at {lct_observer} {timezone}")
+
+    def process_planner(self, job, stars, lat, lon, start, end, step, unit):
+        """Find visible windows of each star over a date range (runs on the job worker)."""
+        epochs = epoch_grid(start, end, step, unit, lat, lon, timezones=self.pipeline.timezones)
+        ra, dec = self.pipeline.star_coordinates(stars)
+        job.report(0, len(stars))
+        rows = []
+        for windows in plan_windows(ra, dec, lat, lon, epochs):
+            job.check()
+            for i in range(len(windows.star)):
+                rise, transit, set_time = windows.rise[i], windows.transit[i], windows.set[i]
+                rows.append([
+                    stars[windows.star[i]],
+                    epochs.times[windows.start[i]].strftime("%Y-%m-%d %H:%M"),
+                    epochs.times[windows.end[i]].strftime("%Y-%m-%d %H:%M"),
+                    "Circumpolar" if np.isnan(rise) else convert_dec_to_hours(rise),
+                    convert_dec_to_hours(transit),
+                    "Circumpolar" if np.isnan(set_time) else convert_dec_to_hours(set_time),
+                ])
+        job.report(len(stars))
+        return rows, self.timezone_label(epochs.offset[0])
+
+    def show_planner(self, result):
+        """Display the visible windows found by the planner."""
+        rows, timezone = result
+        if not rows:
+            messagebox.showinfo("Observation", "No visible windows in the selected date range.")
+            return
+        result_window = tk.Toplevel(self.root)
+        result_window.geometry("1200x600")
+        result_window.title(f"Visible Windows ({timezone})")
+        columns = ("Star", "From", "To", "Rise", "Transit", "Set")
+        tree = ttk.Treeview(result_window, columns=columns, show='headings')
+        for column in columns:
+            tree.heading(column, text=f"{column} ({timezone})" if column != "Star" else column)
+        for row in rows:
+            tree.insert("", tk.END, values=row)
+        tree.pack(expand=True, fill=tk.BOTH)
+
+    def process_live_sky(self, job, stars, lat, lon, max_mag):
+        """Current rise/set state of the stars (runs on the job worker)."""
+        catalog = self.pipeline.catalog
+        if stars:
+            names = stars
+            ra, dec = self.pipeline.star_coordinates(stars)
+        else:
+            idx = catalog.head(None, max_mag)
+            names = catalog.names(idx)
+            ra, dec = catalog.ra[idx], catalog.dec[idx]
+        now = time.time()
+        JD_ut = now / 86400 + UNIX_EPOCH_JD
+        # The service wants the local JD; one refinement gets DST changes right
+        guess = self.pipeline.timezone_offset(lat, lon, JD_ut)
+        offset = self.pipeline.timezone_offset(lat, lon, JD_ut + guess / 24)
+        job.report(len(names), len(names))
+        return names, LiveSky(ra, dec, lat, lon, now), offset
+
+    def show_live_sky(self, result):
+        names, sky, offset = result
+        LiveSkyWindow(self.root, names, sky, offset, self.timezone_label(offset))
+
+    def process_network(self, job, stars, sites, start, end, step, unit):
+        """Best visible window of each star at each site (runs on the job worker)."""
+        epochs = network_epochs(sites, start, end, step, unit, self.pipeline.timezones)
+        ra, dec = self.pipeline.star_coordinates(stars)
+        step_hours = (STEP_UNITS[unit] * step).total_seconds() / 3600
+        job.report(0, len(stars))
+        rows = []
+        for windows in best_windows(ra, dec, sites, epochs):
+            job.check()
+            for i in range(len(windows.site)):
+                first, last = windows.start[i], windows.end[i]
+                rows.append([
+                    sites[windows.site[i]].name,
+                    stars[windows.star[i]],
+                    epochs.times[first].strftime("%Y-%m-%d %H:%M"),
+                    epochs.times[last].strftime("%Y-%m-%d %H:%M"),
+                    f"{(last - first) * step_hours:.1f}",
+                ])
+        job.report(len(stars))
+        rows.sort(key=lambda row: (row[0], row[2]))
+        return rows
+
+    def show_network(self, rows):
+        """Display the best window of each star at each site."""
+        if not rows:
+            messagebox.showinfo("Observation", "No site sees any of the stars in the selected date range.")
+            return
+        result_window = tk.Toplevel(self.root)
+        result_window.geometry("1000x600")
+        result_window.title("Best Windows per Site (UTC)")
+        columns = ("Site", "Star", "From (UTC)", "To (UTC)", "Hours")
+        tree = ttk.Treeview(result_window, columns=columns, show='headings')
+        for column in columns:
+            tree.heading(column, text=column)
+        for row in rows:
+            tree.insert("", tk.END, values=row)
+        tree.pack(expand=True, fill=tk.BOTH)
 
     def reset_inputs(self):
         """Reset all inputs and results."""
@@ -654,6 +1119,18 @@ class StarObservationApp:
 
 
 # Run the application
-root = tk.Tk()
-app = StarObservationApp(root)
-root.mainloop()
+if __name__ == "__main__":
+    startup = StartupTimer(START)
+    startup.mark("imports")
+    root = tk.Tk()
+    startup.mark("Tk root")
+    app = StarObservationApp(root)
+    startup.mark("app init")
+    if "--startup-report" in sys.argv:
+        def report_startup():
+            root.update_idletasks()
+            startup.mark("first window")
+            print(startup.report())
+
+        root.after_idle(report_startup)
+    root.mainloop()
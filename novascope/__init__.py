@@ -0,0 +1,5 @@
+"""Headless NovaScope core used by the Tk application."""
+import os
+
+# Persistent caches (resolver, catalogs, tiles...) live here.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".novascope")
@@ -0,0 +1,3 @@
+from novascope.cli import main
+
+main()
@@ -0,0 +1,402 @@
+"""Benchmarks for the astronomy kernels, batch paths and GUI flows.
+
+Network pieces are replaced by deterministic stand-ins: names resolve to
+coordinates derived from a hash of the name, random stars come from a
+seeded synthetic catalog, and timezones follow 15 degree longitude
+bands. Results are written as JSON and can be compared against a saved
+baseline:
+
+    python -m novascope.bench -o baseline.json
+    python -m novascope.bench --baseline baseline.json
+"""
+import argparse
+import itertools
+import json
+import math
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from novascope.catalog import build_catalog
+from novascope.engine import (JulianDay, convert_dec_to_hours, epoch_context, is_observe, lct_to_lst, lst_to_lct,
+                              obs_star, obs_star_batch, observability)
+from novascope.horizon import horizontal
+from novascope.hourangle import build_table
+from novascope.httpclient import make_session
+from novascope.live import LiveSky
+from novascope.pipeline import Pipeline
+from novascope.resolver import ResolverCache, SesameResolver, simbad_batch_resolver
+from novascope.results import ResultSet
+from novascope.runcache import RunCache
+from novascope.timezones import TimezoneService
+
+DEFAULT_SIZES = (10, 1000, 100000, 1000000, 10000000)
+FLOW_SIZES = (10, 1000, 100000)
+CHUNK_SIZE = 200  # same chunking as the GUI multi-star job
+SITE = (-7.95, 112.61)
+DATE, TIME = "2024-10-01", [20, 30, 0]
+
+Benchmark = namedtuple("Benchmark", "name n setup")
+
+
+def stand_in_coordinates(name):
+    """Deterministic (RA hours, Dec degrees) for any name, uniform on the sky."""
+    h = zlib.crc32(str(name).encode())
+    u, v = (h & 0xFFFF) / 65536, (h >> 16) / 65536
+    return 24 * u, math.degrees(math.asin(2 * v - 1))
+
+
+def stand_in_resolver(name):
+    return (*stand_in_coordinates(name), [])
+
+
+def stand_in_batch_resolver(names):
+    return {name: stand_in_coordinates(name) for name in names}
+
+
+def stand_in_star_source(n):
+    return [f"BENCH {i}" for i in range(n)]
+
+
+class StandInTimezoneFinder:
+    """Fixed-offset zone of the nearest 15 degree meridian."""
+
+    def timezone_at(self, lng, lat):
+        return f"Etc/GMT{-round(lng / 15):+d}"
+
+
+class StandInServer:
+    """Local HTTP server answering Sesame and SIMBAD TAP lookups with ``stand_in_coordinates``.
+
+    Every answer is delayed by ``latency`` seconds, so the concurrent
+    resolution path can be measured against a realistic round-trip
+    without the network. Point ``SesameResolver`` at ``sesame_url`` and
+    ``simbad_batch_resolver`` at ``tap_url``.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.latency)
+                url = urlsplit(self.path)
+                if url.path == "/sesame":
+                    body, content_type = server.sesame(unquote(url.query)), "text/plain"
+                elif url.path == "/tap":
+                    body, content_type = server.tap(parse_qs(url.query)["QUERY"][0]), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self.sesame_url = base + "/sesame"
+        self.tap_url = base + "/tap"
+
+    @staticmethod
+    def sesame(name):
+        ra, dec = stand_in_coordinates(name)
+        return f"# {name}\n%J {ra * 15:.8f} {dec:+.8f}\n%I.0 {name}\n"
+
+    @staticmethod
+    def tap(query):
+        # Only the identifier list of simbad_batch_resolver's query is understood
+        names = [name.replace("''", "'") for name in re.findall(r"'((?:[^']|'')*)'", query.partition(" IN ")[2])]
+        rows = []
+        for name in names:
+            ra, dec = stand_in_coordinates(name)
+            rows.append([name, ra * 15, dec])
+        return json.dumps({"data": rows})
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def random_sky(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 24, n), np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+
+
+def make_pipeline(catalog=None, seed=0, cache=None):
+    resolver = ResolverCache(":memory:", resolver=stand_in_resolver, batch_resolver=stand_in_batch_resolver)
+    timezones = TimezoneService(finder=StandInTimezoneFinder())
+    return Pipeline(catalog, resolver, timezones, star_source=stand_in_star_source,
+                    rng=np.random.default_rng(seed), cache=cache)
+
+
+def make_catalog(n, path, seed=0):
+    ra, dec = random_sky(n, seed)
+    mag = np.random.default_rng(seed + 1).uniform(-1, 12, n)
+    return build_catalog(zip(range(1, n + 1), ra * 15, dec, mag), path)
+
+
+def multiple_stars(pipeline, n, obs, JD, lct_observer):
+    """The multi-star job of the GUI, minus the Tk table."""
+    epoch = pipeline.epoch(*SITE, JD, lct_observer)
+    stars = pipeline.select_stars(n, obs, epoch)
+    results = ResultSet()
+    for start in range(0, len(stars), CHUNK_SIZE):
+        chunk = stars[start:start + CHUNK_SIZE]
+        results.append(chunk, *pipeline.evaluate(chunk, epoch))
+    return results.data
+
+
+def benchmarks(sizes, workdir):
+    """All benchmarks; ``setup()`` does the untimed preparation and returns the timed call."""
+    lat, lon = SITE
+    JD = JulianDay(DATE, TIME)
+    lct_observer = TIME[0] + TIME[1] / 60 + TIME[2] / 3600
+    lst_rise, lst_set = obs_star(lat, 6.75, -16.7)
+    epoch = epoch_context(JD, lct_observer, lat, lon, 7)
+    yield Benchmark("kernel.JulianDay", 1, lambda: lambda: JulianDay(DATE, TIME))
+    yield Benchmark("kernel.obs_star", 1, lambda: lambda: obs_star(lat, 6.75, -16.7))
+    yield Benchmark("kernel.lst_to_lct", 1, lambda: lambda: lst_to_lct(lst_rise, JD, 7, lon))
+    yield Benchmark("kernel.lct_to_lst", 1, lambda: lambda: lct_to_lst(lct_observer, JD, 7, lon))
+    yield Benchmark("kernel.epoch_context", 1, lambda: lambda: epoch_context(JD, lct_observer, lat, lon, 7))
+    yield Benchmark("kernel.Epoch.lst_to_lct", 1, lambda: lambda: epoch.lst_to_lct(lst_rise))
+    yield Benchmark("kernel.is_observe", 1, lambda: lambda: is_observe(lct_observer, 18.2, 5.1))
+    yield Benchmark("kernel.convert_dec_to_hours", 1, lambda: lambda: convert_dec_to_hours(lct_observer))
+
+    def batch(fn, n):
+        def setup():
+            ra, dec = random_sky(n)
+            return lambda: fn(ra, dec)
+        return setup
+
+    tables = []
+
+    def table_batch(n):
+        # Hour angles interpolated from the precomputed table instead of trig; built once, on first use
+        def setup():
+            if not tables:
+                tables.append(build_table(f"{workdir}/hourangle.bin"))
+            ra, dec = random_sky(n)
+            return lambda: obs_star_batch(lat, ra, dec, tables[0].hour_angle(lat, dec))
+        return setup
+
+    for n in sizes:
+        yield Benchmark(f"batch.obs_star[{n}]", n, batch(lambda ra, dec: obs_star_batch(lat, ra, dec), n))
+        yield Benchmark(f"batch.obs_star.table[{n}]", n, table_batch(n))
+        yield Benchmark(f"batch.observability[{n}]", n,
+                        batch(lambda ra, dec: observability(ra, dec, lat, lon, JD, 7, lct_observer), n))
+        yield Benchmark(f"batch.horizontal[{n}]", n, batch(lambda ra, dec: horizontal(ra, dec, lat, lon, JD, 7), n))
+
+    flow_sizes = [n for n in FLOW_SIZES if n <= max(sizes)]
+    catalogs = []
+
+    def flow_catalog():
+        # Built on first use, so runs that select no catalog flow skip it
+        if not catalogs:
+            catalogs.append(make_catalog(max(flow_sizes), f"{workdir}/catalog"))
+        return catalogs[0]
+
+    # The catalog flows run at the FLOW_SIZES that fit within ``sizes``; none fit below the smallest
+    if flow_sizes:
+        def single_star(name):
+            def setup():
+                pipeline = make_pipeline(flow_catalog())
+                return lambda: pipeline.single_star(name, pipeline.epoch(lat, lon, JD, lct_observer))
+            return setup
+
+        yield Benchmark("flow.single_star.catalog", 1, single_star("HIP 1"))
+        yield Benchmark("flow.single_star.resolved", 1, single_star("Sirius"))
+
+        def repeated_single_star(minutes):
+            # Same star and site pressed again, ``minutes`` later each time (0: identical request)
+            def setup():
+                pipeline = make_pipeline(flow_catalog(), cache=RunCache())
+                later = itertools.count(0, minutes)
+
+                def press():
+                    minute = next(later)
+                    lct = (lct_observer + minute / 60) % 24
+                    return pipeline.single_star("Sirius", pipeline.epoch(lat, lon, JD + minute / 1440, lct))
+                return press
+            return setup
+
+        yield Benchmark("flow.single_star.cached", 1, repeated_single_star(0))
+        yield Benchmark("flow.single_star.new_time", 1, repeated_single_star(7))
+
+        def multi_star(n, obs):
+            def setup():
+                pipeline = make_pipeline(flow_catalog())
+                return lambda: multiple_stars(pipeline, n, obs, JD, lct_observer)
+            return setup
+
+        for n in flow_sizes:
+            yield Benchmark(f"flow.multiple_stars[{n}]", n, multi_star(n, False))
+            yield Benchmark(f"flow.multiple_stars.above_horizon[{n}]", n, multi_star(n, True))
+
+    def live_tick(n):
+        # One second per tick: the cost should follow the few crossings, not n
+        def setup():
+            sky = LiveSky(*random_sky(n), lat, lon, 1727800000.0)
+            return lambda: sky.tick(sky.now + 1)
+        return setup
+
+    for n in flow_sizes:
+        yield Benchmark(f"live.tick[{n}]", n, live_tick(n))
+
+    def uncatalogued(n):
+        # No offline catalog: Simbad-style names, resolved through a cold cache each run
+        def setup():
+            return lambda: multiple_stars(make_pipeline(), n, False, JD, lct_observer)
+        return setup
+
+    yield Benchmark("flow.multiple_stars.uncatalogued[50]", 50, uncatalogued(50))
+
+    servers = []
+
+    def resolve_over_http(n, batched):
+        # Cold cache against the local stand-in services, 20 ms per answer
+        def setup():
+            if not servers:
+                servers.append(StandInServer(latency=0.02))
+            server = servers[0]
+            session = make_session(cache_path=None)
+            resolver = SesameResolver(server.sesame_url, session=session)
+            batch = partial(simbad_batch_resolver, session=session, url=server.tap_url) if batched else None
+            names = stand_in_star_source(n)
+            return lambda: ResolverCache(":memory:", resolver=resolver, batch_resolver=batch).resolve_many(names)
+        return setup
+
+    yield Benchmark("flow.resolve_many.http[100]", 100, resolve_over_http(100, False))
+    yield Benchmark("flow.resolve_many.http.batched[100]", 100, resolve_over_http(100, True))
+    for server in servers:
+        server.close()
+
+
+def measure(fn, repeat, min_time=0.05):
+    """Seconds per call for ``repeat`` runs of enough calls to take ``min_time``."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    times = []  # the calibration run warms caches and is not counted
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return number, times
+
+
+def run(sizes=DEFAULT_SIZES, repeat=5, select=None, out=sys.stdout):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for bench in benchmarks(sizes, workdir):
+            if select and select not in bench.name:
+                continue
+            number, times = measure(bench.setup(), repeat)
+            result = {"name": bench.name, "n": bench.n, "number": number,
+                      "best": min(times), "median": statistics.median(times)}
+            results.append(result)
+            print(f"{bench.name:<44}{format_seconds(result['median']):>12}"
+                  f"{format_seconds(result['median'] / bench.n):>12}/item", file=out)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """Rows of (name, baseline best, best, ratio, verdict) for benchmarks in both reports.
+
+    Best-of-repeats is compared rather than the median; it is far less
+    sensitive to other load on the machine.
+    """
+    before = {result["name"]: result for result in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            continue
+        ratio = result["best"] / old["best"]
+        if ratio > 1 + tolerance:
+            verdict = "SLOWER"
+        elif ratio < 1 / (1 + tolerance):
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((result["name"], old["best"], result["best"], ratio, verdict))
+    return rows
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NovaScope kernels and flows.")
+    parser.add_argument("-k", dest="select", help="only run benchmarks whose name contains this")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated batch sizes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative slowdown reported as a regression (default: 0.1)")
+    args = parser.parse_args(argv)
+    report = run([int(n) for n in args.sizes.split(",")], args.repeat, args.select)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        print()
+        for name, old, new, ratio, verdict in rows:
+            print(f"{name:<44}{format_seconds(old):>12}{format_seconds(new):>12}{ratio:8.2f}x  {verdict}")
+        if any(verdict == "SLOWER" for *_, verdict in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
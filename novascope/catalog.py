@@ -0,0 +1,147 @@
+"""Offline, memory-mapped star catalog (Hipparcos by default).
+
+The catalog is a directory of one ``.npy`` file per column, opened with
+``mmap_mode="r"`` so startup costs a few page faults no matter how many
+stars it holds. Rows are stored sorted by magnitude, which turns every
+"brighter than" filter into a prefix of the arrays.
+"""
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+from novascope import CACHE_DIR
+from novascope.skyindex import build_index, open_index
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, "hipparcos")
+FORMAT_VERSION = 1
+COLUMNS = ("hip", "ra", "dec", "mag")
+
+
+class Catalog:
+    """Column arrays ``hip``, ``ra`` (hours), ``dec`` (degrees) and ``mag``."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog version {meta.get('version')} in {path}")
+        self.path = path
+        self._hip_sorted = None
+        self._sky_index = None
+        self.prefix = meta.get("prefix", "HIP")
+        for column in COLUMNS + ("order",):
+            setattr(self, column, np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.hip)
+
+    def count(self, max_mag=None):
+        """Number of stars at or brighter than ``max_mag``."""
+        if max_mag is None:
+            return len(self)
+        return int(np.searchsorted(self.mag, max_mag, side="right"))
+
+    def head(self, n, max_mag=None):
+        """Indices of the ``n`` brightest stars (all of them if ``n`` is None)."""
+        limit = self.count(max_mag)
+        return np.arange(limit if n is None else min(n, limit))
+
+    def sample(self, n, max_mag=None, rng=None):
+        """Indices of ``n`` random stars without replacement."""
+        rng = np.random.default_rng() if rng is None else rng
+        limit = self.count(max_mag)
+        if n >= limit:
+            return np.arange(limit)
+        return rng.choice(limit, n, replace=False)
+
+    def names(self, idx):
+        return [f"{self.prefix} {hip}" for hip in self.hip[idx]]
+
+    def lookup(self, names):
+        """RA/Dec arrays for names like "HIP 32349"; NaN where not in the catalog."""
+        ids = np.full(len(names), -1, dtype=np.int64)
+        for i, name in enumerate(names):
+            parts = str(name).split()
+            if len(parts) == 2 and parts[0].upper() == self.prefix and parts[1].isdigit():
+                ids[i] = int(parts[1])
+        if self._hip_sorted is None:
+            self._hip_sorted = self.hip[self.order]
+        hip_sorted = self._hip_sorted
+        pos = np.clip(np.searchsorted(hip_sorted, ids), 0, len(self) - 1)
+        found = hip_sorted[pos] == ids
+        rows = self.order[pos]
+        ra = np.where(found, self.ra[rows], np.nan)
+        dec = np.where(found, self.dec[rows], np.nan)
+        return ra, dec
+
+    def sky_index(self):
+        """Spatial index over the catalog, built and saved on first use."""
+        if self._sky_index is None:
+            path = os.path.join(self.path, "skyindex")
+            self._sky_index = open_index(path) or build_index(self.ra, self.dec, path)
+        return self._sky_index
+
+
+def open_catalog(path=DEFAULT_PATH):
+    """Open the local catalog, or return None if it has not been imported."""
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return Catalog(path)
+
+
+def read_hip_main(path):
+    """Yield (hip, ra_deg, dec_deg, vmag) from CDS ``hip_main.dat`` (I/239)."""
+    with open(path) as f:
+        for line in f:
+            fields = line.split("|")
+            if len(fields) < 10 or not fields[8].strip() or not fields[9].strip():
+                continue  # a few hundred entries have no astrometry
+            vmag = fields[5].strip()
+            yield int(fields[1]), float(fields[8]), float(fields[9]), float(vmag) if vmag else np.nan
+
+
+def read_csv(path):
+    """Yield (hip, ra_deg, dec_deg, vmag) from a CSV with HIP, RAdeg, DEdeg, Vmag columns."""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            vmag = row.get("Vmag", "").strip()
+            yield int(row["HIP"]), float(row["RAdeg"]), float(row["DEdeg"]), float(vmag) if vmag else np.nan
+
+
+def build_catalog(rows, path=DEFAULT_PATH, prefix="HIP"):
+    """Write (id, ra_deg, dec_deg, mag) rows as a memory-mappable catalog."""
+    data = np.array(list(rows), dtype=np.float64).reshape(-1, 4)
+    by_mag = np.argsort(data[:, 3], kind="stable")  # NaN magnitudes sort last
+    data = data[by_mag]
+    columns = {
+        "hip": data[:, 0].astype(np.int64),
+        "ra": data[:, 1] / 15,
+        "dec": data[:, 2],
+        "mag": data[:, 3].astype(np.float32),
+    }
+    columns["order"] = np.argsort(columns["hip"], kind="stable")
+    os.makedirs(path, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "prefix": prefix, "rows": len(data)}, f)
+    catalog = Catalog(path)
+    catalog.sky_index()
+    return catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a star catalog for offline use.")
+    parser.add_argument("source", help="hip_main.dat from CDS, or a CSV with HIP,RAdeg,DEdeg,Vmag")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="catalog directory")
+    args = parser.parse_args(argv)
+    reader = read_csv if args.source.lower().endswith(".csv") else read_hip_main
+    catalog = build_catalog(reader(args.source), args.out)
+    print(f"Imported {len(catalog)} stars into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
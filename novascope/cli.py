@@ -0,0 +1,380 @@
+"""Command line entry point: ``python -m novascope``.
+
+``batch`` evaluates a table of targets against a table of observers and
+streams one row per (observer, target) pair to CSV, JSON Lines or Parquet.
+``plan`` lists the visible windows of every target over a date range and
+``network`` the best window of every target at each of a list of sites.
+``sweep`` counts the observable hours of every catalog star at each site
+on all CPU cores, and ``serve`` answers questions over a local HTTP/JSON API.
+``--record`` saves every network exchange of a run and ``--replay`` reruns
+it from that recording without touching the network.
+Targets are read in chunks, so memory stays bounded no matter how many
+rows the input has.
+"""
+import argparse
+import csv
+import itertools
+import os
+from datetime import datetime
+
+import numpy as np
+
+from novascope.engine import JulianDay, epoch_context, obs_star_batch
+from novascope.export import open_writer
+from novascope.horizon import horizontal, meets
+from novascope.httpclient import configure
+from novascope.hourangle import DEFAULT_PATH as HOUR_ANGLE_TABLE, open_table
+from novascope.network import Site, best_windows, network_epochs
+from novascope.planner import STEP_UNITS, epoch_grid, plan_windows
+from novascope.results import STATUS_NAMES, status_codes
+from novascope.skyindex import unit_vectors
+
+OUTPUT_COLUMNS = ["site", "name", "ra", "dec", "rise", "set", "alt", "az", "airmass", "observable", "status"]
+PLAN_COLUMNS = ["name", "start", "end", "rise", "transit", "set"]
+NETWORK_COLUMNS = ["site", "name", "start", "end", "hours"]
+SWEEP_COLUMNS = ["site", "name", "hours"]
+
+
+def read_columns(path, chunk_size):
+    """Yield ``{column: list}`` chunks from a CSV or Parquet file."""
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Reading Parquet files requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pydict()
+        return
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                return
+            yield {key: [row[key] for row in rows] for key in reader.fieldnames}
+
+
+def float_column(values):
+    """Float array for a column whose cells may be empty (NaN)."""
+    return np.array([np.nan if value in ("", None) else float(value) for value in values], dtype=np.float64)
+
+
+def parse_time(value):
+    """"HH:MM[:SS]" -> [hour, minute, second]."""
+    parts = [int(part) for part in str(value).split(":")]
+    return (parts + [0, 0])[:3]
+
+
+def load_observers(path, timezones=None):
+    """Read every observer row and precompute its JD, local time and offset."""
+    observers = []
+    for chunk in read_columns(path, 10000):
+        offsets = chunk.get("offset") or [""] * len(chunk["lat"])
+        for i in range(len(chunk["lat"])):
+            lat = float(chunk["lat"][i])
+            lon = float(chunk["lon"][i])
+            time = parse_time(chunk["time"][i])
+            JD = JulianDay(str(chunk["date"][i]), time)
+            offset = offsets[i]
+            if offset in ("", None):
+                if timezones is None:
+                    from novascope.timezones import TimezoneService
+
+                    timezones = TimezoneService()
+                offset = timezones.offset(lat, lon, JD)
+            site = chunk["site"][i] if "site" in chunk else str(len(observers))
+            lct_observer = time[0] + time[1] / 60 + time[2] / 3600
+            observers.append({
+                "site": site, "lat": lat, "lon": lon, "JD": JD, "offset": float(offset),
+                "lct_observer": lct_observer, "epoch": epoch_context(JD, lct_observer, lat, lon, float(offset)),
+            })
+    return observers
+
+
+def load_sites(path):
+    """Read a sites file with lat, lon and optionally site, offset columns."""
+    sites = []
+    for chunk in read_columns(path, 10000):
+        offsets = chunk.get("offset") or [""] * len(chunk["lat"])
+        for i in range(len(chunk["lat"])):
+            name = chunk["site"][i] if "site" in chunk else str(len(sites))
+            offset = None if offsets[i] in ("", None) else float(offsets[i])
+            sites.append(Site(name, float(chunk["lat"][i]), float(chunk["lon"][i]), offset))
+    return sites
+
+
+class TargetCoordinates:
+    """RA/Dec for a chunk of targets, from the file itself or offline lookups.
+
+    Rows with an empty ``ra`` or ``dec`` cell (or no such columns) are
+    looked up in the catalog, then the resolver.
+    """
+
+    def __init__(self, resolve=False):
+        self.resolve = resolve
+        self.catalog = None
+        self.resolver = None
+
+    def __call__(self, chunk):
+        names = [str(name) for name in chunk["name"]]
+        if "ra" in chunk and "dec" in chunk:
+            ra, dec = float_column(chunk["ra"]), float_column(chunk["dec"])
+        else:
+            ra, dec = np.full(len(names), np.nan), np.full(len(names), np.nan)
+        missing = np.flatnonzero(np.isnan(ra) | np.isnan(dec))
+        if len(missing) == 0:
+            return names, ra, dec
+        if self.resolver is None:
+            from novascope.catalog import open_catalog
+            from novascope.resolver import ResolverCache
+
+            self.catalog = open_catalog()
+            self.resolver = ResolverCache()
+        if self.catalog is not None:
+            ra[missing], dec[missing] = self.catalog.lookup([names[i] for i in missing])
+            missing = missing[np.isnan(ra[missing])]
+        if self.resolve:
+            coords, _ = self.resolver.resolve_many([names[i] for i in missing])
+        else:
+            # Offline: only what is already in the resolver cache
+            coords = {names[i]: self.resolver.get(names[i]) for i in missing}
+        for i in missing:
+            ra[i], dec[i] = coords.get(names[i]) or (np.nan, np.nan)
+        return names, ra, dec
+
+
+def run_batch(args):
+    table = None
+    if args.hour_angle_table:
+        table = open_table(args.hour_angle_table)
+        if table is None:
+            raise SystemExit(f"No hour angle table at {args.hour_angle_table}; "
+                             "build one with 'python -m novascope.hourangle build' first.")
+    observers = load_observers(args.observers)
+    coordinates = TargetCoordinates(resolve=args.resolve)
+    writer = open_writer(args.output, OUTPUT_COLUMNS, args.format)
+    try:
+        for chunk in read_columns(args.targets, args.chunk_size):
+            names, ra, dec = coordinates(chunk)
+            vectors = unit_vectors(ra, dec)
+            for observer in observers:
+                sidereal = None
+                if table is not None:
+                    sidereal = obs_star_batch(observer["lat"], ra, dec, table.hour_angle(observer["lat"], dec))
+                result = observer["epoch"].observability(ra, dec, sidereal)
+                position = horizontal(ra, dec, observer["lat"], observer["lon"], observer["JD"],
+                                      observer["offset"], vectors)
+                observable = result.observable
+                if args.min_altitude is not None or args.max_airmass is not None:
+                    observable = observable & meets(position, args.min_altitude or 0.0, args.max_airmass)
+                writer.write({
+                    "site": [observer["site"]] * len(names), "name": names, "ra": ra, "dec": dec,
+                    "rise": result.rise, "set": result.set, "alt": position.alt, "az": position.az,
+                    "airmass": position.airmass, "observable": observable,
+                    "status": STATUS_NAMES[status_codes(ra, result)],
+                })
+    finally:
+        writer.close()
+
+
+def run_plan(args):
+    start = datetime.fromisoformat(args.start)
+    end = datetime.fromisoformat(args.end)
+    timezones = None
+    if args.offset is None:
+        from novascope.timezones import TimezoneService
+
+        timezones = TimezoneService()
+    epochs = epoch_grid(start, end, args.step, args.unit, args.lat, args.lon, args.offset, timezones)
+    times = np.array([time.isoformat() for time in epochs.times])
+    coordinates = TargetCoordinates(resolve=args.resolve)
+    writer = open_writer(args.output, PLAN_COLUMNS, args.format)
+    try:
+        for chunk in read_columns(args.targets, args.chunk_size):
+            names, ra, dec = coordinates(chunk)
+            names = np.asarray(names, dtype=object)
+            for windows in plan_windows(ra, dec, args.lat, args.lon, epochs):
+                writer.write({
+                    "name": names[windows.star], "start": times[windows.start], "end": times[windows.end],
+                    "rise": windows.rise, "transit": windows.transit, "set": windows.set,
+                })
+    finally:
+        writer.close()
+
+
+def run_network(args):
+    sites = load_sites(args.sites)
+    timezones = None
+    if any(site.offset is None for site in sites):
+        from novascope.timezones import TimezoneService
+
+        timezones = TimezoneService()
+    epochs = network_epochs(sites, datetime.fromisoformat(args.start), datetime.fromisoformat(args.end),
+                            args.step, args.unit, timezones)
+    times = np.array([time.isoformat() for time in epochs.times])
+    site_names = np.array([site.name for site in sites], dtype=object)
+    step_hours = (STEP_UNITS[args.unit] * args.step).total_seconds() / 3600
+    coordinates = TargetCoordinates(resolve=args.resolve)
+    writer = open_writer(args.output, NETWORK_COLUMNS, args.format)
+    try:
+        for chunk in read_columns(args.targets, args.chunk_size):
+            names, ra, dec = coordinates(chunk)
+            names = np.asarray(names, dtype=object)
+            for windows in best_windows(ra, dec, sites, epochs):
+                writer.write({
+                    "site": site_names[windows.site], "name": names[windows.star],
+                    "start": times[windows.start], "end": times[windows.end],
+                    # A window lasts from its first to its last visible epoch
+                    "hours": (windows.end - windows.start) * step_hours,
+                })
+    finally:
+        writer.close()
+
+
+def run_sweep(args):
+    from novascope.catalog import open_catalog
+    from novascope.sweep import visible_intervals
+
+    catalog = open_catalog()
+    if catalog is None:
+        raise SystemExit("No local catalog; import one with 'python -m novascope.catalog' first.")
+    sites = load_sites(args.sites)
+    timezones = None
+    if any(site.offset is None for site in sites):
+        from novascope.timezones import TimezoneService
+
+        timezones = TimezoneService()
+    epochs = network_epochs(sites, datetime.fromisoformat(args.start), datetime.fromisoformat(args.end),
+                            args.step, args.unit, timezones)
+    step_hours = (STEP_UNITS[args.unit] * args.step).total_seconds() / 3600
+    limit = catalog.count(args.max_mag)
+    # Catalog columns are memory maps, so the workers read them in place
+    intervals = visible_intervals(catalog.ra[:limit], catalog.dec[:limit], sites, epochs, args.workers)
+    writer = open_writer(args.output, SWEEP_COLUMNS, args.format)
+    try:
+        for start in range(0, limit, args.chunk_size):
+            stop = min(start + args.chunk_size, limit)
+            names = np.asarray(catalog.names(np.arange(start, stop)), dtype=object)
+            for j, site in enumerate(sites):
+                visible = intervals[j, start:stop]
+                keep = visible > 0
+                writer.write({"site": [site.name] * int(keep.sum()), "name": names[keep],
+                              "hours": visible[keep] * step_hours})
+    finally:
+        writer.close()
+
+
+def add_grid_arguments(parser, zone):
+    parser.add_argument("--start", required=True, help=f"first {zone} epoch, e.g. 2024-10-01T18:00")
+    parser.add_argument("--end", required=True, help=f"last {zone} epoch, e.g. 2024-10-31T06:00")
+    parser.add_argument("--step", type=int, default=30, help="grid step (default: 30)")
+    parser.add_argument("--unit", choices=list(STEP_UNITS), default="minutes", help="grid step unit")
+
+
+def add_target_arguments(parser):
+    parser.add_argument("targets", help="targets file with name and optionally ra (hours), dec (degrees)")
+
+
+def add_output_arguments(parser):
+    parser.add_argument("-o", "--output", help="output file (default: CSV on stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"],
+                        help="output format (default: from the output file extension)")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="targets processed per chunk")
+    parser.add_argument("--resolve", action="store_true",
+                        help="resolve unknown names over the network instead of only offline")
+
+
+def run_serve(args):
+    from novascope.catalog import open_catalog
+    from novascope.geocode import DEFAULT_GAZETTEER, GazetteerBackend, GeocodeCache, ReverseGeocoder
+    from novascope.service import ObservabilityService, make_server
+
+    if args.stand_ins:
+        # Deterministic resolver and timezones, offline geocoding only: safe to load-test
+        from novascope.bench import make_pipeline
+
+        pipeline = make_pipeline(open_catalog())
+        backends = [GazetteerBackend()] if os.path.exists(DEFAULT_GAZETTEER) else []
+        geocoder = ReverseGeocoder(backends, GeocodeCache(":memory:"))
+    else:
+        from novascope.pipeline import Pipeline
+        from novascope.resolver import ResolverCache
+        from novascope.timezones import TimezoneService
+
+        pipeline = Pipeline(open_catalog(), ResolverCache(), TimezoneService())
+        geocoder = ReverseGeocoder()
+    service = ObservabilityService(pipeline, geocoder, args.batch_window / 1000)
+    server = make_server(service, args.host, args.port, quiet=not args.verbose)
+    print(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="novascope", description="NovaScope star observability tools.")
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument("--record", metavar="CASSETTE", help="record every HTTP exchange to this file")
+    recording.add_argument("--replay", metavar="CASSETTE", help="answer HTTP requests from a recording, offline")
+    parser.add_argument("--replay-latency", action="store_true", help="wait the recorded time for each replayed answer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="evaluate targets x observers from CSV/Parquet files")
+    add_target_arguments(batch)
+    batch.add_argument("observers", help="observers file with lat, lon, date, time and optionally site, offset")
+    batch.add_argument("--min-altitude", type=float, help="only count stars at least this high (degrees)")
+    batch.add_argument("--max-airmass", type=float, help="only count stars below this airmass")
+    batch.add_argument("--hour-angle-table", nargs="?", const=HOUR_ANGLE_TABLE, metavar="PATH",
+                       help="interpolate rise/set times from a table built with python -m novascope.hourangle "
+                            "(default path: %(const)s)")
+    add_output_arguments(batch)
+    batch.set_defaults(func=run_batch)
+
+    planner = commands.add_parser("plan", help="visible windows of every target over a date range")
+    add_target_arguments(planner)
+    planner.add_argument("--lat", type=float, required=True, help="site latitude (degrees)")
+    planner.add_argument("--lon", type=float, required=True, help="site longitude (degrees)")
+    add_grid_arguments(planner, "local")
+    planner.add_argument("--offset", type=float, help="fixed UTC offset in hours (default: site timezone)")
+    add_output_arguments(planner)
+    planner.set_defaults(func=run_plan)
+
+    network = commands.add_parser("network", help="best window of every target at each site of a network")
+    add_target_arguments(network)
+    network.add_argument("sites", help="sites file with lat, lon and optionally site, offset")
+    add_grid_arguments(network, "UTC")
+    add_output_arguments(network)
+    network.set_defaults(func=run_network)
+
+    sweep = commands.add_parser("sweep", help="observable hours of every catalog star at each site, in parallel")
+    sweep.add_argument("sites", help="sites file with lat, lon and optionally site, offset")
+    add_grid_arguments(sweep, "UTC")
+    sweep.add_argument("--max-mag", type=float, help="only stars at least this bright")
+    sweep.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    sweep.add_argument("-o", "--output", help="output file (default: CSV on stdout)")
+    sweep.add_argument("--format", choices=["csv", "jsonl", "parquet"],
+                       help="output format (default: from the output file extension)")
+    sweep.add_argument("--chunk-size", type=int, default=100000, help="stars written per chunk")
+    sweep.set_defaults(func=run_sweep)
+
+    serve = commands.add_parser("serve", help="local HTTP/JSON API shared by several users")
+    serve.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: %(default)s)")
+    serve.add_argument("--port", type=int, default=8765, help="port (default: %(default)s, 0 picks a free one)")
+    serve.add_argument("--batch-window", type=float, default=2.0,
+                       help="milliseconds to gather concurrent /observe requests (default: %(default)s)")
+    serve.add_argument("--stand-ins", action="store_true",
+                       help="use offline stand-ins for name resolution and timezones (load testing)")
+    serve.add_argument("--verbose", action="store_true", help="log every request")
+    serve.set_defaults(func=run_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.record or args.replay:
+        configure(record=args.record, replay=args.replay, replay_latency=args.replay_latency)
+    args.func(args)
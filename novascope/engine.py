@@ -0,0 +1,208 @@
+"""Observability kernels shared by the GUI, the batch CLI and services.
+
+The scalar functions work on one star; the ``*_batch`` versions compute
+exactly the same thing over whole NumPy arrays of stars at once.
+"""
+import math
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+Observability = namedtuple(
+    "Observability", ["rise", "set", "observable", "circumpolar", "never_rises"]
+)
+
+J2000 = datetime(2000, 1, 1, 12)  # JD 2451545.0
+
+
+def JulianDay(date, time):
+    """Julian Day for a "YYYY-MM-DD" date and an [hour, minute, second] time."""
+    hour, minute, second = time
+    year, month, day = (int(part) for part in date.split("-"))
+    if year < -4712:
+        raise ValueError("Year must be higher than -4712.")
+    if (month < 1 or month > 12) or (day <= 0):
+        raise ValueError("Invalid month or day.")
+
+    if month < 3:
+        month += 12
+        year -= 1
+
+    A = int(year / 100)
+    B = 2 - A + int(A / 4)
+    JD = (1720994.5 + int(365.25 * year) + int(30.6001 * (month + 1)) + day + B
+          + (hour + minute / 60 + second / 3600) / 24)
+    return JD
+
+
+def obs_star(lat, right_ascension, delta):
+    """Rise/set LST (hours), or (None, None) if the star never crosses the horizon."""
+    Ar = math.sin(math.radians(delta)) / math.cos(math.radians(lat))
+    H1 = math.tan(math.radians(delta)) * math.tan(math.radians(lat))
+    if abs(Ar) < 1 and abs(H1) < 1:
+        h = math.degrees(math.acos(-H1)) / 15
+        rise = (24 + right_ascension - h) % 24
+        set_time = (right_ascension + h) % 24
+        return rise, set_time
+    else:
+        return None, None
+
+
+def lst_to_lct(lst, JD, offset, lon, gst_0=None):
+    """Convert LST (hours) at longitude ``lon`` to local civil time."""
+    gst = lst - (lon / 15)
+    gst %= 24
+    if gst_0 is None:
+        S = JD - 2451545.0
+        T = S / 36525.0
+        gst_0 = 6.697374558 + (2400.051336 * T) + (0.000025862 * T ** 2)
+        gst_0 %= 24
+    ut = (gst - gst_0) * 0.9972695663
+    if ut < 0:
+        ut += 24
+    lct = ut + offset
+    lct %= 24
+    return lct
+
+
+def is_observe(LCT_observer, LCT_rise, LCT_set):
+    """Whether the star is up at ``LCT_observer``, including windows across midnight."""
+    if LCT_rise <= LCT_set:
+        return LCT_rise <= LCT_observer <= LCT_set
+    return LCT_observer >= LCT_rise or LCT_observer <= LCT_set
+
+
+def convert_dec_to_hours(decimal_time):
+    """Format decimal hours as HH:MM:SS."""
+    hours = int(decimal_time)
+    minutes = int((decimal_time - hours) * 60)
+    seconds = int(((decimal_time - hours) * 60 - minutes) * 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def obs_star_batch(lat, right_ascension, delta, hour_angle=None):
+    """Rise/set LST (hours) for arrays of RA (hours) and Dec (degrees).
+
+    Stars that never cross the horizon get NaN rise/set times and are
+    flagged in the ``circumpolar`` / ``never_rises`` masks instead.
+    ``hour_angle`` is the horizon hour angle of every star (hours, NaN
+    where it does not cross), e.g. from ``HourAngleTable.hour_angle``;
+    passing it skips the trig.
+    """
+    right_ascension = np.asarray(right_ascension, dtype=np.float64)
+    if hour_angle is None:
+        delta = np.radians(np.asarray(delta, dtype=np.float64))
+        lat = np.radians(lat)
+        Ar = np.sin(delta) / np.cos(lat)
+        H1 = np.tan(delta) * np.tan(lat)
+        crosses = (np.abs(Ar) < 1) & (np.abs(H1) < 1)
+        h = np.degrees(np.arccos(np.clip(-H1, -1.0, 1.0))) / 15
+        above = H1 > 0
+    else:
+        crosses = ~np.isnan(hour_angle)
+        h = np.where(crosses, hour_angle, 0.0)  # NaN makes np.remainder several times slower
+        above = np.asarray(delta) * lat > 0
+    rise = np.where(crosses, (24 + right_ascension - h) % 24, np.nan)
+    set_time = np.where(crosses, (right_ascension + h) % 24, np.nan)
+    # Outside the crossing band the sign of tan(dec) * tan(lat) tells us
+    # whether the star stays above or below the horizon all day.
+    circumpolar = ~crosses & above
+    never_rises = ~crosses & ~circumpolar
+    return rise, set_time, circumpolar, never_rises
+
+
+def gmst0(JD):
+    """The ``gst_0`` term of ``lst_to_lct`` (hours), for a scalar or array JD."""
+    S = np.asarray(JD, dtype=np.float64) - 2451545.0
+    T = S / 36525.0
+    return (6.697374558 + (2400.051336 * T) + (0.000025862 * T ** 2)) % 24
+
+
+def lst_to_lct_batch(lst, JD, offset, lon, gst_0=None):
+    """Convert LST (hours) to local civil time for arrays of stars.
+
+    ``JD``, ``offset`` and a precomputed ``gst_0`` may be arrays shaped to
+    broadcast against ``lst``, e.g. one row per epoch.
+    """
+    gst = (np.asarray(lst, dtype=np.float64) - (lon / 15)) % 24
+    if gst_0 is None:
+        gst_0 = gmst0(JD)
+    ut = (gst - gst_0) * 0.9972695663
+    ut = np.where(ut < 0, ut + 24, ut)
+    return (ut + offset) % 24
+
+
+def lct_to_lst(lct, JD, offset, lon, gst_0=None):
+    """Local sidereal time (hours) for a local civil time; inverse of ``lst_to_lct``."""
+    if gst_0 is None:
+        gst_0 = gmst0(JD)
+    ut = (lct - offset) % 24
+    return (ut / 0.9972695663 + gst_0 + lon / 15) % 24
+
+
+def is_observe_batch(LCT_observer, LCT_rise, LCT_set, circumpolar=None):
+    """Element-wise ``is_observe``; circumpolar stars are always observable."""
+    after_rise = LCT_rise <= LCT_observer
+    before_set = LCT_observer <= LCT_set
+    # Rising after the set time on the clock means the window spans midnight
+    observable = np.where(LCT_rise <= LCT_set, after_rise & before_set, after_rise | before_set)
+    if circumpolar is not None:
+        observable |= circumpolar
+    return observable
+
+
+def observability(ra, dec, lat, lon, JD, offset, lct_observer, gst_0=None, sidereal=None):
+    """Rise, set and observable flags for every star in one pass.
+
+    ``sidereal`` is an earlier ``obs_star_batch(lat, ra, dec)`` result to reuse.
+    """
+    if sidereal is None:
+        sidereal = obs_star_batch(lat, ra, dec)
+    lst_rise, lst_set, circumpolar, never_rises = sidereal
+    if gst_0 is None:
+        gst_0 = gmst0(JD)
+    lct_rise = lst_to_lct_batch(lst_rise, JD, offset, lon, gst_0)
+    lct_set = lst_to_lct_batch(lst_set, JD, offset, lon, gst_0)
+    observable = is_observe_batch(lct_observer, lct_rise, lct_set, circumpolar)
+    return Observability(lct_rise, lct_set, observable, circumpolar, never_rises)
+
+
+class Epoch(namedtuple("Epoch", ["JD", "T", "gst_0", "offset", "lat", "lon", "lct", "lst"])):
+    """Everything about one observation that does not depend on the star.
+
+    Built once per run by ``epoch_context``; the methods are the kernels
+    above with the sidereal terms already filled in, so each star only
+    costs the per-star arithmetic.
+    """
+
+    __slots__ = ()
+
+    def lst_to_lct(self, lst):
+        return lst_to_lct(lst, self.JD, self.offset, self.lon, self.gst_0)
+
+    def lct_to_lst(self, lct):
+        return lct_to_lst(lct, self.JD, self.offset, self.lon, self.gst_0)
+
+    def rise_set(self, ra, dec):
+        """Rise/set local civil times of one star, or (None, None) if it never crosses the horizon."""
+        lst_rise, lst_set = obs_star(self.lat, ra, dec)
+        if lst_rise is None:
+            return None, None
+        return self.lst_to_lct(lst_rise), self.lst_to_lct(lst_set)
+
+    def observability(self, ra, dec, sidereal=None):
+        return observability(ra, dec, self.lat, self.lon, self.JD, self.offset, self.lct, self.gst_0, sidereal)
+
+
+def epoch_context(JD, lct_observer, lat, lon, offset):
+    """The ``Epoch`` for local Julian Day ``JD`` and local civil time ``lct_observer`` at a site."""
+    T = (JD - 2451545.0) / 36525.0
+    gst_0 = (6.697374558 + (2400.051336 * T) + (0.000025862 * T ** 2)) % 24
+    lst = lct_to_lst(lct_observer, JD, offset, lon, gst_0)
+    return Epoch(JD, T, gst_0, offset, lat, lon, lct_observer, lst)
+
+
+def jd_to_datetime(JD):
+    """Inverse of ``JulianDay`` as a naive (proleptic Gregorian) datetime."""
+    return J2000 + timedelta(days=JD - 2451545.0)
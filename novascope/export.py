@@ -0,0 +1,111 @@
+"""Streaming writers for result tables.
+
+Every writer takes chunks as ``{column: array or list}`` and writes them
+out immediately, so exports never need the whole result set in memory.
+"""
+import csv
+import json
+import sys
+
+import numpy as np
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".parquet": "parquet"}
+
+
+def _text(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return ["" if np.isnan(value) else f"{value:.6f}" for value in values.tolist()]
+    if values.dtype.kind == "b":
+        return values.astype(int).tolist()
+    return values.tolist()
+
+
+def json_column(values):
+    """List for JSON output, with NaN and infinities as null."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return np.where(np.isfinite(values), values, None).tolist()
+    return values.tolist()
+
+
+class CsvWriter:
+    def __init__(self, f, columns):
+        self.columns = columns
+        self.writer = csv.writer(f)
+        self.writer.writerow(columns)
+
+    def write(self, chunk):
+        self.writer.writerows(zip(*(_text(chunk[column]) for column in self.columns)))
+
+
+class JsonLinesWriter:
+    def __init__(self, f, columns):
+        self.f = f
+        self.columns = columns
+
+    def write(self, chunk):
+        values = [json_column(chunk[column]) for column in self.columns]
+        self.f.writelines(json.dumps(dict(zip(self.columns, row))) + "\n" for row in zip(*values))
+
+
+class ParquetWriter:
+    """Row groups are written per chunk; needs pyarrow."""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Writing Parquet files requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, chunk):
+        table = self.pa.table({column: np.asarray(chunk[column]) for column in self.columns})
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _FileWriter:
+    """Wrap a text writer together with the file it owns."""
+
+    def __init__(self, cls, path, columns):
+        self.f = sys.stdout if path in (None, "-") else open(path, "w", newline="")
+        self.inner = cls(self.f, columns)
+
+    def write(self, chunk):
+        self.inner.write(chunk)
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+
+
+def guess_format(path):
+    if path in (None, "-"):
+        return "csv"
+    for extension, fmt in FORMATS.items():
+        if path.lower().endswith(extension):
+            return fmt
+    return "csv"
+
+
+def open_writer(path, columns, fmt=None):
+    """Writer for ``path`` (stdout for None or "-"); format from the extension."""
+    fmt = fmt or guess_format(path)
+    if fmt == "parquet":
+        if path in (None, "-"):
+            raise ValueError("Parquet output needs a file path")
+        return ParquetWriter(path, columns)
+    if fmt == "jsonl":
+        return _FileWriter(JsonLinesWriter, path, columns)
+    return _FileWriter(CsvWriter, path, columns)
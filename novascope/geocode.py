@@ -0,0 +1,215 @@
+"""Reverse geocoding with a persistent cache, rate limiting and offline backends.
+
+Lookups go through a list of backends in order. Answers are cached in SQLite
+keyed by a lat/lon bucket, so clicking around the same area never repeats
+a request. Network backends share a token bucket so we stay within
+Nominatim's one-request-per-second policy.
+
+The user's own approximate location comes from an IP lookup that is
+remembered on disk, so the next start has a position without waiting.
+"""
+import csv
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from novascope import CACHE_DIR
+from novascope.httpclient import geopy_adapter, shared_session
+
+DEFAULT_CACHE = os.path.join(CACHE_DIR, "geocode.sqlite")
+DEFAULT_GAZETTEER = os.path.join(CACHE_DIR, "gazetteer.txt")
+LAST_LOCATION = os.path.join(CACHE_DIR, "location.json")
+IP_LOCATION_URL = "http://ip-api.com/json/"
+
+log = logging.getLogger(__name__)
+
+
+def last_known_location(path=LAST_LOCATION):
+    """(lat, lon) saved by the last successful ``locate_by_ip``, or None."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return data["lat"], data["lon"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def locate_by_ip(url=IP_LOCATION_URL, timeout=5, path=LAST_LOCATION, session=None):
+    """Approximate (lat, lon) from the public IP address; saved for the next start."""
+    session = shared_session() if session is None else session
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"lat": data["lat"], "lon": data["lon"]}, f)
+    return data["lat"], data["lon"]
+
+
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate=1.0, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class GeocodeCache:
+    """Labels keyed by (lat, lon) rounded to a ``bucket`` degree grid."""
+
+    def __init__(self, path=DEFAULT_CACHE, bucket=0.01):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.bucket = bucket
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS places (lat_cell INTEGER, lon_cell INTEGER, label TEXT NOT NULL, "
+            "fetched REAL NOT NULL, PRIMARY KEY (lat_cell, lon_cell))"
+        )
+
+    def _key(self, lat, lon):
+        return round(lat / self.bucket), round(lon / self.bucket)
+
+    def get(self, lat, lon):
+        with self._lock:
+            row = self._db.execute("SELECT label FROM places WHERE lat_cell = ? AND lon_cell = ?",
+                                   self._key(lat, lon)).fetchone()
+        return row[0] if row else None
+
+    def put(self, lat, lon, label):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?)",
+                             (*self._key(lat, lon), label, time.time()))
+            self._db.commit()
+
+
+class NominatimBackend:
+    """OpenStreetMap Nominatim through geopy and the shared session (network, rate limited)."""
+
+    rate_limited = True
+
+    def __init__(self, user_agent="novaspace", timeout=5):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._geolocator = None
+
+    def __call__(self, lat, lon):
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+
+            self._geolocator = Nominatim(user_agent=self.user_agent, timeout=self.timeout,
+                                         adapter_factory=geopy_adapter())
+        location = self._geolocator.reverse((lat, lon), language="en")
+        if location and location.raw.get("address"):
+            address = location.raw["address"]
+            city = address.get("city", "Unknown City")
+            country = address.get("country", "Unknown Country")
+            return f"{city}, {country}"
+        return None
+
+
+class GazetteerBackend:
+    """Nearest populated place from a local gazetteer (offline).
+
+    Reads a GeoNames dump (e.g. ``cities15000.txt``) or a CSV with
+    ``name, country, lat, lon`` columns. Places farther than
+    ``max_distance_km`` do not count as a match. The file is read on the
+    first lookup, not at construction.
+    """
+
+    rate_limited = False
+
+    def __init__(self, path=DEFAULT_GAZETTEER, max_distance_km=50):
+        self.path = path
+        self.min_dot = np.cos(max_distance_km / 6371.0)
+        self.names = None
+
+    def _load(self):
+        path = self.path
+        names, lats, lons = [], [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            if path.lower().endswith(".csv"):
+                for row in csv.DictReader(f):
+                    names.append(f"{row['name']}, {row['country']}")
+                    lats.append(float(row["lat"]))
+                    lons.append(float(row["lon"]))
+            else:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    names.append(f"{fields[1]}, {fields[8]}")
+                    lats.append(float(fields[4]))
+                    lons.append(float(fields[5]))
+        self.xyz = self._unit(np.array(lats), np.array(lons))
+        self.names = names
+
+    @staticmethod
+    def _unit(lat, lon):
+        lat, lon = np.radians(lat), np.radians(lon)
+        return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+    def __call__(self, lat, lon):
+        if self.names is None:
+            self._load()
+        dot = self.xyz @ self._unit(lat, lon)
+        nearest = int(np.argmax(dot))
+        return self.names[nearest] if dot[nearest] >= self.min_dot else None
+
+
+def default_backends():
+    """Offline gazetteer first when one is installed, then Nominatim."""
+    backends = []
+    if os.path.exists(DEFAULT_GAZETTEER):
+        backends.append(GazetteerBackend())
+    backends.append(NominatimBackend())
+    return backends
+
+
+class ReverseGeocoder:
+    """Cached, rate-limited "City, Country" labels for map clicks."""
+
+    def __init__(self, backends=None, cache=None, limiter=None):
+        self.backends = default_backends() if backends is None else backends
+        self.cache = GeocodeCache() if cache is None else cache
+        self.limiter = TokenBucket() if limiter is None else limiter
+
+    def lookup(self, lat, lon):
+        """Label for a location, or None if no backend knows it."""
+        label = self.cache.get(lat, lon)
+        if label is not None:
+            return label
+        for backend in self.backends:
+            if getattr(backend, "rate_limited", True):
+                self.limiter.acquire()
+            try:
+                label = backend(lat, lon)
+            except Exception as e:
+                log.warning("Reverse geocoding with %s failed: %s", type(backend).__name__, e)
+                continue
+            if label is not None:
+                self.cache.put(lat, lon, label)
+                return label
+        return None
@@ -0,0 +1,126 @@
+"""Altitude, azimuth and airmass for many stars at once.
+
+J2000 RA/Dec are carried to the observation epoch with IAU 1976
+precession and the low-precision IAU 1980 nutation series (about 0.5"),
+then rotated into the observer's horizon frame. Precession, nutation and
+Earth rotation for one epoch fold into a single 3x3 matrix, so each star
+costs one small matrix product however many transforms are chained.
+Refraction, aberration and proper motion are not applied.
+"""
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from novascope.skyindex import unit_vectors
+
+Horizontal = namedtuple("Horizontal", ["alt", "az", "airmass"])
+
+ARCSEC = math.pi / (180 * 3600)
+
+
+def _r1(a):
+    c, s = math.cos(a), math.sin(a)
+    return np.array([[1, 0, 0], [0, c, s], [0, -s, c]])
+
+
+def _r2(a):
+    c, s = math.cos(a), math.sin(a)
+    return np.array([[c, 0, -s], [0, 1, 0], [s, 0, c]])
+
+
+def _r3(a):
+    c, s = math.cos(a), math.sin(a)
+    return np.array([[c, s, 0], [-s, c, 0], [0, 0, 1]])
+
+
+def nutation(JD):
+    """(nutation in longitude, true obliquity) in radians."""
+    T = (JD - 2451545.0) / 36525
+    sun = math.radians(280.4665 + 36000.7698 * T)
+    moon = math.radians(218.3165 + 481267.8813 * T)
+    node = math.radians(125.04452 - 1934.136261 * T)
+    dpsi = (-17.20 * math.sin(node) - 1.32 * math.sin(2 * sun) - 0.23 * math.sin(2 * moon)
+            + 0.21 * math.sin(2 * node)) * ARCSEC
+    deps = (9.20 * math.cos(node) + 0.57 * math.cos(2 * sun) + 0.10 * math.cos(2 * moon)
+            - 0.09 * math.cos(2 * node)) * ARCSEC
+    return dpsi, mean_obliquity(JD) + deps
+
+
+def mean_obliquity(JD):
+    T = (JD - 2451545.0) / 36525
+    return (84381.448 - 46.8150 * T - 0.00059 * T ** 2 + 0.001813 * T ** 3) * ARCSEC
+
+
+@lru_cache(maxsize=4096)
+def _precession_nutation(key):
+    JD = key / 100
+    T = (JD - 2451545.0) / 36525
+    zeta = (2306.2181 * T + 0.30188 * T ** 2 + 0.017998 * T ** 3) * ARCSEC
+    z = (2306.2181 * T + 1.09468 * T ** 2 + 0.018203 * T ** 3) * ARCSEC
+    theta = (2004.3109 * T - 0.42665 * T ** 2 - 0.041833 * T ** 3) * ARCSEC
+    precession = _r3(-z) @ _r2(theta) @ _r3(-zeta)
+    dpsi, eps = nutation(JD)
+    nutate = _r1(-eps) @ _r3(-dpsi) @ _r1(mean_obliquity(JD))
+    return nutate @ precession, dpsi * math.cos(eps)
+
+
+def precession_nutation(JD):
+    """J2000 -> true equator and equinox of date, and the equation of the equinoxes (radians).
+
+    Cached per epoch; JD is rounded to 0.01 day (about 0.002" of precession).
+    """
+    return _precession_nutation(round(JD * 100))
+
+
+def gmst(JD_ut):
+    """Greenwich mean sidereal time in degrees (IAU 1982)."""
+    D = JD_ut - 2451545.0
+    T = D / 36525
+    return (280.46061837 + 360.98564736629 * D + 0.000387933 * T ** 2 - T ** 3 / 38710000) % 360
+
+
+def horizon_matrix(lat, lon, JD_ut):
+    """3x3 rotation from J2000 unit vectors to (north, east, up) at the site."""
+    matrix, equation_of_equinoxes = precession_nutation(JD_ut)
+    last = math.radians(gmst(JD_ut) + lon) + equation_of_equinoxes
+    flip = np.diag([-1.0, 1.0, 1.0])  # the R2 rotation leaves x pointing south
+    return flip @ _r2(math.pi / 2 - math.radians(lat)) @ _r3(last) @ matrix
+
+
+def airmass(alt):
+    """Kasten & Young (1989) relative airmass; infinite below the horizon."""
+    alt = np.asarray(alt, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        X = 1 / (np.sin(np.radians(alt)) + 0.50572 * (alt + 6.07995) ** -1.6364)
+    return np.where(alt > 0, X, np.inf)
+
+
+def horizontal(ra, dec, lat, lon, JD, offset, vectors=None):
+    """Altitude and azimuth (degrees, azimuth east of north) and airmass.
+
+    ``JD`` is the local Julian Day as used elsewhere; with ``offset`` it
+    gives UT. A scalar ``JD`` returns (stars,) arrays, an array of epochs
+    returns (epochs, stars). Pass ``vectors`` from ``unit_vectors`` to
+    reuse them across calls.
+    """
+    if vectors is None:
+        vectors = unit_vectors(ra, dec)
+    JD_ut = np.asarray(JD, dtype=np.float64) - np.asarray(offset, dtype=np.float64) / 24
+    matrices = np.array([horizon_matrix(lat, lon, jd) for jd in np.atleast_1d(JD_ut)])
+    local = vectors @ matrices.transpose(0, 2, 1)
+    if JD_ut.ndim == 0:
+        local = local[0]
+    north, east, up = local[..., 0], local[..., 1], local[..., 2]
+    alt = np.degrees(np.arcsin(np.clip(up, -1.0, 1.0)))
+    az = np.degrees(np.arctan2(east, north)) % 360
+    return Horizontal(alt, az, airmass(alt))
+
+
+def meets(position, min_altitude=0.0, max_airmass=None):
+    """Stars of a ``Horizontal`` satisfying the altitude and airmass limits."""
+    ok = position.alt >= min_altitude
+    if max_airmass is not None:
+        ok &= position.airmass <= max_airmass
+    return ok
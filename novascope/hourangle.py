@@ -0,0 +1,213 @@
+"""Precomputed horizon hour angles on a (latitude, declination) grid.
+
+A star at declination ``dec`` seen from latitude ``lat`` is above altitude
+``h0`` for ``H`` hours either side of transit, where
+
+    cos H = (sin h0 - sin lat sin dec) / (cos lat cos dec)
+
+(``-tan lat tan dec`` for the horizon). ``build_table`` tabulates ``H`` for
+a set of altitudes on a regular grid and stores, for every grid cell, an
+estimate of the bilinear interpolation error: twice the largest error found
+on a sub-grid of sample points. Lookups interpolate where that estimate is
+within the requested tolerance and fall back to the exact formula elsewhere
+(near the circumpolar limit, where ``H`` is not smooth). The estimate is
+measured, not proven, but the margin is wide: the worst error seen against
+the exact formula is about half the default tolerance.
+
+The file is a small header followed by raw little-endian arrays; it is
+memory-mapped read-only, so loading costs nothing and the pages are
+shared between processes.
+
+    python -m novascope.hourangle build --step 0.1 --altitudes 0,10,20,30
+"""
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+from novascope import CACHE_DIR
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, "hourangle.bin")
+MAGIC = b"NSHA"
+FORMAT_VERSION = 1
+DEFAULT_TOLERANCE = 1e-4  # hours (0.36 s)
+FLOAT32_ERROR = 12 * 2.0 ** -23  # rounding of a stored value up to 12 hours
+SAMPLES = 4  # points per cell side used to measure the interpolation error
+HEADER_SIZE = 4096  # magic, JSON length and JSON header, zero padded; the arrays follow
+
+
+def horizon_hour_angle(lat, dec, altitude=0.0):
+    """Exact hour angle (hours) at which a star crosses ``altitude``; NaN if it never does."""
+    lat = np.radians(lat)
+    dec = np.radians(np.asarray(dec, dtype=np.float64))
+    if altitude == 0.0:
+        cos_h = -np.tan(dec) * np.tan(lat)
+    else:
+        cos_h = (np.sin(np.radians(altitude)) - np.sin(lat) * np.sin(dec)) / (np.cos(lat) * np.cos(dec))
+    with np.errstate(invalid="ignore"):
+        return np.where(np.abs(cos_h) < 1, np.degrees(np.arccos(np.clip(cos_h, -1, 1))) / 15, np.nan)
+
+
+def _grid(step):
+    count = int(round(180 / step)) + 1
+    return np.linspace(-90, 90, count)
+
+
+def _cell_bounds(values, grid, altitude, rows):
+    """Max bilinear interpolation error of each cell in ``rows`` at the points of a sub-grid.
+
+    Cells where the star stops crossing part way (some values NaN and some
+    not) get an infinite bound; cells where it never crosses get 0.
+    """
+    step = grid[1] - grid[0]
+    t = (np.arange(SAMPLES) + 0.5) / SAMPLES
+    dec = (grid[:-1, None] + t * step).ravel()
+    bounds = np.zeros((len(rows), len(grid) - 1))
+    for k, i in enumerate(rows):
+        lo, hi = values[i], values[i + 1]
+        for u in t:
+            lat = grid[i] + u * step
+            exact = horizon_hour_angle(lat, dec, altitude).reshape(-1, SAMPLES)
+            row = lo + u * (hi - lo)  # interpolate along latitude first
+            left, right = row[:-1, None], row[1:, None]
+            approx = left + t * (right - left)
+            error = np.where(np.isnan(approx) != np.isnan(exact), np.inf, np.abs(approx - exact))
+            bounds[k] = np.maximum(bounds[k], np.nanmax(error, axis=1, initial=0))
+    return bounds
+
+
+def build_table(path=DEFAULT_PATH, step=0.1, altitudes=(0.0,)):
+    """Tabulate the hour angles and write them to ``path``; returns the opened table.
+
+    The stored bound is twice the largest error found on a
+    ``SAMPLES`` x ``SAMPLES`` sub-grid of the cell, plus float32 rounding.
+    """
+    grid = _grid(step)
+    n = len(grid)
+    values = np.empty((len(altitudes), n, n), dtype=np.float32)
+    bounds = np.empty((len(altitudes), n - 1, n - 1), dtype=np.float32)
+    for a, altitude in enumerate(altitudes):
+        exact = np.stack([horizon_hour_angle(lat, grid, altitude) for lat in grid])
+        values[a] = exact
+        for start in range(0, n - 1, 256):
+            rows = range(start, min(start + 256, n - 1))
+            bounds[a, start:rows.stop] = 2 * _cell_bounds(exact, grid, altitude, rows) + 2 * FLOAT32_ERROR
+    header = {
+        "version": FORMAT_VERSION, "step": step, "size": n, "altitudes": [float(a) for a in altitudes],
+        "values": {"dtype": "<f4", "shape": list(values.shape), "offset": HEADER_SIZE},
+        "bounds": {"dtype": "<f4", "shape": list(bounds.shape), "offset": HEADER_SIZE + values.nbytes},
+    }
+    meta = json.dumps(header).encode()
+    block = MAGIC + struct.pack("<I", len(meta)) + meta
+    if len(block) > HEADER_SIZE:
+        raise ValueError(f"Too many altitudes for one table ({len(altitudes)})")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(block.ljust(HEADER_SIZE, b"\0"))
+        f.write(values.astype("<f4").tobytes())
+        f.write(bounds.astype("<f4").tobytes())
+    os.replace(path + ".tmp", path)
+    return HourAngleTable(path)
+
+
+def open_table(path=DEFAULT_PATH):
+    """The table at ``path``, or None if it has not been built."""
+    if not os.path.exists(path):
+        return None
+    return HourAngleTable(path)
+
+
+class HourAngleTable:
+    """Read-only, memory-mapped hour angle table written by ``build_table``."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an hour angle table")
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported hour angle table version {header.get('version')} in {path}")
+        self.path = path
+        self.step = header["step"]
+        self.grid = _grid(self.step)
+        self.altitudes = header["altitudes"]
+        self._sites = {}
+        for name in ("values", "bounds"):
+            spec = header[name]
+            setattr(self, name, np.memmap(path, mode="r", dtype=spec["dtype"], offset=spec["offset"],
+                                          shape=tuple(spec["shape"])))
+
+    def _site(self, lat, altitude, tolerance):
+        """Per declination cell (start, slope) at ``lat``, with start = inf in cells needing the exact formula."""
+        key = lat, altitude, tolerance
+        site = self._sites.get(key)
+        if site is None:
+            a = self.altitudes.index(float(altitude))
+            i = min(int((lat + 90) / self.step), len(self.grid) - 2)
+            u = (lat - self.grid[i]) / self.step
+            lo, hi = self.values[a, i].astype(np.float64), self.values[a, i + 1].astype(np.float64)
+            row = lo + u * (hi - lo)
+            start, slope = row[:-1].copy(), np.diff(row)
+            exact = ~(self.bounds[a, i] <= tolerance)
+            start[exact], slope[exact] = np.inf, 0.0
+            # One spare cell so dec = +90 needs no clipping
+            site = np.append(start, np.inf), np.append(slope, 0.0)
+            if len(self._sites) >= 64:
+                self._sites.clear()
+            self._sites[key] = site
+        return site
+
+    def hour_angle(self, lat, dec, altitude=0.0, tolerance=DEFAULT_TOLERANCE):
+        """Hour angle (hours, NaN if the star never crosses) for one site and many declinations.
+
+        Cells whose stored error estimate exceeds ``tolerance`` hours are
+        computed exactly; the others are interpolated and, as measured,
+        stay within it.
+        """
+        start, slope = self._site(lat, altitude, tolerance)
+        dec = np.asarray(dec, dtype=np.float64)
+        position = (dec + 90) * (1 / self.step)
+        with np.errstate(invalid="ignore"):
+            j = position.astype(np.intp)
+        position -= j
+        # A NaN declination gets a clipped garbage index but a NaN fraction, so its value stays NaN
+        h = slope.take(j, mode="clip")
+        h *= position
+        h += start.take(j, mode="clip")
+        exact = np.isinf(h)
+        if exact.any():
+            h[exact] = horizon_hour_angle(lat, dec[exact], altitude)
+        return h
+
+    def coverage(self, altitude=0.0, tolerance=DEFAULT_TOLERANCE):
+        """Share of grid cells answered from the table at ``tolerance``."""
+        return float(np.mean(self.bounds[self.altitudes.index(float(altitude))] <= tolerance))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the precomputed hour angle table.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="tabulate hour angles on a latitude/declination grid")
+    build.add_argument("--step", type=float, default=0.1, help="grid step in degrees (default: %(default)s)")
+    build.add_argument("--altitudes", default="0", help="comma separated altitudes in degrees (default: 0)")
+    build.add_argument("-o", "--output", default=DEFAULT_PATH, help="table file (default: %(default)s)")
+    info = commands.add_parser("info", help="describe a table")
+    info.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        table = build_table(args.output, args.step, [float(a) for a in args.altitudes.split(",")])
+    else:
+        table = HourAngleTable(args.path)
+    size = os.path.getsize(table.path)
+    print(f"{table.path}: {len(table.grid)}x{len(table.grid)} grid, {table.step} deg step, {size / 1e6:.1f} MB")
+    for altitude in table.altitudes:
+        print(f"  altitude {altitude:g}: {table.coverage(altitude):.2%} of cells interpolated "
+              f"within {DEFAULT_TOLERANCE * 3600:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""One shared HTTP layer for every outbound request.
+
+``shared_session()`` is a ``requests.Session`` with keep-alive connection
+pools of bounded size, a default timeout and, for GET and HEAD requests,
+retries with backoff on connection errors and 429/5xx answers. Its
+transport adapter also keeps a disk cache of GET responses that carry
+validators or a max-age; stale entries are revalidated with
+``If-None-Match`` / ``If-Modified-Since``, so an unchanged resource costs
+a 304 and no body.
+
+A session can record every exchange to a cassette file and replay it
+later with no network at all, optionally with the recorded latencies so
+benchmarks are repeatable. Set ``NOVASCOPE_RECORD`` or
+``NOVASCOPE_REPLAY`` to a cassette path (or use ``python -m novascope
+--record/--replay``) to do this for the whole application.
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+from novascope import CACHE_DIR
+
+DEFAULT_CACHE = os.path.join(CACHE_DIR, "http.sqlite")
+DEFAULT_TIMEOUT = 10
+USER_AGENT = "NovaScope"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Describe the stored (already decoded) body, so they are not replayed as is
+HOP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def request_key(request):
+    """Method, full URL and a digest of the body of a prepared request."""
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha1(body).hexdigest() if body else ""
+    return f"{request.method} {request.url} {digest}".rstrip()
+
+
+def cache_control(headers):
+    """Cache-Control directives as {name: value or True}."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or True
+    return directives
+
+
+def _stored_headers(headers):
+    return {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS}
+
+
+class ResponseCache:
+    """GET responses keyed by URL, with the time they were fetched or revalidated."""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, status INTEGER NOT NULL, "
+            "headers TEXT NOT NULL, body BLOB NOT NULL, fetched REAL NOT NULL, max_age REAL NOT NULL)"
+        )
+
+    def get(self, url):
+        """(status, headers, body, fetched, max_age), or None."""
+        with self._lock:
+            row = self._db.execute("SELECT status, headers, body, fetched, max_age FROM responses WHERE url = ?",
+                                   (url,)).fetchone()
+        if row is None:
+            return None
+        status, headers, body, fetched, max_age = row
+        return status, json.loads(headers), body, fetched, max_age
+
+    def put(self, url, status, headers, body, max_age):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                             (url, status, json.dumps(headers), body, time.time(), max_age))
+            self._db.commit()
+
+    def touch(self, url, max_age):
+        """Mark an entry fresh again after a 304."""
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched = ?, max_age = ? WHERE url = ?",
+                             (time.time(), max_age, url))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Cassette:
+    """Recorded exchanges in a JSON Lines file, replayed per request key in recording order.
+
+    Once the recordings of a key are used up its last one keeps being
+    returned, so a replayed run may repeat a request more often than the
+    recorded one did.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = defaultdict(list)
+        self._next = Counter()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, key, status, headers, body, elapsed):
+        entry = {"key": key, "status": status, "headers": headers,
+                 "body": base64.b64encode(body).decode("ascii"), "elapsed": elapsed}
+        with self._lock:
+            self._entries[key].append(entry)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def replay(self, key):
+        """(status, headers, body, elapsed) recorded for ``key``, or None."""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            entry = entries[min(self._next[key], len(entries) - 1)]
+            self._next[key] += 1
+        return entry["status"], entry["headers"], base64.b64decode(entry["body"]), entry["elapsed"]
+
+
+def _adapter_class():
+    from requests.adapters import HTTPAdapter
+    from requests.exceptions import ConnectionError
+    from urllib3.response import HTTPResponse
+
+    class ReplayMiss(ConnectionError):
+        """A request with no recording while replaying; behaves like being offline."""
+
+    class CachingAdapter(HTTPAdapter):
+        """Pooled transport with a default timeout, a conditional disk cache and record/replay."""
+
+        def __init__(self, cache=None, cassette=None, replay=False, replay_latency=False,
+                     timeout=DEFAULT_TIMEOUT, **kwargs):
+            super().__init__(**kwargs)
+            self.cache = cache
+            self.cassette = cassette
+            self.replaying = replay
+            self.replay_latency = replay_latency
+            self.timeout = timeout
+            self.counts = Counter()
+            self.ReplayMiss = ReplayMiss
+
+        def _response(self, request, status, headers, body):
+            headers = dict(headers, **{"Content-Length": str(len(body))})
+            raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status,
+                               preload_content=False, decode_content=False, request_url=request.url)
+            return self.build_response(request, raw)
+
+        def send(self, request, stream=False, timeout=None, **kwargs):
+            key = request_key(request)
+            if self.replaying:
+                recorded = self.cassette.replay(key)
+                if recorded is None:
+                    self.counts["replay_misses"] += 1
+                    raise ReplayMiss(f"No recorded response for {key}", request=request)
+                status, headers, body, elapsed = recorded
+                if self.replay_latency:
+                    time.sleep(elapsed)
+                self.counts["replayed"] += 1
+                return self._response(request, status, headers, body)
+
+            cacheable = (self.cache is not None and request.method == "GET"
+                         and "no-store" not in cache_control(request.headers))
+            cached = self.cache.get(request.url) if cacheable else None
+            if cached is not None:
+                status, headers, body, fetched, max_age = cached
+                if time.time() - fetched < max_age:
+                    self.counts["cache_hits"] += 1
+                    return self._response(request, status, headers, body)
+                if "ETag" in headers:
+                    request.headers["If-None-Match"] = headers["ETag"]
+                if "Last-Modified" in headers:
+                    request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+            start = time.monotonic()
+            response = super().send(request, stream=False, timeout=self.timeout if timeout is None else timeout,
+                                    **kwargs)
+            body = response.content
+            elapsed = time.monotonic() - start
+            self.counts["network"] += 1
+            headers = _stored_headers(response.headers)
+            status = response.status_code
+            if self.cassette is not None:
+                self.cassette.record(key, status, headers, body, elapsed)
+            if cacheable:
+                directives = cache_control(response.headers)
+                max_age = float(directives["max-age"]) if str(directives.get("max-age", "")).isdigit() else 0.0
+                if status == 304 and cached is not None:
+                    self.counts["revalidated"] += 1
+                    self.cache.touch(request.url, max_age)
+                    status, headers, body = cached[:3]
+                elif (status == 200 and "no-store" not in directives
+                      and (max_age > 0 or "ETag" in headers or "Last-Modified" in headers)):
+                    self.cache.put(request.url, status, headers, body, max_age)
+            # The body has been read; hand back a response that can still be streamed
+            return self._response(request, status, headers, body)
+
+    return CachingAdapter
+
+
+def make_session(cache_path=DEFAULT_CACHE, record=None, replay=None, replay_latency=False,
+                 timeout=DEFAULT_TIMEOUT, retries=2, backoff=0.5, pool_size=8):
+    """A ``requests.Session`` on the caching adapter.
+
+    ``record`` and ``replay`` are cassette paths (at most one). The disk
+    cache (``cache_path``, None to disable) is left out while recording or
+    replaying, so a recording holds every request of the run. At most ``pool_size`` connections are
+    kept per host; further requests wait for a free one.
+    """
+    import requests
+    from urllib3.util.retry import Retry
+
+    if record and replay:
+        raise ValueError("Cannot record and replay in the same session")
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+    adapter = _adapter_class()(
+        cache=ResponseCache(cache_path) if cache_path and not (record or replay) else None,
+        cassette=Cassette(record or replay) if record or replay else None,
+        replay=bool(replay), replay_latency=replay_latency, timeout=timeout,
+        pool_connections=16, pool_maxsize=pool_size, pool_block=True, max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def configure(**kwargs):
+    """Replace the shared session (e.g. to record or replay); takes ``make_session`` arguments."""
+    global _shared
+    session = make_session(**kwargs)
+    with _shared_lock:
+        _shared = session
+    return session
+
+
+def shared_session():
+    """The process-wide session, created on first use.
+
+    ``NOVASCOPE_RECORD`` / ``NOVASCOPE_REPLAY`` select a cassette.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = make_session(record=os.environ.get("NOVASCOPE_RECORD"),
+                                   replay=os.environ.get("NOVASCOPE_REPLAY"))
+        return _shared
+
+
+def http_counts(session=None):
+    """Counters of the session's adapter: network, cache_hits, revalidated, replayed, replay_misses."""
+    session = shared_session() if session is None else session
+    return dict(session.get_adapter("https://").counts)
+
+
+def geopy_adapter(session=None):
+    """``adapter_factory`` for geopy geocoders that sends their requests through ``session``."""
+    from geopy.adapters import BaseSyncAdapter
+    from geopy.exc import GeocoderServiceError
+
+    class SessionAdapter(BaseSyncAdapter):
+        def __init__(self, *, proxies, ssl_context):
+            super().__init__(proxies=proxies, ssl_context=ssl_context)
+            self.session = shared_session() if session is None else session
+
+        def get_text(self, url, *, timeout, headers):
+            try:
+                response = self.session.get(url, timeout=timeout, headers=headers)
+                response.raise_for_status()
+            except Exception as e:
+                raise GeocoderServiceError(str(e))
+            return response.text
+
+        def get_json(self, url, *, timeout, headers):
+            return json.loads(self.get_text(url, timeout=timeout, headers=headers))
+
+    return SessionAdapter
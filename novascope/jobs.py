@@ -0,0 +1,138 @@
+"""Background job queue for the Tk application.
+
+Jobs run on worker threads and never touch widgets. Anything that has to
+reach the UI goes through ``Job.post`` and is executed on the Tk thread by
+a ``root.after`` poller.
+"""
+import itertools
+import queue
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function by ``Job.check`` after ``cancel``."""
+
+
+class Job:
+    """A unit of background work with progress, cancellation and callbacks.
+
+    ``fn`` is called as ``fn(job)`` on a worker thread. ``on_done(result)``
+    and ``on_error(exception)`` run on the Tk thread.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, title, fn, on_done=None, on_error=None):
+        self.id = next(Job._ids)
+        self.title = title
+        self.fn = fn
+        self.on_done = on_done
+        self.on_error = on_error
+        self.state = "queued"
+        self.done = 0
+        self.total = 0
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._events = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Abort the job function if the user pressed Cancel."""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report(self, done, total=None):
+        """Update the progress counters (polled by the UI)."""
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def post(self, fn, *args):
+        """Run ``fn(*args)`` on the Tk thread."""
+        self._events.put((fn, args))
+
+    @property
+    def rate(self):
+        """Items processed per second so far."""
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+
+class JobQueue:
+    """FIFO of jobs run by ``workers`` threads, polled from the Tk loop."""
+
+    def __init__(self, root, workers=1, poll_ms=50, on_update=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_update = on_update
+        self.jobs = []  # queued and running, in submission order
+        self._pending = queue.Queue()
+        self._events = queue.Queue()
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, job):
+        job._events = self._events
+        self.jobs.append(job)
+        self._pending.put(job)
+        return job
+
+    def running(self):
+        return [job for job in self.jobs if job.state == "running"]
+
+    def queued(self):
+        return [job for job in self.jobs if job.state == "queued"]
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            if job.cancelled:
+                job.state = "cancelled"
+                self._events.put((self._finish, (job,)))
+                continue
+            job.state = "running"
+            job.started = time.perf_counter()
+            try:
+                result = job.fn(job)
+            except JobCancelled:
+                job.state = "cancelled"
+            except Exception as e:
+                job.state = "failed"
+                if job.on_error:
+                    self._events.put((job.on_error, (e,)))
+            else:
+                job.state = "cancelled" if job.cancelled else "done"
+                if job.on_done and job.state == "done":
+                    self._events.put((job.on_done, (result,)))
+            job.finished = time.perf_counter()
+            self._events.put((self._finish, (job,)))
+
+    def _finish(self, job):
+        self.jobs.remove(job)
+
+    def _poll(self):
+        try:
+            while True:
+                fn, args = self._events.get_nowait()
+                fn(*args)
+        except queue.Empty:
+            pass
+        finally:
+            if self.on_update:
+                self.on_update(self)
+            self.root.after(self.poll_ms, self._poll)
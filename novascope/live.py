@@ -0,0 +1,85 @@
+"""Live "what is up right now" tracking driven by rise and set events.
+
+The next rise and set of every star is computed once, from the sidereal
+rise/set times, and only each star's next event is kept in a heap. A tick
+pops the events that have fired and schedules the following one a
+sidereal day later, so its cost is proportional to the number of horizon
+crossings since the last tick and not to the number of stars.
+"""
+import heapq
+
+import numpy as np
+
+from novascope.engine import convert_dec_to_hours, obs_star_batch
+from novascope.horizon import gmst
+
+SIDEREAL_DAY = 86164.0905  # seconds
+SOLAR_PER_SIDEREAL = 0.9972695663
+UNIX_EPOCH_JD = 2440587.5
+
+
+def local_sidereal_time(t, lon):
+    """LST in hours at Unix time ``t`` (seconds, UTC) and longitude ``lon``."""
+    return ((gmst(t / 86400 + UNIX_EPOCH_JD) + lon) / 15) % 24
+
+
+def clock_time(t, offset):
+    """Unix time ``t`` as HH:MM:SS at a UTC offset in hours."""
+    return convert_dec_to_hours((t / 3600 + offset) % 24)
+
+
+class LiveSky:
+    """Which stars are above the horizon, kept current by ``tick``.
+
+    ``up`` is a boolean array over the stars; ``next_rise`` and ``next_set``
+    are the Unix times of each star's coming events (NaN for stars that
+    are always up or never rise).
+    """
+
+    def __init__(self, ra, dec, lat, lon, now):
+        lst_rise, lst_set, circumpolar, _ = obs_star_batch(lat, ra, dec)
+        lst = local_sidereal_time(now, lon)
+        seconds = 3600 * SOLAR_PER_SIDEREAL
+        self.next_rise = now + (lst_rise - lst) % 24 * seconds
+        self.next_set = now + (lst_set - lst) % 24 * seconds
+        crosses = ~np.isnan(lst_rise)
+        # Up now if the coming set is before the coming rise
+        self.up = np.where(crosses, self.next_set < self.next_rise, circumpolar)
+        self.circumpolar = circumpolar
+        self.now = now
+        stars = np.flatnonzero(crosses)
+        first = np.where(self.up[stars], self.next_set[stars], self.next_rise[stars])
+        self._events = list(zip(first.tolist(), stars.tolist()))
+        heapq.heapify(self._events)
+
+    def __len__(self):
+        return len(self.up)
+
+    def visible(self):
+        """Indices of the stars up at the last tick."""
+        return np.flatnonzero(self.up)
+
+    def next_event(self, i):
+        """Unix time of star ``i``'s next rise (if down) or set (if up); NaN if it has none."""
+        return self.next_set[i] if self.up[i] else self.next_rise[i]
+
+    def tick(self, now):
+        """Advance to ``now``; returns (rose, set) index lists of stars whose state changed."""
+        events = self._events
+        before = {}
+        while events and events[0][0] <= now:
+            _, i = heapq.heappop(events)
+            before.setdefault(i, self.up[i])
+            if self.up[i]:
+                self.up[i] = False
+                self.next_set[i] += SIDEREAL_DAY
+                heapq.heappush(events, (self.next_rise[i], i))
+            else:
+                self.up[i] = True
+                self.next_rise[i] += SIDEREAL_DAY
+                heapq.heappush(events, (self.next_set[i], i))
+        self.now = now
+        # A star can rise and set again within one long tick; only net changes count
+        rose = [i for i, was_up in before.items() if self.up[i] and not was_up]
+        set_ = [i for i, was_up in before.items() if was_up and not self.up[i]]
+        return rose, set_
@@ -0,0 +1,126 @@
+"""Observability for a network of sites over a shared UTC time grid.
+
+Work is split by what it depends on: UTC offsets once per (timezone,
+day), the Julian Day and ``gst_0`` sidereal term once per (epoch, site),
+the rise/set sidereal times once per (site, star), and only the final
+comparison is broadcast over the full (epoch, site, star) cube, in chunks
+of stars.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from novascope.engine import JulianDay, gmst0, is_observe_batch, obs_star_batch
+from novascope.planner import MAX_CELLS, STEP_UNITS, visible_windows
+
+Site = namedtuple("Site", ["name", "lat", "lon", "offset"])  # offset None: look up the site's timezone
+NetworkEpochs = namedtuple("NetworkEpochs", ["times", "JD", "gst_0", "offset", "lct"])
+BestWindows = namedtuple("BestWindows", ["site", "star", "start", "end"])
+
+
+def network_epochs(sites, start, end, step, unit="hours", timezones=None):
+    """UTC epochs from ``start`` to ``end`` every ``step`` units, as seen from each site.
+
+    ``times`` has one entry per epoch; ``JD`` (local), ``gst_0``, ``offset``
+    and ``lct`` are shaped (epochs, sites).
+    """
+    delta = STEP_UNITS[unit] * step
+    if delta.total_seconds() <= 0:
+        raise ValueError("Step must be positive.")
+    if end < start:
+        raise ValueError("End date must not be before the start date.")
+    count = int((end - start) / delta) + 1
+    times = [start + i * delta for i in range(count)]
+    seconds = np.array([(time - start).total_seconds() for time in times])
+    JD_ut = JulianDay(f"{start.year}-{start.month}-{start.day}", [start.hour, start.minute, start.second])
+    JD_ut = JD_ut + seconds / 86400
+    offset = np.empty((count, len(sites)))
+    zones = {}
+    for j, site in enumerate(sites):
+        if site.offset is not None:
+            offset[:, j] = site.offset
+            continue
+        zone = timezones.timezone_at(site.lat, site.lon)
+        if zone not in zones:
+            zones[zone] = _zone_offsets(timezones, zone, JD_ut)
+        offset[:, j] = zones[zone]
+    JD = JD_ut[:, None] + offset / 24
+    ut = (start.hour + start.minute / 60 + start.second / 3600 + seconds / 3600) % 24
+    lct = (ut[:, None] + offset) % 24
+    return NetworkEpochs(times, JD, gmst0(JD), offset, lct)
+
+
+def _zone_offsets(timezones, zone, JD_ut):
+    """UTC offset of ``zone`` at each UTC epoch, looked up once per UTC day.
+
+    A day whose offset differs at its two ends (a DST change) is resolved
+    epoch by epoch.
+    """
+    if zone is None:
+        return np.zeros(len(JD_ut))
+
+    def at(jd):
+        # The service wants the local JD; one refinement gets DST changes right
+        guess = timezones.zone_offset(zone, jd)
+        return timezones.zone_offset(zone, jd + guess / 24)
+
+    days, index = np.unique(np.floor(JD_ut - 0.5), return_inverse=True)  # JD day numbers start at noon
+    first = np.array([at(day + 0.5) for day in days])
+    last = np.array([at(day + 1.5 - 1e-6) for day in days])
+    offset = first[index]
+    for i in np.flatnonzero(first[index] != last[index]):
+        offset[i] = at(JD_ut[i])
+    return offset
+
+
+def _lct_cube(lst, lon, epochs):
+    """``lst_to_lct_batch`` for (sites, stars) LSTs at every epoch, in place.
+
+    Same arithmetic, but the (epochs, sites, stars) cube is allocated once;
+    UTC offsets are within a day, so a single conditional wrap equals ``% 24``.
+    """
+    gst = (lst - lon / 15) % 24
+    lct = np.subtract(gst[None], epochs.gst_0[:, :, None])
+    lct *= 0.9972695663
+    np.add(lct, 24, out=lct, where=lct < 0)
+    lct += epochs.offset[:, :, None]
+    np.subtract(lct, 24, out=lct, where=lct >= 24)
+    np.add(lct, 24, out=lct, where=lct < 0)
+    return lct
+
+
+def site_matrix(ra, dec, sites, epochs):
+    """Observable flags shaped (epochs, sites, stars).
+
+    Each (epoch, site) slice equals ``observability`` for that site's local
+    JD, offset and time.
+    """
+    ra = np.asarray(ra, dtype=np.float64)[None, :]
+    dec = np.asarray(dec, dtype=np.float64)[None, :]
+    lat = np.array([site.lat for site in sites], dtype=np.float64)[:, None]
+    lon = np.array([site.lon for site in sites], dtype=np.float64)[:, None]
+    lst_rise, lst_set, circumpolar, _ = obs_star_batch(lat, ra, dec)
+    rise = _lct_cube(lst_rise, lon, epochs)
+    set_time = _lct_cube(lst_set, lon, epochs)
+    return is_observe_batch(epochs.lct[:, :, None], rise, set_time, circumpolar[None])
+
+
+def best_windows(ra, dec, sites, epochs, chunk_size=None):
+    """Yield the longest visible run of epochs for every (site, star), chunk by chunk.
+
+    Star indices are global; pairs that are never visible are left out.
+    """
+    epoch_count, site_count = epochs.JD.shape
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CELLS // (epoch_count * site_count))
+    for first in range(0, len(ra), chunk_size):
+        observable = site_matrix(ra[first:first + chunk_size], dec[first:first + chunk_size], sites, epochs)
+        stars = observable.shape[2]
+        column, start, end = visible_windows(observable.reshape(epoch_count, -1))
+        # Longest run first within each (site, star) column, earliest on ties
+        order = np.lexsort((start, start - end, column))
+        column, start, end = column[order], start[order], end[order]
+        first_of_column = np.ones(len(column), dtype=bool)
+        first_of_column[1:] = column[1:] != column[:-1]
+        column, start, end = column[first_of_column], start[first_of_column], end[first_of_column]
+        yield BestWindows(column // stars, column % stars + first, start, end)
@@ -0,0 +1,191 @@
+"""The observation flows behind the GUI, without Tk.
+
+``Pipeline`` holds the catalog, name resolver and timezone service and
+exposes the steps the GUI jobs run on their worker thread, so the same
+code can be driven headless by scripts and the benchmarks.
+"""
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from novascope.engine import epoch_context, obs_star_batch
+from novascope.horizon import horizontal, meets
+from novascope.resolver import SimbadTap
+from novascope.stats import NULL_STATS
+
+SingleStar = namedtuple("SingleStar", "ra dec lct_rise lct_set observable offset alt az airmass")
+
+
+def simbad_random_stars(n):
+    """Names of HIP stars from a Simbad query (50 to draw from for a single star)."""
+    rows = SimbadTap()(
+        f"SELECT TOP {50 if n == 1 else int(n)} basic.main_id FROM basic "
+        "JOIN ident ON ident.oidref = basic.oid WHERE ident.id LIKE 'HIP %'"
+    )
+    if not rows:
+        raise LookupError("No stars found in Simbad database.")
+    names = [row[0] for row in rows]
+    if n == 1:
+        return [random.choice(names)]
+    return names
+
+
+class Pipeline:
+    """Star selection, coordinates, timezone and observability for one run.
+
+    ``catalog`` may be None (no offline catalog imported); random stars then
+    come from ``star_source``, a callable ``n -> names``. Set ``stats`` to a
+    ``novascope.stats.Stats`` to time each step of a run. With a
+    ``novascope.runcache.RunCache`` as ``cache``, repeated runs reuse earlier
+    results and rise/set times.
+    """
+
+    def __init__(self, catalog, resolver, timezones, star_source=simbad_random_stars, rng=None, cache=None):
+        self.catalog = catalog
+        self.resolver = resolver
+        self.timezones = timezones
+        self.star_source = star_source
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.cache = cache
+        self.stats = NULL_STATS
+
+    def random_stars(self, n):
+        """Names of n random stars; safe to call from a worker thread."""
+        if self.catalog is not None:
+            # Offline catalog: no 50 star limit
+            return self.catalog.names(self.catalog.sample(n, rng=self.rng))
+        with self.stats.stage("star_source"):
+            self.stats.count("network.star_source")
+            return self.star_source(n)
+
+    def stars_above_horizon(self, n, epoch):
+        """n random catalog stars that are above the horizon, found through the sky index."""
+        with self.stats.stage("sky_index"):
+            candidates = self.catalog.sky_index().above_horizon(epoch.lat, epoch.lst)
+        if len(candidates) > n:
+            candidates = self.rng.choice(candidates, n, replace=False)
+        return self.catalog.names(candidates)
+
+    def select_stars(self, n, obs, epoch):
+        """Stars for a multi-star run; only risen ones when ``obs`` and a catalog allows it."""
+        with self.stats.stage("select_stars"):
+            if obs and self.catalog is not None:
+                return self.stars_above_horizon(n, epoch)
+            return self.random_stars(n)
+
+    def star_coordinates(self, stars):
+        """RA (hours) and Dec (degrees) arrays, from the local catalog when possible."""
+        stats = self.stats
+        with stats.stage("catalog_lookup"):
+            if self.catalog is not None:
+                ra, dec = self.catalog.lookup(stars)
+            else:
+                ra = np.full(len(stars), np.nan)
+                dec = np.full(len(stars), np.nan)
+            missing = np.flatnonzero(np.isnan(ra))
+        stats.count("catalog.hits", len(stars) - len(missing))
+        if len(missing) == 0:
+            return ra, dec
+        if stats.enabled:
+            before = self.resolver.hits, self.resolver.misses, self.resolver.requests
+        with stats.stage("resolve"):
+            coords, errors = self.resolver.resolve_many([stars[i] for i in missing])
+        if stats.enabled:
+            stats.count("resolver.cache_hits", self.resolver.hits - before[0])
+            stats.count("resolver.cache_misses", self.resolver.misses - before[1])
+            stats.count("network.resolver", self.resolver.requests - before[2])
+            stats.count("resolver.errors", len(errors))
+        for i in missing:
+            # Names that could not be resolved stay NaN
+            ra[i], dec[i] = coords.get(stars[i], (np.nan, np.nan))
+        return ra, dec
+
+    def timezone_offset(self, lat, lon, JD):
+        """UTC offset (hours) at the site on the observation date."""
+        stats = self.stats
+        if stats.enabled:
+            before = self.timezones.cache_info()["zones"]
+        with stats.stage("timezone"):
+            offset = self.timezones.offset(lat, lon, JD)
+        if stats.enabled:
+            after = self.timezones.cache_info()["zones"]
+            stats.count("timezone.cache_hits", after.hits - before.hits)
+            stats.count("timezone.cache_misses", after.misses - before.misses)
+        return offset
+
+    def epoch(self, lat, lon, JD, lct_observer):
+        """The run's ``Epoch`` at the site, with the UTC offset looked up once."""
+        return epoch_context(JD, lct_observer, lat, lon, self.timezone_offset(lat, lon, JD))
+
+    def sidereal(self, stars, lat):
+        """(ra, dec, ``obs_star_batch`` result) for the stars at a latitude.
+
+        None of it depends on the date or time, so it is taken from the run
+        cache when the same stars were looked at from the same latitude.
+        """
+        key = None if self.cache is None else self.cache.sidereal_key("sidereal", lat, stars)
+        value = self._cached(key, "run_cache.sidereal_hits")
+        if value is None:
+            ra, dec = self.star_coordinates(stars)
+            with self.stats.stage("observability"):
+                value = ra, dec, obs_star_batch(lat, ra, dec)
+            if key is not None and not np.isnan(ra).any():  # unresolved names are retried next time
+                self.cache.put(key, value)
+        return value
+
+    def single_star(self, star_name, epoch, min_altitude=0.0, max_airmass=None):
+        """Rise/set and observability of one named star; LookupError if unknown.
+
+        The star is observable when its altitude and airmass meet the
+        criteria, so the flag always agrees with the position reported.
+        """
+        kind = "single_star", min_altitude, max_airmass
+        key = None if self.cache is None else self.cache.result_key(kind, epoch, [star_name])
+        star = self._cached(key, "run_cache.hits")
+        if star is not None:
+            return star
+        ra, dec, sidereal = self.sidereal([star_name], epoch.lat)
+        if np.isnan(ra[0]):
+            raise LookupError(f"Could not resolve star name '{star_name}'.")
+        with self.stats.stage("observability"):
+            result = epoch.observability(ra, dec, sidereal)
+            position = horizontal(ra, dec, epoch.lat, epoch.lon, epoch.JD, epoch.offset)
+        self.stats.count("rows")
+        observable = bool(meets(position, min_altitude, max_airmass)[0])
+        star = SingleStar(ra[0], dec[0], result.rise[0], result.set[0], observable, epoch.offset,
+                          position.alt[0], position.az[0], position.airmass[0])
+        if key is not None:
+            self.cache.put(key, star)
+        return star
+
+    def evaluate(self, stars, epoch, min_altitude=0.0, max_airmass=None):
+        """(ra, dec, Observability) for one chunk of a multi-star run.
+
+        With a minimum altitude above the horizon or a maximum airmass,
+        ``observable`` also requires the star's position to meet them.
+        """
+        kind = "evaluate", min_altitude, max_airmass
+        key = None if self.cache is None else self.cache.result_key(kind, epoch, stars)
+        value = self._cached(key, "run_cache.hits")
+        if value is None:
+            ra, dec, sidereal = self.sidereal(stars, epoch.lat)
+            with self.stats.stage("observability"):
+                result = epoch.observability(ra, dec, sidereal)
+                if min_altitude > 0 or max_airmass is not None:
+                    position = horizontal(ra, dec, epoch.lat, epoch.lon, epoch.JD, epoch.offset)
+                    result = result._replace(observable=result.observable & meets(position, min_altitude,
+                                                                                   max_airmass))
+                value = ra, dec, result
+            if key is not None and not np.isnan(ra).any():
+                self.cache.put(key, value)
+        self.stats.count("rows", len(stars))
+        return value
+
+    def _cached(self, key, counter):
+        if key is None:
+            return None
+        value = self.cache.get(key)
+        if value is not None:
+            self.stats.count(counter)
+        return value
@@ -0,0 +1,83 @@
+"""Multi-night visibility planner.
+
+Evaluates every target over a grid of local epochs in one broadcast pass.
+Per-epoch terms (Julian Day, the ``gst_0`` sidereal term and the UTC
+offset) are computed once per step and shared by all stars.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+
+from novascope.engine import JulianDay, gmst0, is_observe_batch, lst_to_lct_batch, obs_star_batch
+
+STEP_UNITS = {"days": timedelta(days=1), "hours": timedelta(hours=1), "minutes": timedelta(minutes=1)}
+MAX_CELLS = 4000000  # epochs x stars evaluated at once by plan_windows
+
+Epochs = namedtuple("Epochs", ["times", "JD", "gst_0", "offset", "lct"])
+Plan = namedtuple("Plan", ["rise", "set", "transit", "observable", "circumpolar", "never_rises"])
+Windows = namedtuple("Windows", ["star", "start", "end", "rise", "transit", "set"])
+
+
+def epoch_grid(start, end, step, unit="hours", lat=None, lon=None, offset=None, timezones=None):
+    """Local civil epochs from ``start`` to ``end`` (inclusive) every ``step`` units.
+
+    The UTC offset is either fixed (``offset`` in hours) or looked up per
+    epoch through a ``TimezoneService`` for the site at ``lat``/``lon``.
+    """
+    delta = STEP_UNITS[unit] * step
+    if delta <= timedelta(0):
+        raise ValueError("Step must be positive.")
+    if end < start:
+        raise ValueError("End date must not be before the start date.")
+    count = int((end - start) / delta) + 1
+    times = [start + i * delta for i in range(count)]
+    JD0 = JulianDay(f"{start.year}-{start.month}-{start.day}", [start.hour, start.minute, start.second])
+    JD = JD0 + np.array([(time - start).total_seconds() for time in times]) / 86400
+    if offset is None:
+        offsets = np.array([timezones.offset(lat, lon, jd) for jd in JD], dtype=np.float64)
+    else:
+        offsets = np.full(count, float(offset))
+    lct = np.array([time.hour + time.minute / 60 + time.second / 3600 for time in times])
+    return Epochs(times, JD, gmst0(JD), offsets, lct)
+
+
+def plan(ra, dec, lat, lon, epochs):
+    """Rise, set and transit LCT plus observable flags, shaped (epochs, stars)."""
+    ra = np.asarray(ra, dtype=np.float64)
+    lst_rise, lst_set, circumpolar, never_rises = obs_star_batch(lat, ra, dec)
+    JD = epochs.JD[:, None]
+    offset = epochs.offset[:, None]
+    gst_0 = epochs.gst_0[:, None]
+    rise = lst_to_lct_batch(lst_rise, JD, offset, lon, gst_0)
+    set_time = lst_to_lct_batch(lst_set, JD, offset, lon, gst_0)
+    transit = lst_to_lct_batch(ra, JD, offset, lon, gst_0)
+    observable = is_observe_batch(epochs.lct[:, None], rise, set_time, circumpolar)
+    return Plan(rise, set_time, transit, observable, circumpolar, never_rises)
+
+
+def visible_windows(observable):
+    """Runs of consecutive observable epochs as (star, first epoch, last epoch) arrays."""
+    padded = np.zeros((observable.shape[0] + 2, observable.shape[1]), dtype=np.int8)
+    padded[1:-1] = observable
+    edges = np.diff(padded, axis=0)
+    start_epoch, start_star = np.nonzero(edges == 1)
+    end_epoch, end_star = np.nonzero(edges == -1)
+    starts = np.lexsort((start_epoch, start_star))
+    ends = np.lexsort((end_epoch, end_star))
+    return start_star[starts], start_epoch[starts], end_epoch[ends] - 1
+
+
+def plan_windows(ra, dec, lat, lon, epochs, chunk_size=None):
+    """Yield ``Windows`` for any number of stars in chunks of bounded memory.
+
+    Star indices are global; rise/transit/set are the LCT values on the
+    window's first epoch.
+    """
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CELLS // len(epochs.JD))
+    for first in range(0, len(ra), chunk_size):
+        result = plan(ra[first:first + chunk_size], dec[first:first + chunk_size], lat, lon, epochs)
+        star, start, end = visible_windows(result.observable)
+        yield Windows(star + first, start, end, result.rise[start, star], result.transit[start, star],
+                      result.set[start, star])
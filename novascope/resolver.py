@@ -0,0 +1,349 @@
+"""Persistent star name -> ICRS coordinate cache.
+
+Every successful lookup is stored in a small SQLite database so repeated
+observations of the same targets need no Sesame/Simbad round-trips.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from novascope import CACHE_DIR
+from novascope.httpclient import shared_session
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, "resolver.sqlite")
+DEFAULT_TTL = 30 * 24 * 3600  # coordinates barely change; refresh monthly
+DEFAULT_MAX_ENTRIES = 200000
+SESAME_URL = "https://cds.unistra.fr/cgi-bin/nph-sesame/-oI/SNV"
+SIMBAD_TAP_URL = "https://simbad.cds.unistra.fr/simbad/sim-tap/sync"
+
+
+def normalize_name(name):
+    """Canonical spelling used as the alias key ("hip  32349" -> "HIP 32349")."""
+    return " ".join(str(name).split()).upper()
+
+
+class SesameResolver:
+    """Resolve one name through the CDS Sesame HTTP service.
+
+    Returns (RA hours, Dec degrees, aliases). ``url`` can point at a local
+    stand-in server that speaks the same plain-text format. Requests go
+    through ``session`` (default: the shared pooled session).
+    """
+
+    def __init__(self, url=SESAME_URL, timeout=10, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session
+
+    def __call__(self, name):
+        session = shared_session() if self.session is None else self.session
+        response = session.get(self.url, params=name, timeout=self.timeout)
+        response.raise_for_status()
+        coords = None
+        aliases = []
+        for line in response.text.splitlines():
+            if line.startswith("%J ") and coords is None:
+                ra, dec = line.split()[1:3]
+                coords = float(ra) / 15, float(dec)
+            elif line.startswith(("%I.0 ", "%I ")):
+                # %I.0 is the main identifier, %I every other one
+                alias = line.partition(" ")[2].strip()
+                if alias:
+                    aliases.append(alias)
+        if coords is None:
+            raise LookupError(f"Sesame could not resolve {name!r}")
+        return coords[0], coords[1], aliases
+
+
+def adql_string(value):
+    """An ADQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class SimbadTap:
+    """Synchronous ADQL queries against the SIMBAD TAP service.
+
+    Returns the result rows as lists. Like ``SesameResolver``, requests go
+    through ``session`` (default: the shared pooled session) and ``url``
+    can point at a local stand-in. Queries are sent as GET so the session
+    retries them like any other read.
+    """
+
+    def __init__(self, url=SIMBAD_TAP_URL, timeout=10, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session
+
+    def __call__(self, query):
+        session = shared_session() if self.session is None else self.session
+        response = session.get(self.url, timeout=self.timeout,
+                               params={"REQUEST": "doQuery", "LANG": "ADQL", "FORMAT": "json", "QUERY": query})
+        response.raise_for_status()
+        return response.json()["data"]
+
+
+def simbad_batch_resolver(names, timeout=10, session=None, url=SIMBAD_TAP_URL):
+    """Resolve many names with one SIMBAD query on identifiers.
+
+    Returns {name: (RA hours, Dec degrees)}; unknown names are left out.
+    Names must be spelled as SIMBAD spells its identifiers ("HIP 32349",
+    "NAME Sirius") up to spacing; the others are left to the per-name
+    resolver.
+    """
+    wanted = {normalize_name(name): name for name in names}
+    idents = ", ".join(adql_string(" ".join(str(name).split())) for name in names)
+    rows = SimbadTap(url, timeout, session)(
+        "SELECT ident.id, basic.ra, basic.dec FROM ident JOIN basic ON ident.oidref = basic.oid "
+        f"WHERE ident.id IN ({idents})"
+    )
+    found = {}
+    for ident, ra, dec in rows:
+        name = wanted.get(normalize_name(ident))
+        if name is not None and ra is not None and dec is not None:
+            found[name] = float(ra) / 15, float(dec)
+    return found
+
+
+def run_concurrent(calls, workers=8, timeout=10):
+    """Run ``{key: (fn, arg)}`` on a bounded thread pool.
+
+    Every call gets ``timeout`` seconds. Nothing is retried here: Sesame
+    and SIMBAD lookups are GET requests on the shared HTTP session, which
+    retries those with backoff. Returns ``(results, errors)`` keyed like ``calls`` so callers
+    always get whatever succeeded. A timed-out call cannot be killed and
+    keeps its worker until it returns, so resolvers should also apply
+    their own socket timeouts.
+    """
+    results = {}
+    errors = {}
+    if not calls:
+        return results, errors
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = {}  # future -> (key, deadline)
+    abandoned = set()  # timed-out calls still holding a worker
+    queued = deque(calls)
+    try:
+        while pending or queued:
+            now = time.monotonic()
+            abandoned = {future for future in abandoned if not future.done()}
+            # Only submit what can start right away so the deadline covers
+            # the request itself, not time spent queued behind other work.
+            while queued and len(pending) + len(abandoned) < workers:
+                key = queued.popleft()
+                fn, arg = calls[key]
+                pending[pool.submit(fn, arg)] = key, now + timeout
+            wakeups = [deadline for _, deadline in pending.values()]
+            done, _ = wait(set(pending) | abandoned, timeout=max(0.0, min(wakeups) - now) if wakeups else None,
+                           return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in list(pending):
+                key, deadline = pending[future]
+                if future in done:
+                    error = future.exception()
+                    if error is None:
+                        results[key] = future.result()
+                    else:
+                        errors[key] = error
+                elif now >= deadline:
+                    errors[key] = TimeoutError(f"no answer within {timeout}s")
+                    abandoned.add(future)
+                else:
+                    continue
+                del pending[future]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors
+
+
+class ResolverCache:
+    """SQLite backed name resolver with TTL and LRU size bound.
+
+    ``resolver`` is any callable ``name -> (ra_hours, dec_degrees[, aliases])``
+    and ``batch_resolver`` any callable ``names -> {name: (ra, dec)}``; tests
+    and offline runs can pass local stand-ins instead of Sesame/Simbad.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, resolver=None, ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, clock=time.time, batch_resolver=simbad_batch_resolver):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.resolver = SesameResolver() if resolver is None else resolver
+        self.batch_resolver = batch_resolver
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0  # batch and single lookups sent to the resolvers
+        self._lock = threading.Lock()
+        self._used = {}  # name -> last hit, written out by _flush_used
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS coords (
+                name TEXT PRIMARY KEY,
+                ra REAL NOT NULL,
+                dec REAL NOT NULL,
+                fetched REAL NOT NULL,
+                used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias TEXT PRIMARY KEY,
+                name TEXT NOT NULL REFERENCES coords(name) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS coords_used ON coords(used);
+            """
+        )
+
+    def get(self, name):
+        """Cached (ra, dec) for ``name`` or None when missing or expired."""
+        alias = normalize_name(name)
+        now = self.clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT c.name, c.ra, c.dec, c.fetched FROM aliases a "
+                "JOIN coords c ON c.name = a.name WHERE a.alias = ?",
+                (alias,),
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl:
+                return None
+            # Hits only touch memory; the LRU order reaches disk on the next put, flush or close
+            self._used[row[0]] = now
+        return row[1], row[2]
+
+    def put(self, name, ra, dec, aliases=()):
+        """Store coordinates for ``name`` and any extra spellings of it."""
+        key = normalize_name(name)
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO coords (name, ra, dec, fetched, used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET ra = excluded.ra, dec = excluded.dec, "
+                "fetched = excluded.fetched, used = excluded.used",
+                (key, float(ra), float(dec), now, now),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO aliases (alias, name) VALUES (?, ?)",
+                [(normalize_name(a), key) for a in (key, *aliases)],
+            )
+            self._used.pop(key, None)
+            self._flush_used()
+            self._evict()
+            self._db.commit()
+
+    def flush(self):
+        """Write out the last-use times of cache hits."""
+        with self._lock:
+            if self._used:
+                self._flush_used()
+                self._db.commit()
+
+    def add_alias(self, alias, name):
+        """Make ``alias`` resolve to the already cached ``name``."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO aliases (alias, name) VALUES (?, ?)",
+                (normalize_name(alias), normalize_name(name)),
+            )
+            self._db.commit()
+
+    def resolve(self, name):
+        """Return (RA hours, Dec degrees), hitting the network only on a miss."""
+        cached = self.get(name)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        ra, dec, *aliases = self.resolver(name)
+        self.put(name, ra, dec, *aliases)
+        return ra, dec
+
+    def resolve_many(self, names, batch_size=200, workers=8, timeout=10):
+        """Resolve a list of names, returning ``(coords, errors)`` dicts.
+
+        Cache hits are answered locally. The remaining names are first sent
+        to ``batch_resolver`` in chunks of ``batch_size``; whatever the batch
+        queries miss is looked up one by one. Both stages run concurrently on
+        ``workers`` threads with per-request timeouts; retries are left to the
+        HTTP session.
+        """
+        coords = {}
+        missing = []
+        for name in dict.fromkeys(names):
+            cached = self.get(name)
+            if cached is None:
+                missing.append(name)
+            else:
+                coords[name] = cached
+        self.hits += len(coords)
+        self.misses += len(missing)
+
+        if self.batch_resolver is not None and len(missing) > 1:
+            chunks = {i: (self.batch_resolver, missing[i:i + batch_size])
+                      for i in range(0, len(missing), batch_size)}
+            self.requests += len(chunks)
+            found, _ = run_concurrent(chunks, workers, timeout)
+            for batch in found.values():
+                for name, (ra, dec) in batch.items():
+                    self.put(name, ra, dec)
+                    coords[name] = ra, dec
+            missing = [name for name in missing if name not in coords]
+
+        self.requests += len(missing)
+        found, errors = run_concurrent({name: (self.resolver, name) for name in missing}, workers, timeout)
+        for name, (ra, dec, *aliases) in found.items():
+            self.put(name, ra, dec, *aliases)
+            coords[name] = ra, dec
+        self.flush()
+        return coords, errors
+
+    def warm(self, names, **kwargs):
+        """Resolve every name not already cached; returns the names that failed."""
+        _, errors = self.resolve_many(names, **kwargs)
+        return list(errors)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM coords").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def _flush_used(self):
+        self._db.executemany("UPDATE coords SET used = ? WHERE name = ?",
+                             [(used, name) for name, used in self._used.items()])
+        self._used.clear()
+
+    def _evict(self):
+        count = self._db.execute("SELECT COUNT(*) FROM coords").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM coords WHERE name IN "
+                "(SELECT name FROM coords ORDER BY used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm up the NovaScope name resolver cache.")
+    parser.add_argument("names", help="text file with one star name per line")
+    parser.add_argument("--cache", default=DEFAULT_PATH, help="cache database path")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent lookups")
+    args = parser.parse_args(argv)
+    with open(args.names) as f:
+        names = [line.strip() for line in f if line.strip()]
+    cache = ResolverCache(args.cache)
+    failed = cache.warm(names, workers=args.workers)
+    print(f"Cached {len(names) - len(failed)} of {len(names)} names ({len(cache)} total)")
+    for name in failed:
+        print("Failed:", name)
+
+
+if __name__ == "__main__":
+    main()
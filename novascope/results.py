@@ -0,0 +1,195 @@
+"""Array-backed results of a multi-star run.
+
+Rows live in one packed structured array (30 bytes per star) and star
+names in a shared UTF-8 pool addressed by integer IDs; sorting and filtering work on the arrays
+and text is only produced for the rows actually shown or exported.
+"""
+import sys
+
+import numpy as np
+
+from novascope.engine import convert_dec_to_hours
+from novascope.export import open_writer
+
+RISES, CIRCUMPOLAR, NEVER_RISES, UNRESOLVED = range(4)
+STATUS_NAMES = np.array(["rises", "circumpolar", "never_rises", "unresolved"])
+COLUMNS = ["name", "ra", "dec", "rise", "set", "observable", "status"]
+RESULT_DTYPE = np.dtype([
+    ("name", np.uint32),  # index into the ResultSet's NameTable
+    ("ra", np.float64),
+    ("dec", np.float64),
+    ("rise", np.float32),  # local civil hours; float32 is still well under a second
+    ("set", np.float32),
+    ("observable", np.bool_),
+    ("status", np.int8),
+])
+
+
+def status_codes(ra, result):
+    """Per-star status code from an ``engine.Observability`` result."""
+    status = np.full(len(ra), RISES, dtype=np.int8)
+    status[result.circumpolar] = CIRCUMPOLAR
+    status[result.never_rises] = NEVER_RISES
+    status[np.isnan(ra)] = UNRESOLVED
+    return status
+
+
+class NameTable:
+    """Distinct star names packed into one UTF-8 buffer; rows refer to them by integer ID.
+
+    Each name is stored once, however many rows use it; only the name ->
+    ID index holds a Python string per distinct name. Names are decoded
+    again only for the rows being shown, sorted by name or exported. IDs
+    stay valid as the table grows, so readers on other threads need no lock.
+    """
+
+    def __init__(self):
+        self._pool = bytearray()
+        self._ends = np.empty(1024, dtype=np.int64)
+        self._size = 0
+        self._ids = {}
+
+    def add(self, names):
+        """uint32 IDs for ``names``, in order; a name seen before gets its existing ID."""
+        ids = np.empty(len(names), dtype=np.uint32)
+        encoded = []
+        for i, name in enumerate(names):
+            name = str(name)
+            id_ = self._ids.get(name)
+            if id_ is None:
+                id_ = self._ids[name] = self._size + len(encoded)
+                encoded.append(name.encode())
+            ids[i] = id_
+        first = self._size
+        if first + len(encoded) > len(self._ends):
+            grown = np.empty(max(2 * len(self._ends), first + len(encoded)), dtype=np.int64)
+            grown[:first] = self._ends[:first]
+            self._ends = grown
+        start = len(self._pool)
+        self._pool += b"".join(encoded)
+        self._ends[first:first + len(encoded)] = start + np.cumsum([len(name) for name in encoded])
+        self._size += len(encoded)
+        return ids
+
+    def __getitem__(self, ids):
+        """Names for an array of IDs (an object array), or one name for a single ID."""
+        pool, ends = self._pool, self._ends
+        if np.ndim(ids) == 0:
+            return pool[ends[ids - 1] if ids else 0:ends[ids]].decode()
+        names = np.empty(len(ids), dtype=object)
+        for i, id_ in enumerate(np.asarray(ids).tolist()):
+            names[i] = pool[ends[id_ - 1] if id_ else 0:ends[id_]].decode()
+        return names
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Pool, offsets and the name index (the dict itself, not its strings)."""
+        return len(self._pool) + self._ends.nbytes + sys.getsizeof(self._ids)
+
+
+class ResultSet:
+    """Append-only rows of ``RESULT_DTYPE``: name, ra, dec, rise, set, observable, status.
+
+    Storage grows by doubling. ``data`` is a view of the filled rows, so a
+    reference to it is a zero-copy snapshot: later appends only write past
+    its end.
+    """
+
+    def __init__(self, names=None):
+        self.names = NameTable() if names is None else names
+        self._data = np.empty(0, dtype=RESULT_DTYPE)
+        self._size = 0
+
+    def append(self, names, ra, dec, result):
+        n = len(names)
+        if self._size + n > len(self._data):
+            grown = np.empty(max(2 * len(self._data), self._size + n, 1024), dtype=RESULT_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        rows = self._data[self._size:self._size + n]
+        rows["name"] = self.names.add(names)
+        rows["ra"] = ra
+        rows["dec"] = dec
+        rows["rise"] = result.rise
+        rows["set"] = result.set
+        rows["observable"] = result.observable
+        rows["status"] = status_codes(ra, result)
+        self._size += n
+
+    @property
+    def data(self):
+        return self._data[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Memory held by the rows and names (allocated capacity)."""
+        return self._data.nbytes + self.names.nbytes
+
+    def select(self, sort=None, descending=False, observable=None, status=None):
+        """Row indices after filtering and sorting on the underlying arrays."""
+        data = self.data
+        mask = np.ones(len(data), dtype=bool)
+        if observable is not None:
+            mask &= data["observable"] == observable
+        if status is not None:
+            mask &= data["status"] == status
+        idx = np.flatnonzero(mask)
+        if sort is not None:
+            values = self.names[data["name"][idx]] if sort == "name" else data[sort][idx]
+            order = np.argsort(values, kind="stable")
+            if descending:
+                # Reverse only the valid part so NaN (no rise/set) stays last
+                valid = len(order) - (np.isnan(values).sum() if values.dtype.kind == "f" else 0)
+                order = np.concatenate([order[:valid][::-1], order[valid:]])
+            idx = idx[order]
+        return idx
+
+    def rows(self, idx, lct_obs):
+        """Display rows (Star, LCT Rise, LCT Observer, LCT Set, Observability)."""
+        rows = []
+        for row in self.data[idx]:
+            name = self.names[row["name"]]
+            status = row["status"]
+            if status == UNRESOLVED:
+                rows.append([name, "-", lct_obs, "-", "Unresolved"])
+                continue
+            if status == CIRCUMPOLAR:
+                lct_rise = lct_set = "Circumpolar"
+            elif status == NEVER_RISES:
+                lct_rise = lct_set = "Never rises"
+            else:
+                lct_rise = convert_dec_to_hours(float(row["rise"]))
+                lct_set = convert_dec_to_hours(float(row["set"]))
+            observable = "Observable" if row["observable"] else "Unobservable"
+            rows.append([name, lct_rise, lct_obs, lct_set, observable])
+        return rows
+
+    def export(self, path, idx=None, chunk_size=50000, job=None):
+        """Write the selected rows to CSV, JSON Lines or Parquet in chunks."""
+        export_rows(self.data, self.names, path, idx, chunk_size, job)
+
+
+def export_rows(data, names, path, idx=None, chunk_size=50000, job=None):
+    """Stream ``ResultSet.data`` (or a snapshot of it) to ``path``."""
+    idx = np.arange(len(data)) if idx is None else idx
+    writer = open_writer(path, COLUMNS)
+    try:
+        for start in range(0, len(idx), chunk_size):
+            if job is not None:
+                job.check()
+                job.report(start, len(idx))
+            rows = data[idx[start:start + chunk_size]]
+            chunk = {column: rows[column] for column in COLUMNS}
+            chunk["name"] = names[rows["name"]]
+            chunk["status"] = STATUS_NAMES[rows["status"]]
+            writer.write(chunk)
+    finally:
+        writer.close()
+    if job is not None:
+        job.report(len(idx), len(idx))
@@ -0,0 +1,57 @@
+"""In-process cache of observation results between runs.
+
+Results are keyed on the site snapped to a ``site_tolerance`` degree grid,
+the Julian Day snapped to ``time_tolerance`` seconds and the target set, so
+pressing "Calculate Observation" again with the same inputs is a lookup.
+Coordinates and rise/set sidereal times depend only on the latitude and
+the stars, not on the date or time; they are kept under a separate key so
+a change of observation time only redoes the LST -> LCT step.
+"""
+import threading
+from collections import OrderedDict
+
+
+class RunCache:
+    """Thread-safe LRU of results and sidereal rise/set times."""
+
+    def __init__(self, maxsize=256, site_tolerance=1e-4, time_tolerance=1.0):
+        self.maxsize = maxsize
+        self.site_tolerance = site_tolerance
+        self.time_tolerance = time_tolerance
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def result_key(self, kind, epoch, targets):
+        """Key of a full result at the epoch's (snapped) site and time."""
+        return (kind, round(epoch.lat / self.site_tolerance), round(epoch.lon / self.site_tolerance),
+                round(epoch.JD * 86400 / self.time_tolerance), tuple(targets))
+
+    def sidereal_key(self, kind, lat, targets):
+        """Key of time independent values (coordinates, rise/set LST) at a latitude."""
+        return kind, round(lat / self.site_tolerance), tuple(targets)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,417 @@
+"""Local HTTP/JSON service around the observability engine.
+
+One process holds the catalog, name resolver, timezone and geocoding
+caches for every client. Identical requests that arrive while one is
+already being computed wait for that answer instead of repeating it, and
+concurrent ``/observe`` requests are gathered into a single coordinate
+lookup and one vectorized evaluation per epoch.
+
+    python -m novascope serve --stand-ins
+    python -m novascope.service --requests 5000 --concurrency 32
+
+Endpoints:
+
+    POST /observe   {"stars": [...], "lat", "lon", "date": "YYYY-MM-DD", "time": "HH:MM[:SS]", "offset"?}
+    GET  /timezone  ?lat=&lon=&date=&time=
+    GET  /geocode   ?lat=&lon=
+    GET  /stats     latency percentiles and cache counters
+    GET  /health
+"""
+import argparse
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from novascope.cli import parse_time
+from novascope.engine import JulianDay, epoch_context
+from novascope.export import json_column
+from novascope.horizon import horizontal
+from novascope.results import STATUS_NAMES, status_codes
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_STARS = 10000  # per request
+MAX_BODY = 1 << 20
+
+ObserveRequest = namedtuple("ObserveRequest", ["stars", "lat", "lon", "JD", "lct", "offset"])
+
+
+def parse_observe(body):
+    """Validated ``ObserveRequest`` from a decoded JSON body; ValueError if malformed."""
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object.")
+    stars = body.get("stars")
+    if not isinstance(stars, list) or not stars or not all(isinstance(name, str) for name in stars):
+        raise ValueError("'stars' must be a non-empty list of names.")
+    if len(stars) > MAX_STARS:
+        raise ValueError(f"At most {MAX_STARS} stars per request.")
+    lat, lon, JD, lct = parse_site_time(body)
+    offset = body.get("offset")
+    return ObserveRequest(tuple(stars), lat, lon, JD, lct, None if offset is None else float(offset))
+
+
+def parse_site_time(fields):
+    """(lat, lon, local JD, local civil time) from ``lat``, ``lon``, ``date`` and ``time`` fields."""
+    try:
+        lat = float(fields["lat"])
+        lon = float(fields["lon"])
+        time_of_day = parse_time(fields["time"])
+        JD = JulianDay(str(fields["date"]), time_of_day)
+    except KeyError as e:
+        raise ValueError(f"Missing field {e}.") from None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Latitude or longitude out of range.")
+    return lat, lon, JD, time_of_day[0] + time_of_day[1] / 60 + time_of_day[2] / 3600
+
+
+class Coalescer:
+    """Share one computation between identical requests that overlap in time."""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def run(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+class Batcher:
+    """Hand items submitted from many threads to ``evaluate`` in batches.
+
+    A single worker takes everything queued, waiting up to ``window``
+    seconds for more, and calls ``evaluate(items)``, which returns one
+    result (or exception instance) per item. Under load, requests that
+    arrive while a batch is computed form the next batch. A batch holds
+    at most ``max_size`` as counted by ``size(item)`` (default: 1 per
+    item); the item that would go over starts the next batch, and an item
+    larger than ``max_size`` is evaluated on its own.
+    """
+
+    def __init__(self, evaluate, window=0.002, max_size=MAX_STARS, size=None):
+        self.evaluate = evaluate
+        self.window = window
+        self.max_size = max_size
+        self.size = (lambda item: 1) if size is None else size
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _work(self):
+        carried = None  # the entry that did not fit in the previous batch
+        while True:
+            entry = self._queue.get() if carried is None else carried
+            carried = None
+            if entry is None:
+                return
+            batch = [entry]
+            total = self.size(entry[0])
+            deadline = time.perf_counter() + self.window
+            while total < self.max_size:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    self._queue.put(None)  # finish this batch, then stop
+                    break
+                size = self.size(entry[0])
+                if total + size > self.max_size:
+                    carried = entry
+                    break
+                batch.append(entry)
+                total += size
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.evaluate([item for item, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class Latencies:
+    """Recent request latencies per route, for percentile reports."""
+
+    def __init__(self, keep=10000):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, route, seconds):
+        with self._lock:
+            if route not in self._samples:
+                self._samples[route] = deque(maxlen=self.keep)
+                self._counts[route] = 0
+            self._samples[route].append(seconds)
+            self._counts[route] += 1
+
+    def report(self):
+        """{route: {count, p50_ms, p90_ms, p99_ms, max_ms}} over the kept samples."""
+        with self._lock:
+            samples = {route: np.array(values) * 1000 for route, values in self._samples.items()}
+            counts = dict(self._counts)
+        return {route: dict(count=counts[route], **percentiles(values)) for route, values in samples.items()}
+
+
+def percentiles(milliseconds):
+    p50, p90, p99, top = np.percentile(milliseconds, [50, 90, 99, 100]).round(3).tolist()
+    return {"p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": top}
+
+
+class ObservabilityService:
+    """Request handling shared by all client connections; independent of HTTP."""
+
+    def __init__(self, pipeline, geocoder=None, batch_window=0.002):
+        self.pipeline = pipeline
+        self.geocoder = geocoder
+        self.coalescer = Coalescer()
+        # Batches are capped by stars, not requests, so one vectorized call stays bounded
+        self.batcher = Batcher(self.observe_many, batch_window, size=lambda request: len(request.stars))
+        self.latencies = Latencies()
+        self.started = time.time()
+
+    def observe(self, body):
+        request = parse_observe(body)
+        return self.coalescer.run(("observe", request), lambda: self.batcher.submit(request).result())
+
+    def observe_many(self, requests):
+        """Evaluate a batch: one coordinate lookup, then one kernel call per distinct epoch."""
+        names = list(dict.fromkeys(name for request in requests for name in request.stars))
+        ra_all, dec_all = self.pipeline.star_coordinates(names)
+        index = {name: i for i, name in enumerate(names)}
+        responses = [None] * len(requests)
+        groups = {}
+        for k, request in enumerate(requests):
+            try:
+                offset = request.offset
+                if offset is None:
+                    offset = self.pipeline.timezone_offset(request.lat, request.lon, request.JD)
+            except Exception as e:
+                responses[k] = e
+                continue
+            epoch = epoch_context(request.JD, request.lct, request.lat, request.lon, offset)
+            groups.setdefault(epoch, []).append(k)
+        for epoch, members in groups.items():
+            rows = np.array([index[name] for k in members for name in requests[k].stars])
+            ra, dec = ra_all[rows], dec_all[rows]
+            result = epoch.observability(ra, dec)
+            position = horizontal(ra, dec, epoch.lat, epoch.lon, epoch.JD, epoch.offset)
+            status = STATUS_NAMES[status_codes(ra, result)]
+            start = 0
+            for k in members:
+                part = slice(start, start + len(requests[k].stars))
+                start = part.stop
+                responses[k] = {
+                    "offset": epoch.offset,
+                    "lst": epoch.lst,
+                    "columns": {
+                        "name": list(requests[k].stars), "ra": json_column(ra[part]), "dec": json_column(dec[part]),
+                        "rise": json_column(result.rise[part]), "set": json_column(result.set[part]),
+                        "alt": json_column(position.alt[part]), "az": json_column(position.az[part]),
+                        "airmass": json_column(position.airmass[part]),
+                        "observable": result.observable[part].tolist(), "status": status[part].tolist(),
+                    },
+                }
+        return responses
+
+    def timezone(self, query):
+        lat, lon, JD, _ = parse_site_time(query)
+
+        def lookup():
+            return {"zone": self.pipeline.timezones.timezone_at(lat, lon),
+                    "offset": self.pipeline.timezone_offset(lat, lon, JD)}
+        return self.coalescer.run(("timezone", lat, lon, JD), lookup)
+
+    def geocode(self, query):
+        lat, lon = float(query["lat"]), float(query["lon"])
+        if self.geocoder is None:
+            return {"label": None}
+        return self.coalescer.run(("geocode", lat, lon), lambda: {"label": self.geocoder.lookup(lat, lon)})
+
+    def stats(self):
+        resolver = self.pipeline.resolver
+        zones = self.pipeline.timezones.cache_info()["zones"]
+        return {
+            "uptime": round(time.time() - self.started, 3),
+            "routes": self.latencies.report(),
+            "coalesced": self.coalescer.coalesced,
+            "batches": self.batcher.batches,
+            "batched_requests": self.batcher.items,
+            "resolver": {"hits": resolver.hits, "misses": resolver.misses, "requests": resolver.requests},
+            "timezone": {"hits": zones.hits, "misses": zones.misses},
+        }
+
+    def close(self):
+        self.batcher.close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """JSON routes of ``ObservabilityService``; ``server.service`` holds the service."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so load tests measure the service and not connects
+    quiet = True
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def route(self, method):
+        start = time.perf_counter()
+        service = self.server.service
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        routes = {
+            ("POST", "/observe"): lambda: service.observe(self.read_json()),
+            ("GET", "/timezone"): lambda: service.timezone(query),
+            ("GET", "/geocode"): lambda: service.geocode(query),
+            ("GET", "/stats"): service.stats,
+            ("GET", "/health"): lambda: {"status": "ok"},
+        }
+        handler = routes.get((method, url.path))
+        if handler is None:
+            status, payload = 404, {"error": f"No route {method} {url.path}"}
+        else:
+            try:
+                status, payload = 200, handler()
+            except (KeyError, TypeError, ValueError) as e:
+                status, payload = 400, {"error": str(e)}
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        self.send_json(status, payload)
+        if handler is not None:
+            service.latencies.record(url.path, time.perf_counter() - start)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ValueError("Request body too large.")
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, allow_nan=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the socketserver default of 5 drops connections under load
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=True):
+    """A threading HTTP server for ``service``; port 0 picks a free one."""
+    handler = type("ServiceHandler", (Handler,), {"quiet": quiet})
+    server = ServiceServer((host, port), handler)
+    server.service = service
+    return server
+
+
+def load_test(host, port, requests=2000, concurrency=16, distinct=100, stars=20, seed=0):
+    """Send ``/observe`` requests drawn from ``distinct`` bodies; returns client-side latencies (ms).
+
+    Star names and sites are synthetic, so run the server with stand-ins
+    (or a catalog) to keep the test off the network.
+    """
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(distinct):
+        bodies.append(json.dumps({
+            "stars": [f"HIP {rng.randint(1, 118000)}" for _ in range(stars)],
+            "lat": round(rng.uniform(-60, 60), 2), "lon": round(rng.uniform(-180, 180), 2),
+            "date": "2024-10-01", "time": f"{rng.randint(0, 23)}:{rng.choice((0, 30))}",
+        }).encode())
+    local = threading.local()
+    latencies = []
+
+    def send(_):
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection(host, port, timeout=30)
+        start = time.perf_counter()
+        local.connection.request("POST", "/observe", rng.choice(bodies), {"Content-Type": "application/json"})
+        response = local.connection.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        return response.status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        statuses = list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    return np.array(latencies), statuses, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running NovaScope service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--requests", type=int, default=2000, help="total /observe requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads")
+    parser.add_argument("--distinct", type=int, default=100, help="distinct request bodies to draw from")
+    parser.add_argument("--stars", type=int, default=20, help="stars per request")
+    args = parser.parse_args(argv)
+    latencies, statuses, elapsed = load_test(args.host, args.port, args.requests, args.concurrency,
+                                             args.distinct, args.stars)
+    errors = sum(status != 200 for status in statuses)
+    print(f"{len(statuses)} requests in {elapsed:.2f} s ({len(statuses) / elapsed:.0f}/s), {errors} errors")
+    print("client:", percentiles(latencies))
+    connection = http.client.HTTPConnection(args.host, args.port, timeout=10)
+    connection.request("GET", "/stats")
+    print("server:", json.dumps(json.loads(connection.getresponse().read()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Spatial index over a star catalog for horizon, altitude-band and cone queries.
+
+The sky is cut into roughly equal-area cells: declination bands of
+``cell_deg`` height, each split into as many RA bins as fit at its
+latitude. Stars are stored sorted by cell, so a cell is a contiguous slice.
+A query only visits cells that can overlap the requested region: cells
+entirely inside it are taken whole, and only stars in boundary cells are
+tested one by one. Everything is saved as ``.npy`` files and memory-mapped.
+"""
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def unit_vectors(ra, dec):
+    """(N, 3) unit vectors for RA (hours) and Dec (degrees)."""
+    ra = np.radians(np.asarray(ra, dtype=np.float64) * 15)
+    dec = np.radians(np.asarray(dec, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+class CellGrid:
+    """Equal-area-ish RA/Dec cells of about ``cell_deg`` on a side."""
+
+    def __init__(self, cell_deg):
+        self.cell_deg = cell_deg
+        self.n_bands = int(np.ceil(180 / cell_deg))
+        self.band_edges = np.linspace(-90, 90, self.n_bands + 1)
+        band_centers = (self.band_edges[:-1] + self.band_edges[1:]) / 2
+        self.n_ra = np.maximum(1, np.round(360 * np.cos(np.radians(band_centers)) / cell_deg)).astype(np.int64)
+        self.band_start = np.concatenate([[0], np.cumsum(self.n_ra)])
+        self.n_cells = int(self.band_start[-1])
+
+    def cell_of(self, ra, dec):
+        band = np.clip(((np.asarray(dec) + 90) / 180 * self.n_bands).astype(np.int64), 0, self.n_bands - 1)
+        n_ra = self.n_ra[band]
+        column = (np.asarray(ra) * 15 / 360 * n_ra).astype(np.int64) % n_ra
+        return self.band_start[band] + column
+
+    def centers_and_radii(self):
+        """Unit vector of every cell center and the angular radius (degrees) enclosing the cell."""
+        band = np.repeat(np.arange(self.n_bands), self.n_ra)
+        column = np.arange(self.n_cells) - self.band_start[band]
+        width = 24.0 / self.n_ra[band]  # hours
+        ra_lo, ra_hi = column * width, (column + 1) * width
+        dec_lo, dec_hi = self.band_edges[band], self.band_edges[band + 1]
+        centers = unit_vectors((ra_lo + ra_hi) / 2, (dec_lo + dec_hi) / 2)
+        # The farthest point of an RA/Dec rectangle from its center is a corner
+        radii = np.zeros(self.n_cells)
+        for ra in (ra_lo, ra_hi):
+            for dec in (dec_lo, dec_hi):
+                dot = np.einsum("ij,ij->i", centers, unit_vectors(ra, dec))
+                radii = np.maximum(radii, np.degrees(np.arccos(np.clip(dot, -1, 1))))
+        return centers, radii + 1e-6
+
+
+class SkyIndex:
+    """Cell-sorted unit vectors plus the catalog row of every slot."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported sky index version {meta.get('version')} in {path}")
+        self.grid = CellGrid(meta["cell_deg"])
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.order = np.load(os.path.join(path, "order.npy"), mmap_mode="r")
+        self.xyz = np.load(os.path.join(path, "xyz.npy"), mmap_mode="r")
+        self.centers, self.radii = self.grid.centers_and_radii()
+
+    def __len__(self):
+        return len(self.order)
+
+    def annulus(self, ra, dec, r_min, r_max):
+        """Catalog rows between ``r_min`` and ``r_max`` degrees from (RA hours, Dec degrees)."""
+        center = unit_vectors(ra, dec)
+        distance = np.degrees(np.arccos(np.clip(self.centers @ center, -1, 1)))
+        inside = (distance + self.radii <= r_max) & (distance - self.radii >= r_min)
+        touching = ~inside & (distance - self.radii <= r_max) & (distance + self.radii >= r_min)
+        candidates = self._slots(np.flatnonzero(touching))
+        dot = self.xyz[candidates] @ center
+        keep = dot >= np.cos(np.radians(r_max))
+        if r_min > 0:
+            keep &= dot <= np.cos(np.radians(r_min))
+        slots = np.concatenate([self._slots(np.flatnonzero(inside)), candidates[keep]])
+        return np.asarray(self.order[slots])
+
+    def cone(self, ra, dec, radius):
+        """Catalog rows within ``radius`` degrees of (RA hours, Dec degrees)."""
+        return self.annulus(ra, dec, 0.0, radius)
+
+    def altitude_band(self, lat, lst, min_alt=0.0, max_alt=90.0):
+        """Catalog rows with altitude in [min_alt, max_alt] at latitude ``lat`` and LST ``lst`` (hours)."""
+        # Altitude is 90 degrees minus the angular distance from the zenith
+        return self.annulus(lst, lat, 90.0 - max_alt, 90.0 - min_alt)
+
+    def above_horizon(self, lat, lst):
+        return self.altitude_band(lat, lst, 0.0, 90.0)
+
+    def _slots(self, cells):
+        """Concatenate the slot ranges of ``cells`` without a Python loop."""
+        starts = np.asarray(self.offsets[cells])
+        lengths = np.asarray(self.offsets[cells + 1]) - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return shift + np.arange(total)
+
+
+def build_index(ra, dec, path, cell_deg=1.0):
+    """Build and save an index over RA (hours) / Dec (degrees) arrays."""
+    grid = CellGrid(cell_deg)
+    cells = grid.cell_of(ra, dec)
+    order = np.argsort(cells, kind="stable")
+    offsets = np.searchsorted(cells[order], np.arange(grid.n_cells + 1))
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "offsets.npy"), offsets.astype(np.int64))
+    np.save(os.path.join(path, "order.npy"), order.astype(np.int64))
+    np.save(os.path.join(path, "xyz.npy"), unit_vectors(np.asarray(ra)[order], np.asarray(dec)[order]))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "cell_deg": cell_deg, "rows": len(order)}, f)
+    return SkyIndex(path)
+
+
+def open_index(path):
+    """Open a saved index, or return None if there is none at ``path``."""
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return SkyIndex(path)
@@ -0,0 +1,29 @@
+"""Startup timing report.
+
+Pass ``start`` taken before the heavy imports so the report shows where
+the whole time-to-first-window goes.
+"""
+import time
+
+TARGET_MS = 300
+
+
+class StartupTimer:
+    def __init__(self, start=None, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock() if start is None else start
+        self.marks = []
+
+    def mark(self, label):
+        self.marks.append((label, self.clock()))
+
+    def report(self, target_ms=TARGET_MS):
+        lines = []
+        previous = self.start
+        for label, t in self.marks:
+            lines.append(f"{label:<24}{(t - previous) * 1000:8.1f} ms")
+            previous = t
+        total = (previous - self.start) * 1000
+        verdict = "within" if total <= target_ms else "OVER"
+        lines.append(f"{'total':<24}{total:8.1f} ms ({verdict} the {target_ms} ms target)")
+        return "\n".join(lines)
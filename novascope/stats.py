@@ -0,0 +1,126 @@
+"""Per-stage timers and counters for an observation run.
+
+A run gets a ``Stats`` when instrumentation is switched on and the shared
+``NULL_STATS`` otherwise, whose methods do nothing, so the pipeline can
+call ``stats.stage(...)`` and ``stats.count(...)`` unconditionally.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from novascope import CACHE_DIR
+
+DEFAULT_LOG = os.path.join(CACHE_DIR, "runs.jsonl")
+
+
+class Stats:
+    """Wall time per stage and named counters, safe to update from several threads."""
+
+    enabled = True
+
+    def __init__(self, title="", profile=False):
+        self.title = title
+        self.profile = profile
+        self.profile_text = None
+        self.started = datetime.now()
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+        self._elapsed = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+                self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def profiling(self):
+        """cProfile the enclosed code (on the calling thread) if ``profile`` is set."""
+        if not self.profile:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            self.profile_text = out.getvalue()
+
+    def stop(self):
+        if self._elapsed is None:
+            self._elapsed = time.perf_counter() - self._start
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start if self._elapsed is None else self._elapsed
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "title": self.title,
+                "started": self.started.isoformat(timespec="seconds"),
+                "seconds": round(self.elapsed, 6),
+                "stages": {name: {"seconds": round(seconds, 6), "calls": self.calls[name]}
+                           for name, seconds in self.seconds.items()},
+                "counters": dict(self.counters),
+            }
+
+    def report(self):
+        """Plain-text summary, slowest stage first."""
+        data = self.as_dict()
+        lines = [f"{data['title']}: {data['seconds'] * 1000:.1f} ms"]
+        for name, stage in sorted(data["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"  {name:<24}{stage['seconds'] * 1000:10.1f} ms  x{stage['calls']}")
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"  {name:<24}{value:10d}")
+        return "\n".join(lines)
+
+    def write_log(self, path=DEFAULT_LOG):
+        """Append this run as one JSON line."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(self.as_dict()) + "\n")
+
+
+class NullStats:
+    """Stand-in used when instrumentation is off; every call is a no-op."""
+
+    enabled = False
+    profile_text = None
+    _stage = nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, n=1):
+        pass
+
+    def profiling(self):
+        return self._stage
+
+    def stop(self):
+        pass
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,165 @@
+"""Observability sweeps of huge catalogs across a process pool.
+
+The catalog is split into chunks of stars that worker processes claim one
+at a time from a shared counter, so fast workers simply take more chunks.
+Workers map RA/Dec from files (the catalog's own ``.npy`` memory maps, or
+a copy in ``/dev/shm`` for in-memory arrays) and write into a shared
+memory-mapped output, so no star data is ever pickled. The result is the
+number of grid intervals during which every (site, star) is observable,
+i.e. pairs of consecutive epochs at which it is visible at both ends.
+
+    python -m novascope.sweep --stars 5000000 --workers 1,2,4,8
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from novascope.network import Site, network_epochs, site_matrix
+from novascope.planner import MAX_CELLS
+
+SHM_DIR = "/dev/shm"
+
+
+def _source(a, workdir, name):
+    """(filename, offset, dtype, shape) from which a worker can map ``a``.
+
+    Memory maps are passed by their own file; anything else is written
+    once to ``workdir``.
+    """
+    if isinstance(a, np.memmap) and a.filename is not None and a.flags.c_contiguous:
+        top = a
+        while isinstance(top.base, np.memmap):
+            top = top.base
+        return a.filename, top.offset + (a.ctypes.data - top.ctypes.data), a.dtype.str, a.shape
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    path = os.path.join(workdir, name)
+    copy = np.memmap(path, mode="w+", dtype=a.dtype, shape=a.shape)
+    copy[:] = a
+    copy.flush()
+    return path, 0, a.dtype.str, a.shape
+
+
+def _map(source, mode="r"):
+    filename, offset, dtype, shape = source
+    return np.memmap(filename, mode=mode, dtype=dtype, offset=offset, shape=shape)
+
+
+def _sweep_chunks(ra_source, dec_source, out_source, sites, epochs, counter, chunk_size):
+    """Worker loop: claim the next chunk until none are left."""
+    ra, dec, out = _map(ra_source), _map(dec_source), _map(out_source, "r+")
+    n = len(ra)
+    while True:
+        with counter.get_lock():
+            start = counter.value
+            counter.value += chunk_size
+        if start >= n:
+            break
+        stop = min(start + chunk_size, n)
+        observable = site_matrix(ra[start:stop], dec[start:stop], sites, epochs)
+        out[:, start:stop] = (observable[1:] & observable[:-1]).sum(axis=0, dtype=out.dtype)
+    out.flush()
+
+
+def visible_intervals(ra, dec, sites, epochs, workers=None, chunk_size=None):
+    """Observable grid intervals per (site, star), shaped (sites, stars), computed on ``workers`` processes.
+
+    An interval counts when the star is observable at the epochs at both
+    of its ends, so the count times the step is the summed length of the
+    star's visible windows, (last - first epoch) each as in ``best_windows``.
+    ``workers=1`` runs in this process with the same chunking.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    epoch_count, site_count = epochs.JD.shape
+    n = len(ra)
+    if chunk_size is None:
+        # Bounded memory per chunk, and enough chunks to keep every worker busy to the end
+        chunk_size = max(1, min(MAX_CELLS // (epoch_count * site_count), -(-n // (8 * workers))))
+    dtype = np.uint16 if epoch_count < 2 ** 16 else np.uint32
+    workdir = tempfile.mkdtemp(prefix="novascope-sweep-", dir=SHM_DIR if os.path.isdir(SHM_DIR) else None)
+    try:
+        ra_source = _source(ra, workdir, "ra")
+        dec_source = _source(dec, workdir, "dec")
+        out_path = os.path.join(workdir, "out")
+        np.memmap(out_path, mode="w+", dtype=dtype, shape=(site_count, n)).flush()
+        out_source = out_path, 0, np.dtype(dtype).str, (site_count, n)
+        context = multiprocessing.get_context()
+        counter = context.Value("q", 0)
+        args = ra_source, dec_source, out_source, sites, epochs, counter, chunk_size
+        if workers == 1:
+            _sweep_chunks(*args)
+        else:
+            processes = [context.Process(target=_sweep_chunks, args=args, daemon=True) for _ in range(workers)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            failed = [process.exitcode for process in processes if process.exitcode != 0]
+            if failed:
+                raise RuntimeError(f"{len(failed)} sweep worker(s) failed (exit codes {failed})")
+        return np.array(_map(out_source))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def benchmark_sites(count):
+    """``count`` fixed-offset sites spread over latitude and longitude."""
+    lats = np.linspace(-60, 60, count)
+    lons = np.linspace(-150, 150, count)
+    return [Site(f"site{i}", float(lats[i]), float(lons[i]), round(lons[i] / 15)) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how the sweep scales with worker processes.")
+    parser.add_argument("--stars", type=int, default=2000000, help="synthetic stars (default: %(default)s)")
+    parser.add_argument("--sites", type=int, default=4, help="sites (default: %(default)s)")
+    parser.add_argument("--epochs", type=int, default=24, help="hourly epochs (default: %(default)s)")
+    parser.add_argument("--workers", default=None,
+                        help="comma separated worker counts (default: 1 and powers of two up to the CPU count)")
+    args = parser.parse_args(argv)
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(",")]
+    else:
+        counts = sorted({1, cpus} | {2 ** k for k in range(1, cpus.bit_length()) if 2 ** k <= cpus})
+    sites = benchmark_sites(args.sites)
+    epochs = network_epochs(sites, datetime(2024, 10, 1), datetime(2024, 10, 1, args.epochs - 1), 1, "hours")
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix="novascope-sweep-bench-")
+    try:
+        # Input as memory maps, like a catalog: workers read it in place
+        ra = np.lib.format.open_memmap(os.path.join(workdir, "ra.npy"), mode="w+", shape=(args.stars,))
+        dec = np.lib.format.open_memmap(os.path.join(workdir, "dec.npy"), mode="w+", shape=(args.stars,))
+        ra[:] = rng.uniform(0, 24, args.stars)
+        dec[:] = np.degrees(np.arcsin(rng.uniform(-1, 1, args.stars)))
+        ra.flush()
+        dec.flush()
+        ra = np.load(os.path.join(workdir, "ra.npy"), mmap_mode="r")
+        dec = np.load(os.path.join(workdir, "dec.npy"), mmap_mode="r")
+        cells = args.stars * args.sites * args.epochs
+        print(f"{args.stars} stars x {args.sites} sites x {args.epochs} epochs on {cpus} CPUs")
+        reference = None
+        base = None
+        for workers in counts:
+            start = time.perf_counter()
+            result = visible_intervals(ra, dec, sites, epochs, workers)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference, base = result, elapsed
+            elif not np.array_equal(reference, result):
+                raise SystemExit(f"Results with {workers} workers differ from {counts[0]} worker(s)")
+            speedup = base / elapsed
+            print(f"workers={workers:<3}{elapsed:8.2f} s{cells / elapsed / 1e6:10.1f} M cells/s"
+                  f"{speedup:8.2f}x{speedup / workers * counts[0]:8.0%} efficiency")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
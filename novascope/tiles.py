@@ -0,0 +1,211 @@
+"""Disk-backed slippy-map tile store in MBTiles format.
+
+Tiles live in a standard MBTiles SQLite file (TMS row order), so the store
+can be opened by other MBTiles tools or shipped pre-filled for field use.
+A side table records size and last use so the file can be kept under a
+size limit by evicting the least recently used tiles.
+"""
+import argparse
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from novascope import CACHE_DIR
+from novascope.httpclient import shared_session
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, "tiles.mbtiles")
+DEFAULT_URL = "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+MAX_PREFETCH = 20000  # keep bulk downloads polite to public tile servers
+
+log = logging.getLogger(__name__)
+
+
+def tile_at(lat, lon, zoom):
+    """(x, y) of the XYZ tile containing a point."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(south, west, north, east, zooms):
+    """Yield (z, x, y) for every tile covering the box at each zoom."""
+    for z in zooms:
+        x0, y0 = tile_at(north, west, z)
+        x1, y1 = tile_at(south, east, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+class TileStore:
+    """Read-through tile cache: disk first, then ``url`` (unless offline).
+
+    Safe to share between the map widget's loader threads. Downloads use
+    ``session`` (default: the shared pooled session) but skip its response
+    cache, since the tiles are stored here.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, url=DEFAULT_URL, max_bytes=DEFAULT_MAX_BYTES,
+                 offline=False, timeout=10, session=None):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.url = url
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.timeout = timeout
+        self.session = shared_session() if session is None else session
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                                              tile_data BLOB, PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE TABLE IF NOT EXISTS tile_usage (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                                                   size INTEGER, used REAL,
+                                                   PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE INDEX IF NOT EXISTS tile_usage_used ON tile_usage (used);
+        """)
+        self._db.executemany("INSERT OR IGNORE INTO metadata VALUES (?, ?)",
+                             [("name", "NovaScope tiles"), ("format", "png"), ("type", "baselayer")])
+        self._db.commit()
+        self.size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM tile_usage").fetchone()[0]
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def _key(z, x, y):
+        return z, x, 2 ** z - 1 - y  # MBTiles rows count from the bottom
+
+    def get(self, z, x, y):
+        """Stored tile bytes, or None."""
+        key = self._key(z, x, y)
+        with self._lock:
+            row = self._db.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                   "AND tile_row = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+        return row[0]
+
+    def __contains__(self, zxy):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                    "AND tile_row = ?", self._key(*zxy)).fetchone() is not None
+
+    def put(self, z, x, y, data):
+        key = self._key(z, x, y)
+        with self._lock:
+            old = self._db.execute("SELECT size FROM tile_usage WHERE zoom_level = ? AND tile_column = ? "
+                                   "AND tile_row = ?", key).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", (*key, data))
+            self._db.execute("INSERT OR REPLACE INTO tile_usage VALUES (?, ?, ?, ?, ?)",
+                             (*key, len(data), time.time()))
+            self.size += len(data) - (old[0] if old else 0)
+            self._flush_touched()
+            if self.size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def fetch(self, z, x, y):
+        """Download one tile and store it. None if the server has no such tile."""
+        url = self.url.replace("{z}", str(z)).replace("{x}", str(x)).replace("{y}", str(y))
+        response = self.session.get(url, timeout=self.timeout, headers={"Cache-Control": "no-store"})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        self.put(z, x, y, response.content)
+        return response.content
+
+    def tile(self, z, x, y):
+        """Tile bytes from disk, falling back to the network when online."""
+        data = self.get(z, x, y)
+        if data is None and not self.offline:
+            data = self.fetch(z, x, y)
+        return data
+
+    def prefetch(self, south, west, north, east, zooms, workers=4, progress=None):
+        """Download every missing tile in a box. Returns (fetched, present, failed)."""
+        wanted = list(tiles_in_bbox(south, west, north, east, zooms))
+        if len(wanted) > MAX_PREFETCH:
+            raise ValueError(f"{len(wanted)} tiles requested; narrow the box or zoom range (max {MAX_PREFETCH})")
+        missing = [zxy for zxy in wanted if zxy not in self]
+        fetched = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.fetch, *zxy) for zxy in missing]
+            for done, future in enumerate(futures, 1):
+                try:
+                    fetched += future.result() is not None
+                except Exception as e:
+                    failed += 1
+                    log.warning("Tile download failed: %s", e)
+                if progress:
+                    progress(done, len(missing))
+        return fetched, len(wanted) - len(missing), failed
+
+    def _flush_touched(self):
+        if self._touched:
+            self._db.executemany("UPDATE tile_usage SET used = ? WHERE zoom_level = ? AND tile_column = ? "
+                                 "AND tile_row = ?", [(used, *key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        # Trim to 90% so a full store does not evict on every insert
+        target = self.max_bytes * 0.9
+        rows = self._db.execute("SELECT zoom_level, tile_column, tile_row, size FROM tile_usage "
+                                "ORDER BY used").fetchall()
+        victims = []
+        for z, x, row, size in rows:
+            if self.size <= target:
+                break
+            victims.append((z, x, row))
+            self.size -= size
+        self._db.executemany("DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", victims)
+        self._db.executemany("DELETE FROM tile_usage WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                             victims)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+
+def zoom_range(value):
+    """Parse "12" or "3-12" into a range of zoom levels."""
+    low, _, high = value.partition("-")
+    return range(int(low), int(high or low) + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch map tiles for offline use.")
+    parser.add_argument("bbox", nargs=4, type=float, metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+                        help="bounding box in degrees")
+    parser.add_argument("--zoom", type=zoom_range, default=zoom_range("3-12"), help='zoom levels, e.g. "3-12"')
+    parser.add_argument("--store", default=DEFAULT_PATH, help="MBTiles file")
+    parser.add_argument("--url", default=DEFAULT_URL, help="tile server URL template with {z}/{x}/{y}")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent downloads")
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // 2 ** 20, help="store size limit")
+    args = parser.parse_args(argv)
+    store = TileStore(args.store, args.url, args.max_mb * 2 ** 20)
+    try:
+        fetched, present, failed = store.prefetch(*args.bbox, args.zoom, workers=args.workers)
+    finally:
+        store.close()
+    print(f"Fetched {fetched} tiles, {present} already stored, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
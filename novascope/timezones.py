@@ -0,0 +1,62 @@
+"""Long-lived, memoized timezone lookups.
+
+Building a ``TimezoneFinder`` loads its polygon data, so the service keeps
+a single instance and caches both the zone of a (quantized) location and
+the UTC offset of a zone at a given local date and hour.
+"""
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+from novascope.engine import jd_to_datetime
+
+
+class TimezoneService:
+    """UTC offsets for a site on the observation date, not today.
+
+    Locations are snapped to a ``grid`` degree lattice before the polygon
+    lookup (0.01 deg is about 1 km), so nearby clicks share a cache entry.
+    """
+
+    def __init__(self, grid=0.01, cache_size=4096, finder=None):
+        self.grid = grid
+        self._finder = finder
+        self._lock = threading.Lock()
+        self._zone = lru_cache(maxsize=cache_size)(self._lookup_zone)
+        self._offset = lru_cache(maxsize=cache_size)(self._lookup_offset)
+
+    def timezone_at(self, lat, lon):
+        """IANA zone name for a location, or None over the open ocean."""
+        return self._zone(round(lat / self.grid), round(lon / self.grid))
+
+    def offset(self, lat, lon, JD):
+        """UTC offset in hours at a site for the local date/time ``JD``.
+
+        ``JD`` is the Julian Day of the local civil date and time, as built
+        by ``JulianDay`` from the date and time fields.
+        """
+        return self.zone_offset(self.timezone_at(lat, lon), JD)
+
+    def zone_offset(self, zone, JD):
+        """UTC offset in hours of ``zone`` (0 for None) at the local date/time ``JD``."""
+        if zone is None:
+            return 0
+        local = jd_to_datetime(JD)
+        return self._offset(zone, local.year, local.month, local.day, local.hour)
+
+    def cache_info(self):
+        return {"zones": self._zone.cache_info(), "offsets": self._offset.cache_info()}
+
+    def _lookup_zone(self, lat_cell, lon_cell):
+        with self._lock:
+            if self._finder is None:
+                from timezonefinder import TimezoneFinder
+
+                self._finder = TimezoneFinder()
+            return self._finder.timezone_at(lng=lon_cell * self.grid, lat=lat_cell * self.grid)
+
+    def _lookup_offset(self, zone, year, month, day, hour):
+        local = pytz.timezone(zone).localize(datetime(year, month, day, hour))
+        return local.utcoffset().total_seconds() / 3600
@@ -0,0 +1,96 @@
+import csv
+
+import numpy as np
+import pytest
+
+import novascope.catalog
+import novascope.resolver
+from novascope import cli
+from novascope.bench import make_catalog, stand_in_coordinates, stand_in_resolver
+from novascope.resolver import ResolverCache
+
+TARGETS = [
+    {"name": "Given", "ra": "1.5", "dec": "-20"},
+    {"name": "HIP 3", "ra": "", "dec": ""},
+    {"name": "Sirius", "ra": "", "dec": ""},
+    {"name": "Unknown", "ra": "", "dec": ""},
+]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def lookups(tmp_path, monkeypatch):
+    """Offline catalog and resolver cache in place of the ones under ~/.novascope."""
+    catalog = make_catalog(10, str(tmp_path / "catalog"))
+    resolver = ResolverCache(":memory:", resolver=stand_in_resolver, batch_resolver=None)
+    resolver.put("Sirius", 6.75, -16.7)
+    monkeypatch.setattr(novascope.catalog, "open_catalog", lambda: catalog)
+    monkeypatch.setattr(novascope.resolver, "ResolverCache", lambda: resolver)
+    return catalog, resolver
+
+
+def test_float_column():
+    values = cli.float_column(["1.5", "", None, 2])
+    np.testing.assert_array_equal(values[[0, 3]], [1.5, 2.0])
+    assert np.isnan(values[1:3]).all()
+
+
+@pytest.mark.parametrize("resolve", [False, True])
+def test_target_coordinates_fill_empty_cells(lookups, resolve):
+    catalog, _ = lookups
+    chunk = {key: [row[key] for row in TARGETS] for key in TARGETS[0]}
+    names, ra, dec = cli.TargetCoordinates(resolve=resolve)(chunk)
+    assert names == ["Given", "HIP 3", "Sirius", "Unknown"]
+    assert (ra[0], dec[0]) == (1.5, -20.0)
+    np.testing.assert_array_equal((ra[1], dec[1]), [value[0] for value in catalog.lookup(["HIP 3"])])
+    assert (ra[2], dec[2]) == (6.75, -16.7)
+    if resolve:
+        assert (ra[3], dec[3]) == pytest.approx(stand_in_coordinates("Unknown"))
+    else:
+        assert np.isnan(ra[3]) and np.isnan(dec[3])
+
+
+def test_target_coordinates_without_columns_look_up_every_row(lookups):
+    names, ra, dec = cli.TargetCoordinates()({"name": ["HIP 3", "Sirius"]})
+    assert not np.isnan(ra).any()
+
+
+def test_batch_with_mixed_targets_file(lookups, tmp_path):
+    targets = write_csv(tmp_path / "targets.csv", TARGETS)
+    observers = write_csv(tmp_path / "observers.csv", [
+        {"site": "Malang", "lat": "-7.95", "lon": "112.61", "date": "2024-10-01", "time": "20:30", "offset": "7"},
+    ])
+    output = tmp_path / "out.csv"
+    cli.main(["batch", targets, observers, "-o", str(output)])
+    rows = read_csv(output)
+    assert [row["name"] for row in rows] == [target["name"] for target in TARGETS]
+    assert [row["status"] == "unresolved" for row in rows] == [False, False, False, True]
+    assert float(rows[0]["ra"]) == 1.5
+
+
+@pytest.mark.parametrize("step, unit", [(30, "minutes"), (1, "hours"), (7, "hours")])
+def test_network_circumpolar_target_spans_the_range(tmp_path, step, unit):
+    targets = write_csv(tmp_path / "targets.csv", [
+        {"name": "Polar", "ra": "3.0", "dec": "-85"},
+        {"name": "Northern", "ra": "3.0", "dec": "85"},
+    ])
+    sites = write_csv(tmp_path / "sites.csv", [{"site": "South", "lat": "-60", "lon": "20", "offset": "2"}])
+    output = tmp_path / "out.csv"
+    cli.main(["network", targets, sites, "--start", "2024-10-01T00:00", "--end", "2024-10-02T00:00",
+              "--step", str(step), "--unit", unit, "-o", str(output)])
+    rows = read_csv(output)
+    assert [row["name"] for row in rows] == ["Polar"]
+    expected = 21.0 if step == 7 else 24.0  # the last 7 hour step would pass the end
+    assert float(rows[0]["hours"]) == expected
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from novascope.bench import random_sky
+from novascope.engine import is_observe, is_observe_batch, obs_star, obs_star_batch
+
+LATITUDES = [-89.5, -60.0, -7.95, 0.0, 23.4, 51.5, 78.2]
+
+
+@pytest.mark.parametrize("lat", LATITUDES)
+def test_obs_star_batch_matches_obs_star(lat):
+    ra, dec = random_sky(2000, seed=1)
+    dec = np.concatenate([dec, np.clip([-90.0, 90.0, -lat, lat - 90, 90 - lat], -90, 90)])
+    ra = np.concatenate([ra, [0.0, 12.0, 23.99, 0.01, 6.0]])
+    rise, set_time, circumpolar, never_rises = obs_star_batch(lat, ra, dec)
+    for i in range(len(ra)):
+        expected = obs_star(lat, ra[i], dec[i])
+        if expected[0] is None:
+            assert math.isnan(rise[i]) and math.isnan(set_time[i])
+            assert circumpolar[i] != never_rises[i]
+            assert circumpolar[i] == (dec[i] * lat > 0)
+        else:
+            assert (rise[i], set_time[i]) == pytest.approx(expected, abs=1e-9)
+            assert not circumpolar[i] and not never_rises[i]
+
+
+def test_obs_star_batch_broadcasts_sites_against_stars():
+    ra, dec = random_sky(300, seed=2)
+    lat = np.array(LATITUDES)[:, None]
+    rise, set_time, circumpolar, never_rises = obs_star_batch(lat, ra[None], dec[None])
+    assert rise.shape == (len(LATITUDES), 300)
+    for j, site in enumerate(LATITUDES):
+        expected = obs_star_batch(site, ra, dec)
+        np.testing.assert_array_equal(rise[j], expected[0])
+        np.testing.assert_array_equal(circumpolar[j], expected[2])
+
+
+def test_is_observe_batch_matches_is_observe():
+    hours = np.arange(0, 24, 0.5)
+    # Every combination, so half the windows wrap past midnight (rise after set)
+    observer, rise, set_time = (a.ravel() for a in np.meshgrid(hours, hours, hours, indexing="ij"))
+    observable = is_observe_batch(observer, rise, set_time)
+    expected = [is_observe(o, r, s) for o, r, s in zip(observer.tolist(), rise.tolist(), set_time.tolist())]
+    np.testing.assert_array_equal(observable, expected)
+
+
+def test_is_observe_batch_windows_across_midnight():
+    rise, set_time = np.full(5, 22.0), np.full(5, 3.0)
+    observer = np.array([21.9, 22.0, 23.5, 0.5, 3.5])
+    np.testing.assert_array_equal(is_observe_batch(observer, rise, set_time),
+                                  [False, True, True, True, False])
+
+
+def test_is_observe_batch_circumpolar_and_never_rising():
+    nan = np.full(2, np.nan)
+    observable = is_observe_batch(np.array([3.0, 3.0]), nan, nan, np.array([True, False]))
+    np.testing.assert_array_equal(observable, [True, False])
@@ -0,0 +1,52 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from novascope.export import guess_format, json_column, open_writer
+
+
+def write(path, chunks, columns):
+    writer = open_writer(str(path), columns)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+
+
+def chunks():
+    return [
+        {"name": np.array(["a", "b"], dtype=object), "x": np.array([0.25, np.nan]), "flag": np.array([True, False])},
+        {"name": ["c"], "x": np.array([np.inf]), "flag": np.array([True])},
+    ]
+
+
+@pytest.mark.parametrize("path, fmt", [("out.csv", "csv"), ("OUT.JSONL", "jsonl"), ("out.json", "jsonl"),
+                                       ("out.parquet", "parquet"), ("out.txt", "csv"), ("-", "csv")])
+def test_guess_format(path, fmt):
+    assert guess_format(path) == fmt
+
+
+def test_csv_writer(tmp_path):
+    path = tmp_path / "out.csv"
+    write(path, chunks(), ["name", "x", "flag"])
+    assert path.read_text().splitlines() == ["name,x,flag", "a,0.250000,1", "b,,0", "c,inf,1"]
+    with open(path, newline="") as f:
+        assert [row["name"] for row in csv.DictReader(f)] == ["a", "b", "c"]
+
+
+def test_json_lines_writer(tmp_path):
+    path = tmp_path / "out.jsonl"
+    write(path, chunks(), ["name", "x", "flag"])
+    text = path.read_text()
+    assert "NaN" not in text and "Infinity" not in text
+    assert [json.loads(line) for line in text.splitlines()] == [
+        {"name": "a", "x": 0.25, "flag": True},
+        {"name": "b", "x": None, "flag": False},
+        {"name": "c", "x": None, "flag": True},
+    ]
+
+
+def test_json_column_nulls_nan_and_infinity():
+    assert json_column(np.array([1.5, np.nan, np.inf, -np.inf])) == [1.5, None, None, None]
+    assert json_column(np.array([1, 2])) == [1, 2]
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from novascope import cli
+from novascope.engine import obs_star_batch
+from novascope.hourangle import DEFAULT_TOLERANCE, build_table, horizon_hour_angle, open_table
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    return build_table(str(tmp_path_factory.mktemp("hourangle") / "table.bin"), step=0.5, altitudes=(0.0, 20.0))
+
+
+@pytest.mark.parametrize("altitude", [0.0, 20.0])
+def test_lookups_stay_within_tolerance(table, altitude):
+    rng = np.random.default_rng(5)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, 20000)))
+    for lat in rng.uniform(-90, 90, 40):
+        exact = horizon_hour_angle(lat, dec, altitude)
+        value = table.hour_angle(lat, dec, altitude)
+        np.testing.assert_array_equal(np.isnan(value), np.isnan(exact))
+        assert np.nanmax(np.abs(value - exact), initial=0) <= DEFAULT_TOLERANCE
+
+
+def test_table_matches_obs_star_batch(table):
+    ra = np.linspace(0, 24, 500, endpoint=False)
+    dec = np.linspace(-90, 90, 500)
+    exact = obs_star_batch(-7.95, ra, dec)
+    approx = obs_star_batch(-7.95, ra, dec, table.hour_angle(-7.95, dec))
+    np.testing.assert_allclose(approx[0], exact[0], atol=DEFAULT_TOLERANCE)
+    for flags, expected in zip(approx[2:], exact[2:]):
+        np.testing.assert_array_equal(flags, expected)
+
+
+def test_open_table_reopens_a_built_table(table, tmp_path):
+    assert open_table(str(tmp_path / "missing.bin")) is None
+    reopened = open_table(table.path)
+    assert reopened.altitudes == [0.0, 20.0]
+    np.testing.assert_array_equal(reopened.values, table.values)
+
+
+def test_batch_without_a_table_exits(tmp_path):
+    with pytest.raises(SystemExit, match="No hour angle table"):
+        cli.main(["batch", "targets.csv", "observers.csv", "--hour-angle-table", str(tmp_path / "missing.bin")])
@@ -0,0 +1,189 @@
+import time
+
+import pytest
+
+from novascope.bench import StandInServer, stand_in_batch_resolver, stand_in_coordinates, stand_in_resolver
+from novascope.httpclient import make_session
+from novascope.resolver import ResolverCache, SesameResolver, normalize_name, simbad_batch_resolver
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+class Counting:
+    """Wrap a resolver and remember what it was asked."""
+
+    def __init__(self, fn, fail=()):
+        self.fn = fn
+        self.fail = set(fail)
+        self.calls = []
+
+    def __call__(self, arg):
+        self.calls.append(arg)
+        if isinstance(arg, str) and arg in self.fail:
+            raise LookupError(arg)
+        return self.fn(arg)
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("resolver", Counting(stand_in_resolver))
+    kwargs.setdefault("batch_resolver", None)
+    return ResolverCache(":memory:", clock=Clock(), **kwargs)
+
+
+def stored_used(cache, name):
+    return cache._db.execute("SELECT used FROM coords WHERE name = ?", (normalize_name(name),)).fetchone()[0]
+
+
+def test_miss_then_hit():
+    cache = make_cache()
+    assert cache.resolve("HIP 1") == pytest.approx(stand_in_coordinates("HIP 1"))
+    assert cache.resolve("  hip   1 ") == pytest.approx(stand_in_coordinates("HIP 1"))
+    assert cache.resolver.calls == ["HIP 1"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_aliases_resolve_to_the_same_entry():
+    cache = make_cache()
+    cache.put("HIP 32349", 6.75, -16.7, ["* alf CMa", "NAME Sirius"])
+    assert cache.get("name sirius") == (6.75, -16.7)
+    assert len(cache) == 1
+
+
+def test_expired_entries_are_misses():
+    cache = make_cache(ttl=10)
+    cache.put("HIP 1", 1.0, 2.0)
+    assert cache.get("HIP 1") == (1.0, 2.0)
+    cache.clock.now += 20
+    assert cache.get("HIP 1") is None
+
+
+def test_hits_reach_disk_on_flush():
+    cache = make_cache()
+    cache.put("HIP 1", 1.0, 2.0)
+    before = stored_used(cache, "HIP 1")
+    cache.get("HIP 1")
+    assert stored_used(cache, "HIP 1") == before
+    cache.flush()
+    assert stored_used(cache, "HIP 1") > before
+
+
+def test_eviction_drops_the_least_recently_used():
+    cache = make_cache(max_entries=2)
+    cache.put("HIP 1", 1.0, 1.0)
+    cache.put("HIP 2", 2.0, 2.0)
+    cache.get("HIP 1")  # only kept in memory until the next put
+    cache.put("HIP 3", 3.0, 3.0)
+    assert len(cache) == 2
+    assert cache.get("HIP 2") is None
+    assert cache.get("HIP 1") == (1.0, 1.0)
+    assert cache.get("HIP 3") == (3.0, 3.0)
+
+
+def test_eviction_removes_aliases():
+    cache = make_cache(max_entries=1)
+    cache.put("HIP 1", 1.0, 1.0, ["NAME One"])
+    cache.put("HIP 2", 2.0, 2.0)
+    assert cache._db.execute("SELECT COUNT(*) FROM aliases WHERE name = 'HIP 1'").fetchone()[0] == 0
+
+
+def test_resolve_many_falls_back_to_single_lookups():
+    names = [f"HIP {i}" for i in range(10)]
+    known = set(names[::2])
+    batch = Counting(lambda chunk: stand_in_batch_resolver([name for name in chunk if name in known]))
+    single = Counting(stand_in_resolver, fail={"HIP 9"})
+    cache = make_cache(resolver=single, batch_resolver=batch)
+    cache.put("HIP 0", *stand_in_coordinates("HIP 0"))
+
+    coords, errors = cache.resolve_many(names + ["HIP 0"], batch_size=4)
+
+    assert sorted(batch.calls) == [names[1:5], names[5:9], names[9:]]
+    assert sorted(single.calls) == ["HIP 1", "HIP 3", "HIP 5", "HIP 7", "HIP 9"]
+    assert set(coords) == set(names) - {"HIP 9"}
+    assert list(errors) == ["HIP 9"]
+    assert isinstance(errors["HIP 9"], LookupError)
+    for name, value in coords.items():
+        assert value == pytest.approx(stand_in_coordinates(name))
+    assert (cache.hits, cache.misses, cache.requests) == (1, 9, 8)
+    assert len(cache) == 9
+
+
+def test_resolve_many_survives_a_failing_batch():
+    def broken(chunk):
+        raise ConnectionError("offline")
+
+    cache = make_cache(batch_resolver=broken)
+    coords, errors = cache.resolve_many(["HIP 1", "HIP 2"])
+    assert set(coords) == {"HIP 1", "HIP 2"}
+    assert not errors
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url, params, timeout):
+        return FakeResponse(self.text)
+
+
+def test_sesame_keeps_every_identifier():
+    text = "\n".join([
+        "# Sirius",
+        "%J 101.28715533 -16.71611586 = 06:45:08.91 -16:42:58.0",
+        "%I.0 * alf CMa",
+        "%I HIP 32349",
+        "%I NAME Sirius",
+    ])
+    ra, dec, aliases = SesameResolver(session=FakeSession(text))("Sirius")
+    assert ra == pytest.approx(101.28715533 / 15)
+    assert dec == pytest.approx(-16.71611586)
+    assert aliases == ["* alf CMa", "HIP 32349", "NAME Sirius"]
+
+    cache = make_cache(resolver=SesameResolver(session=FakeSession(text)))
+    cache.resolve("Sirius")
+    assert cache.get("HIP 32349") == pytest.approx((ra, dec))
+
+
+def test_sesame_unknown_name():
+    with pytest.raises(LookupError):
+        SesameResolver(session=FakeSession("# nothing\n#! *** Nothing found ***"))("nothing")
+
+
+@pytest.fixture
+def server():
+    server = StandInServer(latency=0.2)
+    yield server
+    server.close()
+
+
+def test_single_lookups_run_concurrently(server):
+    names = [f"HIP {i}" for i in range(8)]
+    cache = make_cache(resolver=SesameResolver(server.sesame_url, session=make_session(cache_path=None)))
+    start = time.monotonic()
+    coords, errors = cache.resolve_many(names, workers=8)
+    elapsed = time.monotonic() - start
+    assert not errors and server.requests == len(names)
+    assert elapsed < 4 * server.latency  # one after another would take 8 times the latency
+    for name in names:
+        assert coords[name] == pytest.approx(stand_in_coordinates(name), abs=1e-6)
+
+
+def test_simbad_batch_resolver_sends_one_query(server):
+    names = ["HIP 1", "NAME O'Brien", "hip   2"]
+    found = simbad_batch_resolver(names, session=make_session(cache_path=None), url=server.tap_url)
+    assert server.requests == 1
+    assert found == pytest.approx({name: stand_in_coordinates(" ".join(name.split())) for name in names})
@@ -0,0 +1,114 @@
+import csv
+import json
+
+import numpy as np
+
+from novascope.bench import random_sky
+from novascope.engine import JulianDay, observability
+from novascope.results import NEVER_RISES, UNRESOLVED, NameTable, ResultSet
+
+JD = JulianDay("2024-10-01", [20, 30, 0])
+SITE = (-7.95, 112.61)
+
+
+def run(names, ra, dec, lct_observer=20.5):
+    return observability(ra, dec, SITE[0], SITE[1], JD, 7, lct_observer)
+
+
+def make_results(n=50, seed=0):
+    ra, dec = random_sky(n, seed)
+    ra[3] = dec[3] = np.nan  # an unresolved name
+    names = [f"Star {i}" for i in range(n)]
+    results = ResultSet()
+    results.append(names[:20], ra[:20], dec[:20], run(names[:20], ra[:20], dec[:20]))
+    results.append(names[20:], ra[20:], dec[20:], run(names[20:], ra[20:], dec[20:]))
+    return results, names, ra, dec
+
+
+def test_name_table_round_trip():
+    table = NameTable()
+    names = ["Sirius", "", "α Cen", "HIP 32349"] + [f"BENCH {i}" for i in range(3000)]
+    ids = np.concatenate([table.add(names[:4]), table.add(names[4:])])
+    np.testing.assert_array_equal(ids, np.arange(len(names)))
+    assert len(table) == len(names)
+    assert list(table[ids]) == names
+    assert table[2] == "α Cen"
+    assert list(table[np.array([3000, 0], dtype=np.uint32)]) == [names[3000], "Sirius"]
+
+
+
+def test_name_table_stores_each_name_once():
+    table = NameTable()
+    first = table.add(["Sirius", "Vega", "Sirius"])
+    second = table.add(["Vega", "Deneb", "Deneb"])
+    assert first.tolist() == [0, 1, 0]
+    assert second.tolist() == [1, 2, 2]
+    assert len(table) == 3
+    assert len(table._pool) == len("SiriusVegaDeneb")
+    assert list(table[np.concatenate([first, second])]) == ["Sirius", "Vega", "Sirius", "Vega", "Deneb", "Deneb"]
+
+
+def test_repeated_runs_share_names():
+    results, names, ra, dec = make_results()
+    pool = len(results.names._pool)
+    results.append(names, ra, dec, run(names, ra, dec))
+    assert len(results) == 2 * len(names)
+    assert len(results.names._pool) == pool
+    assert list(results.names[results.data["name"]]) == names + names
+
+def test_result_set_round_trip():
+    results, names, ra, dec = make_results()
+    expected = run(names, ra, dec)
+    data = results.data
+    assert len(results) == len(names)
+    assert list(results.names[data["name"]]) == names
+    np.testing.assert_array_equal(data["ra"], ra)
+    np.testing.assert_allclose(data["rise"], expected.rise, atol=1e-5)
+    np.testing.assert_array_equal(data["observable"], expected.observable)
+    assert data["status"][3] == UNRESOLVED
+    assert (data["status"] == NEVER_RISES).sum() == (expected.never_rises & ~np.isnan(ra)).sum()
+
+
+def test_data_is_a_snapshot():
+    results, names, ra, dec = make_results()
+    snapshot = results.data
+    results.append(["late"], ra[:1], dec[:1], run(["late"], ra[:1], dec[:1]))
+    assert len(snapshot) == len(names)
+    assert results.names[results.data["name"][-1]] == "late"
+
+
+def test_select_sorts_and_filters():
+    results, names, _, _ = make_results()
+    idx = results.select(sort="name", descending=True, observable=True)
+    chosen = list(results.names[results.data["name"][idx]])
+    assert chosen == sorted(chosen, reverse=True)
+    assert results.data["observable"][idx].all()
+    rise = results.data["rise"][results.select(sort="rise", descending=True)]
+    valid = ~np.isnan(rise)
+    assert valid[:valid.sum()].all()  # NaN stays last
+    assert (np.diff(rise[valid]) <= 0).all()
+
+
+def test_export_csv(tmp_path):
+    results, names, ra, _ = make_results()
+    path = tmp_path / "out.csv"
+    results.export(str(path), chunk_size=7)
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["name"] for row in rows] == names
+    assert rows[3]["ra"] == "" and rows[3]["status"] == "unresolved"
+    assert float(rows[0]["ra"]) == round(ra[0], 6)
+    assert {row["observable"] for row in rows} <= {"0", "1"}
+
+
+def test_export_jsonl_selection(tmp_path):
+    results, names, _, _ = make_results()
+    idx = results.select(sort="name")
+    path = tmp_path / "out.jsonl"
+    results.export(str(path), idx=idx, chunk_size=7)
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [row["name"] for row in rows] == sorted(names)
+    unresolved = next(row for row in rows if row["name"] == "Star 3")
+    assert unresolved["ra"] is None and unresolved["rise"] is None
+    assert all(isinstance(row["observable"], bool) for row in rows)
+
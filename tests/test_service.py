@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from novascope.bench import make_pipeline
+from novascope.service import MAX_STARS, Batcher, ObservabilityService
+
+
+def test_batches_are_capped_by_size():
+    batches = []
+    release = threading.Event()
+
+    def evaluate(items):
+        release.wait()
+        batches.append(list(items))
+        return items
+
+    batcher = Batcher(evaluate, window=0.5, max_size=10000, size=lambda n: n)
+    try:
+        first = batcher.submit(100)  # holds the worker until everything else is queued
+        futures = [batcher.submit(n) for n in (4000, 4000, 4000, 9000, 20000, 1)]
+        release.set()
+        assert first.result() == 100
+        assert [future.result() for future in futures] == [4000, 4000, 4000, 9000, 20000, 1]
+    finally:
+        batcher.close()
+    assert batches == [[100, 4000, 4000], [4000], [9000], [20000], [1]]
+    assert (batcher.batches, batcher.items) == (5, 7)
+
+
+def test_errors_reach_every_item_of_the_batch():
+    def evaluate(items):
+        raise RuntimeError("boom")
+
+    batcher = Batcher(evaluate, window=0.01)
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            batcher.submit(1).result()
+    finally:
+        batcher.close()
+
+
+def test_service_batches_hold_at_most_max_stars():
+    service = ObservabilityService(make_pipeline(), batch_window=0.05)
+    sizes = []
+    observe_many = service.observe_many
+
+    def recording(requests):
+        sizes.append(sum(len(request.stars) for request in requests))
+        return observe_many(requests)
+
+    service.batcher.evaluate = recording
+    bodies = [{"stars": [f"HIP {k * MAX_STARS + i}" for i in range(MAX_STARS // 3 + 1)],
+               "lat": -7.95, "lon": 112.61, "date": "2024-10-01", "time": "20:30", "offset": 7}
+              for k in range(6)]
+    try:
+        with ThreadPoolExecutor(len(bodies)) as pool:
+            responses = list(pool.map(service.observe, bodies))
+    finally:
+        service.close()
+    assert [len(response["columns"]["name"]) for response in responses] == [MAX_STARS // 3 + 1] * len(bodies)
+    assert sum(sizes) == len(bodies) * (MAX_STARS // 3 + 1)
+    assert max(sizes) <= MAX_STARS
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from novascope.bench import random_sky
+from novascope.network import best_windows, network_epochs, site_matrix
+from novascope.planner import visible_windows
+from novascope.sweep import benchmark_sites, visible_intervals
+
+SITES = benchmark_sites(3)
+
+
+@pytest.fixture(scope="module")
+def epochs():
+    return network_epochs(SITES, datetime(2024, 10, 1), datetime(2024, 10, 1, 12), 30, "minutes")
+
+
+def test_intervals_are_the_summed_window_lengths(epochs):
+    ra, dec = random_sky(500, seed=3)
+    intervals = visible_intervals(ra, dec, SITES, epochs, workers=1, chunk_size=64)
+    observable = site_matrix(ra, dec, SITES, epochs)
+    epoch_count = observable.shape[0]
+    column, start, end = visible_windows(observable.reshape(epoch_count, -1))
+    expected = np.bincount(column, weights=end - start, minlength=observable[0].size)
+    np.testing.assert_array_equal(intervals.ravel(), expected)
+
+
+def test_always_visible_star_gets_the_span_of_the_range(epochs):
+    # Circumpolar at the southern site, never up at the northern one
+    intervals = visible_intervals(np.array([3.0]), np.array([-89.0]), SITES, epochs, workers=1)
+    assert intervals[0, 0] == len(epochs.times) - 1  # 24 half-hour steps: 12 h
+    assert intervals[2, 0] == 0
+    windows = next(best_windows(np.array([3.0]), np.array([-89.0]), SITES, epochs))
+    first = list(windows.site).index(0)
+    assert windows.end[first] - windows.start[first] == intervals[0, 0]
+
+
+def test_worker_processes_agree_with_one_process(epochs):
+    ra, dec = random_sky(2000, seed=4)
+    one = visible_intervals(ra, dec, SITES, epochs, workers=1)
+    np.testing.assert_array_equal(visible_intervals(ra, dec, SITES, epochs, workers=2), one)
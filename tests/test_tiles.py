@@ -0,0 +1,119 @@
+import itertools
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from novascope import tiles
+from novascope.tiles import TileStore, tile_at, tiles_in_bbox
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ConnectionError(f"HTTP {self.status_code}")
+
+
+class FakeTileServer:
+    """Session stand-in: every tile is its own URL as bytes, except the ``missing`` and ``broken`` ones."""
+
+    def __init__(self, missing=(), broken=()):
+        self.missing = set(missing)
+        self.broken = set(broken)
+        self.urls = []
+
+    def get(self, url, timeout, headers):
+        assert headers["Cache-Control"] == "no-store"
+        self.urls.append(url)
+        zxy = tuple(int(part) for part in url.split("/")[-3:])
+        if zxy in self.missing:
+            return FakeResponse(404)
+        if zxy in self.broken:
+            return FakeResponse(503)
+        return FakeResponse(200, url.encode())
+
+
+def make_store(session=None, **kwargs):
+    return TileStore(":memory:", url="http://tiles/{z}/{x}/{y}", session=session or FakeTileServer(), **kwargs)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time for the store, so LRU order does not depend on timer resolution."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(tiles, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_read_through():
+    server = FakeTileServer()
+    store = make_store(server)
+    assert store.tile(3, 1, 2) == b"http://tiles/3/1/2"
+    assert store.tile(3, 1, 2) == b"http://tiles/3/1/2"
+    assert server.urls == ["http://tiles/3/1/2"]
+    assert (store.hits, store.misses) == (1, 1)
+    assert (3, 1, 2) in store and len(store) == 1
+
+
+def test_offline_serves_only_stored_tiles():
+    server = FakeTileServer()
+    store = make_store(server, offline=True)
+    store.put(3, 1, 2, b"stored")
+    assert store.tile(3, 1, 2) == b"stored"
+    assert store.tile(3, 1, 3) is None
+    assert server.urls == []
+
+
+def test_missing_tile_is_none_and_not_stored():
+    store = make_store(FakeTileServer(missing={(5, 1, 1)}))
+    assert store.tile(5, 1, 1) is None
+    assert len(store) == 0 and store.size == 0
+
+
+def test_rows_are_stored_in_tms_order():
+    store = make_store()
+    store.put(2, 1, 0, b"top row")
+    row = store._db.execute("SELECT zoom_level, tile_column, tile_row FROM tiles").fetchone()
+    assert row == (2, 1, 3)
+    assert store.get(2, 1, 0) == b"top row"
+
+
+def test_eviction_trims_least_recently_used_to_90_percent(clock):
+    store = make_store(max_bytes=1000)
+    for x in range(10):
+        store.put(4, x, 0, bytes(100))
+    store.get(4, 0, 0)  # the oldest tile is used again and survives
+    store.put(4, 10, 0, bytes(100))
+    assert store.size == 900
+    assert len(store) == 9
+    assert (4, 0, 0) in store
+    assert (4, 1, 0) not in store and (4, 2, 0) not in store
+    assert store._db.execute("SELECT SUM(size) FROM tile_usage").fetchone()[0] == store.size
+
+
+def test_replacing_a_tile_keeps_the_size(clock):
+    store = make_store()
+    store.put(1, 0, 0, bytes(10))
+    store.put(1, 0, 0, bytes(30))
+    assert store.size == 30 and len(store) == 1
+
+
+def test_prefetch_counts_and_logs_failures(caplog):
+    wanted = list(tiles_in_bbox(-8.5, 112.0, -7.5, 113.0, range(3, 8)))
+    server = FakeTileServer(missing={wanted[1]}, broken={wanted[2]})
+    store = make_store(server)
+    store.put(*wanted[0], b"already")
+    with caplog.at_level(logging.WARNING, logger="novascope.tiles"):
+        fetched, present, failed = store.prefetch(-8.5, 112.0, -7.5, 113.0, range(3, 8), workers=2)
+    assert (fetched, present, failed) == (len(wanted) - 3, 1, 1)
+    assert len(server.urls) == len(wanted) - 1
+    assert "Tile download failed" in caplog.text
+
+
+def test_tile_at_clamps_to_the_map():
+    assert tile_at(0, 0, 1) == (1, 1)
+    assert tile_at(90, -180, 2) == (0, 0)
+    assert tile_at(-90, 180, 2) == (3, 3)